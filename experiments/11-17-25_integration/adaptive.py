@@ -0,0 +1,149 @@
+"""Closed-loop quality controller: hold an end-to-end latency budget on any host.
+
+One ladder of settings runs from best (LADDER[0]) to cheapest. Each step
+changes one knob:
+
+    search / crop   what the recognizer sees: HandRoiTracker.resize() sets
+                    the full-frame search size and the hand-crop size
+    interval        InferenceScheduler.min_interval_s, the inference stride
+                    (0 = back to back on every newest frame)
+    preview_fps     the GUI preview rate handed out of the capture loop
+
+The camera keeps streaming at CAPTURE_SIZE. The crop is cut from the full
+frame, so the pixel count MediaPipe pays for is the resolution that
+matters, and it changes per call with no camera restart.
+
+Every ADAPT_INTERVAL_S the controller takes the p90 of the capture -> result
+latencies it observed (sensor timestamp to result callback) and the
+process CPU share. Over budget or over CPU_HIGH steps one rung down at
+once. Under HEADROOM of the budget and under CPU_LOW for UPGRADE_AFTER
+intervals in a row steps one rung up. The asymmetry keeps it from
+oscillating. Every change is printed and kept in `log` for the layout
+summary. A Pi 4 settles a few rungs down, and a Pi 5 or a laptop stays at
+the top, with the same constants.
+"""
+import os
+import time
+
+import numpy as np
+
+LATENCY_BUDGET_MS = 120.0
+ADAPT_INTERVAL_S = 1.0
+HEADROOM = 0.7
+CPU_HIGH = 0.85
+CPU_LOW = 0.6
+UPGRADE_AFTER = 3
+MIN_SAMPLES = 5  # results per interval before latency counts
+
+# (search size, crop size, min inference interval s, preview fps), best first
+LADDER = (
+    ((320, 240), (256, 256), 0.0, 10),
+    ((320, 240), (256, 256), 0.0, 5),
+    ((256, 192), (224, 224), 0.0, 5),
+    ((256, 192), (224, 224), 1 / 20, 5),
+    ((192, 144), (192, 192), 1 / 20, 2),
+    ((160, 120), (160, 160), 1 / 15, 2),
+    ((160, 120), (160, 160), 1 / 10, 1),
+)
+
+
+class AdaptiveController:
+    """Steps LADDER to keep capture -> result latency under `budget_ms`.
+
+    Call observe(timestamp_ms) per result (GesturePipeline does, when
+    pipeline.controller is set). Call tick() from the capture loop; it
+    returns at once between intervals. attach() hands it the scheduler
+    (anything with min_interval_s) once that exists.
+    """
+
+    def __init__(self, roi_tracker=None, budget_ms=LATENCY_BUDGET_MS, ladder=LADDER, verbose=True):
+        self.roi_tracker = roi_tracker
+        self.budget_ms = budget_ms
+        self.ladder = ladder
+        self.verbose = verbose
+        self.scheduler = None
+        self.level = 0
+        self.preview_fps = ladder[0][3]
+        self.log = []
+        self._latencies = []
+        self._calm = 0
+        self._t0 = time.perf_counter()
+        self._next = self._t0 + ADAPT_INTERVAL_S
+        self._cpu_mark = (time.perf_counter(), time.process_time())
+        self._cpus = os.cpu_count() or 1
+
+    def attach(self, scheduler):
+        self.scheduler = scheduler
+        self._apply()
+        return self
+
+    @property
+    def preview_period(self):
+        return 1.0 / self.preview_fps if self.preview_fps else 0.0
+
+    def observe(self, timestamp_ms):
+        """Record one result; timestamp_ms is the frame's sensor time (monotonic ms)."""
+        self._latencies.append(time.monotonic_ns() / 1e6 - timestamp_ms)
+
+    def tick(self):
+        now = time.perf_counter()
+        if now < self._next:
+            return
+        self._next = now + ADAPT_INTERVAL_S
+        wall, cpu = self._cpu_mark
+        self._cpu_mark = (now, time.process_time())
+        cpu_share = (self._cpu_mark[1] - cpu) / ((now - wall) * self._cpus)
+        latencies, self._latencies = self._latencies, []
+        if len(latencies) < MIN_SAMPLES:
+            return
+        latency = float(np.percentile(latencies, 90))
+
+        if latency > self.budget_ms or cpu_share > CPU_HIGH:
+            self._calm = 0
+            reason = "latency" if latency > self.budget_ms else "cpu"
+            self._step(+1, reason, latency, cpu_share)
+        elif latency < HEADROOM * self.budget_ms and cpu_share < CPU_LOW:
+            self._calm += 1
+            if self._calm >= UPGRADE_AFTER:
+                self._calm = 0
+                self._step(-1, "headroom", latency, cpu_share)
+        else:
+            self._calm = 0
+
+    def _step(self, direction, reason, latency, cpu_share):
+        level = min(max(self.level + direction, 0), len(self.ladder) - 1)
+        if level == self.level:
+            return
+        entry = {
+            "t_s": round(time.perf_counter() - self._t0, 1),
+            "from": self.level,
+            "to": level,
+            "reason": reason,
+            "p90_ms": round(latency, 1),
+            "cpu": round(cpu_share, 2),
+        }
+        self.level = level
+        self._apply()
+        self.log.append(entry)
+        if self.verbose:
+            search, crop, interval, fps = self.ladder[level]
+            print(f"Adaptive: level {entry['from']} -> {level} ({reason}: p90 {entry['p90_ms']} ms, "
+                  f"cpu {entry['cpu']:.0%}) search {search} crop {crop} "
+                  f"interval {interval * 1000:.0f} ms preview {fps} fps")
+
+    def _apply(self):
+        search, crop, interval, fps = self.ladder[self.level]
+        if self.roi_tracker:
+            self.roi_tracker.resize(search, crop)
+        if self.scheduler is not None:
+            self.scheduler.min_interval_s = interval
+        self.preview_fps = fps
+
+    def stats(self):
+        return {
+            "budget_ms": self.budget_ms,
+            "level": self.level,
+            "settings": dict(zip(("search", "crop", "interval_s", "preview_fps"), self.ladder[self.level])),
+            "adjustments": len(self.log),
+            "log": self.log,
+        }
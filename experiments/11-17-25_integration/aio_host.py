@@ -0,0 +1,387 @@
+"""asyncio host runtime: camera, recognizer, serial and GUI on one event loop.
+
+Started with integrate_gui.py --asyncio. Everything except the blocking
+camera read runs on the loop thread, so pipeline state, serial writes and
+Tk are never touched from two threads:
+
+    camera      capture.grab() in a one-thread executor (it blocks on the
+                sensor); gating, recording and offering run on the loop
+    inference   newest-frame slot + in-flight limit; recognize_async
+                results come back via call_soon_threadsafe
+    serial      loop.add_reader() on the port fd; frames parsed per wake-up
+                and STATE coalesced (newest wins); IMU frames go to the
+                ImuRing in one write per wake-up. Writes go out immediately
+                (write_timeout=0), and ack timeouts are loop timers
+    imu         optional ImuGestureClassifier batch every CLASSIFY_INTERVAL_S
+    gui         Tk events pumped every GUI_TICK_S; each new STATE calls
+                app.notify(), which re-renders only changed widgets, at
+                most once per frame; no after() polling. The camera task
+                hands the GUI preview a frame at most PREVIEW_FPS a second
+
+No sleep sits on the data path. A frame is offered the moment grab()
+returns, submitted the moment a recognizer slot frees, and written the
+moment its result is handled. Backpressure is explicit: one pending
+frame (newer replaces older), max_in_flight submissions, and stale
+in-flight entries reclaimed after stale_after.
+
+Each task is cancelled on shutdown (Ctrl-C, window closed, --seconds,
+camera error). The summary adds loop-lag, GUI render and result-handler
+percentiles to the usual layout summary, so scheduling can be measured.
+"""
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from imu_classifier import CLASSIFY_INTERVAL_S
+from multiproc import add_classifier_summary, layout_summary
+from protocol import ACK_TIMEOUT_S
+from serial_reader import StateMailbox
+from tracing import RollingWindow
+from startup import bring_up
+from vision import annotate, create_recognizer, open_camera, recognizer_submit, MODEL_PATH, PREVIEW_FPS
+
+GUI_TICK_S = 1 / 60
+LAG_PROBE_S = 0.1
+
+
+class AsyncHost:
+    def __init__(self, pipeline, link=None, gui_factory=None, frame_size=(320, 240),
+                 max_in_flight=1, stale_after=0.5, model_path=MODEL_PATH,
+                 record_path=None, trace_path=None, show=False, imu=None, imu_classifier=None,
+                 preview=None, engine="recognizer"):
+        self.pipeline = pipeline
+        self.link = link
+        self.gui_factory = gui_factory
+        self.frame_size = frame_size
+        self.max_in_flight = max_in_flight
+        self.stale_after = stale_after
+        self.model_path = model_path
+        self.record_path = record_path
+        self.trace_path = trace_path
+        self.show = show
+        self.preview = preview  # SharedFrame the GUI's preview panel reads
+        self.engine = engine
+        self.min_interval_s = 0.0  # inference stride; pipeline.controller may raise it
+        self._next_submit = 0.0
+        self._interval_timer = None
+        self._next_preview = 0.0
+        self.imu = imu
+        self.imu_classifier = imu_classifier
+        self.mailbox = StateMailbox()
+
+        # Newest frame not yet submitted, copied out of the capture pool (whose
+        # buffers are recycled while it waits). submit() runs on the loop, so
+        # one buffer is enough
+        self._slot = np.empty((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+        self._slot_ts = None
+        self._last_ts = -1
+        self._in_flight = {}       # ts -> submit perf_counter
+        self._slot_or_done = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._stale_timer = None
+        self._ack_timer = None
+        self._app = None
+
+        # Same keys as InferenceScheduler.stats() so layout_summary works
+        self.offered = self.superseded = self.submitted = 0
+        self.inferred = self.dropped = 0
+        self.avg_latency_ms = 0.0
+        self.latency_histogram = None
+        self.frames = 0
+
+        self.loop_lag = RollingWindow()
+        self.result_handler = RollingWindow()
+
+    # --------------------------
+    # Scheduler interface for GesturePipeline
+    # --------------------------
+    def complete(self, timestamp_ms):
+        started = self._in_flight.pop(timestamp_ms, None)
+        if started is not None:
+            latency = (time.perf_counter() - started) * 1000
+            if self.inferred:
+                self.avg_latency_ms += 0.1 * (latency - self.avg_latency_ms)
+            else:
+                self.avg_latency_ms = latency
+            self.inferred += 1
+            if self.latency_histogram:
+                self.latency_histogram.observe(latency)
+        # Results arrive in timestamp order, anything older was skipped
+        for ts in [ts for ts in self._in_flight if ts < timestamp_ms]:
+            del self._in_flight[ts]
+            self.dropped += 1
+        self._slot_or_done.set()
+
+    @property
+    def idle(self):
+        """True if an offered frame would be submitted now, as InferenceScheduler.idle."""
+        return len(self._in_flight) < self.max_in_flight and time.perf_counter() >= self._next_submit
+
+    def stats(self):
+        return {
+            "offered": self.offered,
+            "superseded": self.superseded,
+            "submitted": self.submitted,
+            "inferred": self.inferred,
+            "dropped": self.dropped,
+            "in_flight": len(self._in_flight),
+            "avg_latency_ms": round(self.avg_latency_ms, 1),
+        }
+
+    # --------------------------
+    # Tasks
+    # --------------------------
+    async def _camera(self, capture, executor):
+        loop = asyncio.get_running_loop()
+        pipeline = self.pipeline
+        while True:
+            frame = await loop.run_in_executor(executor, capture.grab)
+            self.frames += 1
+            timestamp_ms = capture.last_sensor_ns // 1_000_000
+            if pipeline.recorder:
+                pipeline.recorder.append(frame, timestamp_ms, capture.last_sensor_ns)
+            if pipeline.should_infer(frame):
+                self.offered += 1
+                if self._slot_ts is not None:
+                    self.superseded += 1
+                np.copyto(self._slot, frame)
+                self._slot_ts = timestamp_ms
+                self._slot_or_done.set()
+            controller = pipeline.controller
+            if controller:
+                controller.tick()
+            if self.preview is not None and loop.time() >= self._next_preview:
+                self._next_preview = loop.time() + (controller.preview_period if controller
+                                                    else 1.0 / PREVIEW_FPS)
+                self.preview.publish(frame, timestamp_ms, pipeline.latest_gesture)
+            if self.show:
+                # HighGUI stays on the camera thread, as in the threaded layout
+                if await loop.run_in_executor(executor, self._show, capture, frame):
+                    self._stopping.set()
+
+    def _show(self, capture, frame):
+        """Runs on the camera thread; True when 'q' was pressed."""
+        import cv2
+        cv2.imshow("Gesture Live", annotate(capture, frame, self.pipeline.latest_gesture))
+        return cv2.waitKey(1) & 0xFF == ord("q")
+
+    async def _inference(self, submit):
+        while True:
+            await self._slot_or_done.wait()
+            self._slot_or_done.clear()
+            self._reclaim_stale()
+            if self._slot_ts is None or len(self._in_flight) >= self.max_in_flight:
+                self._arm_stale_check()
+                continue
+            wait = self._next_submit - time.perf_counter()
+            if wait > 0:
+                self._arm_interval(wait)
+                continue
+            # MediaPipe requires strictly increasing timestamps (as InferenceScheduler)
+            timestamp_ms = max(self._slot_ts, self._last_ts + 1)
+            self._last_ts = timestamp_ms
+            self._slot_ts = None
+            self._in_flight[timestamp_ms] = time.perf_counter()
+            self._next_submit = self._in_flight[timestamp_ms] + self.min_interval_s
+            self.submitted += 1
+            submit(self._slot, timestamp_ms)
+
+    def _arm_interval(self, delay):
+        if self._interval_timer is not None:
+            return
+
+        def fire():
+            self._interval_timer = None
+            self._slot_or_done.set()
+
+        self._interval_timer = asyncio.get_running_loop().call_later(delay, fire)
+
+    def _arm_stale_check(self):
+        # Wake for the stale check even if no result ever comes
+        if not self._in_flight or self._stale_timer is not None:
+            return
+
+        def fire():
+            self._stale_timer = None
+            self._slot_or_done.set()
+
+        delay = min(self._in_flight.values()) + self.stale_after - time.perf_counter()
+        self._stale_timer = asyncio.get_running_loop().call_later(max(0.0, delay), fire)
+
+    def _reclaim_stale(self):
+        now = time.perf_counter()
+        for ts in [ts for ts, t in self._in_flight.items() if now - t > self.stale_after]:
+            # LIVE_STREAM may skip inputs without a callback
+            del self._in_flight[ts]
+            self.dropped += 1
+
+    def _on_result(self, result, timestamp_ms):
+        start = time.perf_counter()
+        self.pipeline.handle_result(result, timestamp_ms)
+        self.result_handler.add((time.perf_counter() - start) * 1000)
+        if self.link is not None and self.link.pending and self._ack_timer is None:
+            self._ack_timer = asyncio.get_running_loop().call_later(ACK_TIMEOUT_S, self._watch_acks)
+
+    def _on_serial_readable(self):
+        port = self.link.port
+        try:
+            data = port.read(port.in_waiting or 1)
+        except Exception as e:
+            print(f"Serial read error: {e}")
+            asyncio.get_running_loop().remove_reader(port.fileno())
+            return
+        newest = None
+        imu = []
+        for kind, payload in self.link.feed(data):
+            if kind == "STATE":
+                newest = payload
+            elif kind == "IMU":
+                imu.append(payload)
+        if imu and self.imu is not None:
+            self.imu.extend(imu)
+        if newest is not None:
+            self.mailbox.put(newest)
+            if self.pipeline.tracer:
+                self.pipeline.tracer.state(newest)
+            if self._app is not None:
+                self._app.notify()
+
+    def _watch_acks(self):
+        # Ack timeouts are loop timers, not a polling reader
+        self._ack_timer = None
+        self.link.feed(b"")
+        if self.link.pending:
+            self._ack_timer = asyncio.get_running_loop().call_later(ACK_TIMEOUT_S, self._watch_acks)
+
+    async def _gui(self, app):
+        while True:
+            start = time.perf_counter()
+            try:
+                app.update()
+            except Exception:
+                return  # window closed
+            await asyncio.sleep(max(0.0, GUI_TICK_S - (time.perf_counter() - start)))
+
+    async def _classify(self):
+        # A few windows per batch; well under a millisecond of loop time
+        while True:
+            await asyncio.sleep(CLASSIFY_INTERVAL_S)
+            self.imu_classifier.process()
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + LAG_PROBE_S
+            await asyncio.sleep(LAG_PROBE_S)
+            self.loop_lag.add((loop.time() - due) * 1000)
+
+    # --------------------------
+    # Run
+    # --------------------------
+    async def run(self, seconds=None):
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, self._stopping.set)
+
+        def result_callback(result, output_image, timestamp_ms):
+            loop.call_soon_threadsafe(self._on_result, result, timestamp_ms)
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="camera")
+        recognizer = picam2 = stopper = None
+        tasks = []
+        start = time.perf_counter()
+        # Startup shares the shutdown path, so a failed bring-up closes whatever came up
+        try:
+            try:
+                # Model load and camera bring-up overlap (both mostly wait in C)
+                opened = await loop.run_in_executor(None, lambda: bring_up(
+                    recognizer=lambda: create_recognizer(result_callback, self.model_path,
+                                                         self.pipeline.num_hands, self.engine),
+                    camera=lambda: open_camera(self.frame_size),
+                ))
+            except Exception as e:
+                results = getattr(e, "results", {})
+                recognizer = results.get("recognizer")
+                picam2 = results.get("camera", (None,))[0]
+                raise
+            recognizer, (picam2, capture) = opened["recognizer"], opened["camera"]
+            self.pipeline.scheduler = self
+            self.pipeline.capture = capture
+            if self.pipeline.metrics:
+                self.latency_histogram = self.pipeline.metrics.inference_ms
+            if self.pipeline.controller:
+                self.pipeline.controller.attach(self)
+            if self.record_path:
+                from recording import SessionRecorder
+                self.pipeline.recorder = SessionRecorder(self.record_path, self.frame_size)
+
+            tasks = [
+                asyncio.create_task(self._camera(capture, executor), name="camera"),
+                asyncio.create_task(self._inference(recognizer_submit(recognizer, self.pipeline)),
+                                    name="inference"),
+                asyncio.create_task(self._probe_lag(), name="lag"),
+            ]
+            if self.link is not None:
+                loop.add_reader(self.link.port.fileno(), self._on_serial_readable)
+            if self.imu_classifier is not None:
+                tasks.append(asyncio.create_task(self._classify(), name="imu"))
+            if self.gui_factory:
+                from queue_hardware import QueueHardware
+                self._app = self.gui_factory(QueueHardware(self.mailbox))
+                tasks.append(asyncio.create_task(self._gui(self._app), name="gui"))
+            stopper = asyncio.create_task(self._stopping.wait(), name="stop")
+            tasks.append(stopper)
+
+            start = time.perf_counter()
+            done, _ = await asyncio.wait(tasks, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stopper and not task.cancelled() and task.exception():
+                    print(f"{task.get_name()} task failed:", task.exception())
+        finally:
+            elapsed = time.perf_counter() - start
+            for task in tasks:
+                task.cancel()
+            for timer in (self._stale_timer, self._ack_timer, self._interval_timer):
+                if timer:
+                    timer.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            loop.remove_signal_handler(signal.SIGINT)
+            if self.link is not None:
+                loop.remove_reader(self.link.port.fileno())
+            # A grab() still blocked in the executor returns within one frame
+            executor.shutdown(wait=True)
+            if recognizer is not None:
+                recognizer.close()
+            if self.pipeline.recorder:
+                self.pipeline.recorder.close()
+            if stopper is not None:  # startup got as far as running
+                self.pipeline.print_stats(self.trace_path)
+            if self.show:
+                import cv2
+                cv2.destroyAllWindows()
+            if picam2 is not None:
+                picam2.close()
+            if self._app is not None:
+                try:
+                    self._app.destroy()
+                except Exception:
+                    pass
+
+        vision_stats = {
+            "frames": self.frames,
+            "elapsed_s": round(elapsed, 2),
+            "camera_fps": round(self.frames / elapsed, 2) if elapsed else 0.0,
+            "inference_fps": round(self.inferred / elapsed, 2) if elapsed else 0.0,
+            **self.stats(),
+        }
+        summary = layout_summary("asyncio", vision_stats, self.pipeline)
+        summary["loop_lag_ms"] = self.loop_lag.percentiles()
+        if self._app is not None:
+            summary["gui_render"] = self._app.render_stats()
+        summary["result_handler_ms"] = self.result_handler.percentiles()
+        summary["states_stale"] = self.mailbox.stale
+        if self.imu_classifier is not None:
+            add_classifier_summary(summary, self.imu_classifier.stats())
+        return summary
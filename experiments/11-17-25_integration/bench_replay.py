@@ -0,0 +1,291 @@
+"""Offline replay benchmark for the gesture pipeline.
+
+Feeds recorded frames through the same GesturePipeline the integrate scripts
+use (motion gate, ROI crop, debouncer), with a MediaPipe recognizer in VIDEO
+mode and a fake serial port that records what would have been sent. Runs
+anywhere cv2 and mediapipe are installed; no camera or Teensy needed.
+
+    python bench_replay.py clip.mp4
+    python bench_replay.py frames_dir/ --realtime --json run.json
+    python bench_replay.py clip.mp4 --baseline run.json
+    python bench_replay.py session.gstrec      (recording.py, zero-copy)
+    python bench_replay.py session.gstrec --hands 2 --baseline one_hand.json
+    python bench_replay.py session.gstrec --engine landmarks --baseline stock.json
+    python bench_replay.py session.gstrec --swipes      (swipe count + detection latency)
+
+Timestamps are derived from the frame index and --fps, so at max speed the
+command sequence is identical run to run, and its digest can be compared
+across commits. --realtime paces frames at --fps and always takes the newest
+frame that is due, skipping the rest. That matches the live latest-frame-wins
+scheduler.
+
+Every report lists the gesture seen on each inferred frame. --baseline
+prints how often the two runs agree on the frames both inferred, so a run
+of the stock recognizer is the reference for another engine's accuracy.
+"""
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from landmark_classifier import make_landmark_engine
+from pipeline import build_pipeline
+from recording import open_recording
+
+MODEL_PATH = Path(__file__).parent / "gesture_recognizer.task"
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp"}
+
+
+# ==========================
+# Frame Sources
+# ==========================
+def load_frames(path, size=None, max_frames=None):
+    """Decode a video file or a directory of images into RGB frames.
+
+    Session recordings are memory-mapped instead, and their frames are views
+    of the file. Returns (frames, fps); fps is None when the source doesn't say.
+    """
+    path = Path(path)
+    frames = []
+    fps = None
+
+    if path.suffix == ".gstrec" and size is None:
+        rec = open_recording(path)
+        order = rec.order()[:max_frames]
+        return [rec.frames[slot] for slot in order], rec.fps()
+
+    def keep(bgr):
+        if size is not None and (bgr.shape[1], bgr.shape[0]) != tuple(size):
+            bgr = cv2.resize(bgr, tuple(size), interpolation=cv2.INTER_AREA)
+        frames.append(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+        return max_frames is None or len(frames) < max_frames
+
+    if path.is_dir():
+        for f in sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES):
+            if not keep(cv2.imread(str(f))):
+                break
+    else:
+        video = cv2.VideoCapture(str(path))
+        fps = video.get(cv2.CAP_PROP_FPS) or None
+        while True:
+            ok, bgr = video.read()
+            if not ok or not keep(bgr):
+                break
+        video.release()
+    if not frames:
+        raise SystemExit(f"No frames found in {path}")
+    return frames, fps
+
+
+# ==========================
+# Engines
+# ==========================
+def make_recognizer(model_path=MODEL_PATH, num_hands=1):
+    """Stock MediaPipe GestureRecognizer in VIDEO mode: (rgb, ts) -> result."""
+    import mediapipe as mp
+
+    options = mp.tasks.vision.GestureRecognizerOptions(
+        base_options=mp.tasks.BaseOptions(model_asset_path=str(model_path)),
+        running_mode=mp.tasks.vision.RunningMode.VIDEO,
+        num_hands=num_hands,
+    )
+    recognizer = mp.tasks.vision.GestureRecognizer.create_from_options(options)
+
+    def run(rgb, timestamp_ms):
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(rgb))
+        return recognizer.recognize_for_video(image, timestamp_ms)
+
+    run.close = recognizer.close
+    return run
+
+
+ENGINES = {
+    "recognizer": make_recognizer,
+    "landmarks": make_landmark_engine,  # HandLandmarker + NumPy centroids (landmark_classifier.py)
+}
+
+
+# ==========================
+# Fake Serial
+# ==========================
+class FakeSerial:
+    """Records every write with the replay timestamp it happened at."""
+
+    def __init__(self):
+        self.now_ms = 0
+        self.writes = []
+
+    def write(self, data):
+        for byte in data:
+            self.writes.append((self.now_ms, byte))
+        return len(data)
+
+
+# ==========================
+# Replay
+# ==========================
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p = np.percentile(np.asarray(values), (50, 95, 99))
+    return {"p50": round(float(p[0]), 3), "p95": round(float(p[1]), 3), "p99": round(float(p[2]), 3)}
+
+
+def replay(frames, engine, pipeline, sink, fps=30.0, realtime=False):
+    interval_ms = 1000.0 / fps
+    latencies = []
+    gestures = []
+    gated = late = 0
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    i = 0
+    while i < len(frames):
+        if realtime:
+            due = int((time.perf_counter() - wall_start) * 1000 / interval_ms)
+            if due > i:
+                # Newest due frame wins, like the live scheduler
+                late += min(due, len(frames) - 1) - i
+                i = min(due, len(frames) - 1)
+            elif due < i:
+                time.sleep((i * interval_ms) / 1000 - (time.perf_counter() - wall_start))
+
+        frame = frames[i]
+        timestamp_ms = int(round(i * interval_ms))
+        sink.now_ms = timestamp_ms
+
+        # Frame time, not wall time, drives the gate's max_idle_s pass
+        if pipeline.should_infer(frame, timestamp_ms / 1000):
+            start = time.perf_counter()
+            image = pipeline.prepare(frame, timestamp_ms)
+            result = engine(image, timestamp_ms)
+            pipeline.handle_result(result, timestamp_ms)
+            latencies.append((time.perf_counter() - start) * 1000)
+            gestures.append([timestamp_ms, pipeline.latest_gesture])
+        else:
+            gated += 1
+        i += 1
+
+    wall_s = time.perf_counter() - wall_start
+    cpu_s = time.process_time() - cpu_start
+    commands = [[ts, code] for ts, code in sink.writes]
+    return {
+        "frames": len(frames),
+        "inferred": len(latencies),
+        "gated": gated,
+        "late": late,
+        "wall_s": round(wall_s, 3),
+        "throughput_fps": round(len(frames) / wall_s, 2) if wall_s else None,
+        "cpu_s": round(cpu_s, 3),
+        "cpu_ms_per_frame": round(cpu_s * 1000 / len(frames), 3),
+        "latency_ms": _percentiles(latencies),
+        "commands": commands,
+        "commands_digest": hashlib.sha1(json.dumps(commands).encode()).hexdigest()[:12],
+        "gestures": gestures,
+        "debouncer": ({deck: d.stats() for deck, d in pipeline.deck_debouncers.items()}
+                      if pipeline.deck_debouncers else pipeline.debouncer.stats()),
+        **({"swipes": pipeline.swipe.stats()} if pipeline.swipe else {}),
+    }
+
+
+def compare(report, baseline):
+    print("\n--- vs baseline ---")
+    same = report["commands_digest"] == baseline["commands_digest"]
+    print("commands:", "identical" if same else
+          f"DIFFERENT ({baseline['commands_digest']} -> {report['commands_digest']})")
+    for key in ("throughput_fps", "cpu_ms_per_frame"):
+        old, new = baseline.get(key), report.get(key)
+        if old and new:
+            print(f"{key}: {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+    for q in ("p50", "p95", "p99"):
+        old, new = baseline["latency_ms"].get(q), report["latency_ms"].get(q)
+        if old and new:
+            print(f"latency {q}: {old} -> {new} ms ({(new - old) / old * 100:+.1f}%)")
+
+    # Per-frame agreement; with the stock recognizer as baseline this is accuracy
+    reference = dict(map(tuple, baseline.get("gestures", [])))
+    pairs = [(reference[ts], g) for ts, g in report["gestures"] if ts in reference]
+    if pairs:
+        same = sum(a == b for a, b in pairs)
+        print(f"gesture agreement: {same / len(pairs) * 100:.1f}% of {len(pairs)} frames")
+        confused = {}
+        for a, b in pairs:
+            if a != b:
+                confused[(a, b)] = confused.get((a, b), 0) + 1
+        for (a, b), n in sorted(confused.items(), key=lambda kv: -kv[1])[:5]:
+            print(f"  {a} -> {b}: {n}")
+
+
+def print_report(report):
+    for key in ("engine", "hands", "source", "frames", "inferred", "gated", "late", "wall_s",
+                "throughput_fps", "cpu_s", "cpu_ms_per_frame"):
+        if key in report:
+            print(f"{key:<18}{report[key]}")
+    lat = report["latency_ms"]
+    print(f"{'latency ms':<18}p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}")
+    print(f"{'debouncer':<18}{report['debouncer']}")
+    if "swipes" in report:
+        swipes = report["swipes"]
+        lat = swipes["latency_ms"]
+        print(f"{'swipes':<18}{swipes['detected']}")
+        print(f"{'swipe latency ms':<18}p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  "
+              f"(onset -> decision, sensor time; update p95 {swipes['update_us']['p95']} us)")
+    print(f"{'commands':<18}{len(report['commands'])} (digest {report['commands_digest']})")
+    for ts, code in report["commands"]:
+        print(f"  {ts:>8} ms  -> {code}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded frames through the gesture pipeline")
+    parser.add_argument("source", help="video file or directory of images")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="recognizer")
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--fps", type=float, help="frame rate (default: from the video, else 30)")
+    parser.add_argument("--size", type=int, nargs=2, metavar=("W", "H"), help="resize frames")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--realtime", action="store_true", help="pace at --fps instead of max speed")
+    parser.add_argument("--no-roi", action="store_true")
+    parser.add_argument("--swipes", action="store_true", help="run the swipe detector (swipe.py)")
+    parser.add_argument("--hands", type=int, choices=(1, 2), default=1,
+                        help="2: one hand per deck (pipeline two-hand mode)")
+    parser.add_argument("--motion-threshold", type=float, default=4.0,
+                        help="motion gate threshold (negative disables)")
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--baseline", help="compare against an earlier --json report")
+    args = parser.parse_args()
+
+    frames, source_fps = load_frames(args.source, args.size, args.max_frames)
+    fps = args.fps or source_fps or 30.0
+    height, width = frames[0].shape[:2]
+
+    sink = FakeSerial()
+    pipeline = build_pipeline(
+        sink, (width, height), roi=not args.no_roi,
+        motion_threshold=None if args.motion_threshold < 0 else args.motion_threshold,
+        two_hands=args.hands == 2,
+        swipes=args.swipes,
+        verbose=False,
+    )
+    engine = ENGINES[args.engine](args.model, num_hands=args.hands)
+    try:
+        report = replay(frames, engine, pipeline, sink, fps, args.realtime)
+    finally:
+        engine.close()
+    report = {"engine": args.engine, "hands": args.hands, "source": str(args.source), "fps": fps,
+              "realtime": args.realtime, **report}
+
+    print_report(report)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
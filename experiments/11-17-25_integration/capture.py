@@ -0,0 +1,268 @@
+"""Pooled capture path from Picamera2 to MediaPipe.
+
+Picamera2 names formats the way libcamera does, by word order, so "RGB888"
+frames are actually B,G,R in memory. That is why the integrate scripts had to
+cvtColor every frame before handing it to MediaPipe. Asking for "BGR888"
+gives R,G,B bytes that MediaPipe's SRGB image format takes directly.
+
+Frames are copied once out of the camera buffer into a small ring of
+preallocated arrays. Only the frames that are actually shown get converted
+back to BGR and mirrored, into two more preallocated buffers.
+
+Run this file directly for a before/after report:
+    python capture.py --frames 300            (Pi camera)
+    python capture.py --frames 300 --synthetic
+
+FinalSubmission/src/integrate.py is the submitted snapshot and stays
+frozen, so it keeps the old capture_array + cvtColor + flip loop. The
+report's "before" step (_legacy_step) is that loop. The integrate scripts
+here are the ones on the pooled path.
+"""
+import argparse
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# "BGR888" is R,G,B in memory -> MediaPipe SRGB without conversion
+MEDIAPIPE_FORMAT = "BGR888"
+# What the scripts used to request (B,G,R in memory)
+LEGACY_FORMAT = "RGB888"
+CAPTURE_SIZE = (320, 240)
+
+
+# ==========================
+# Buffer Pool
+# ==========================
+class FramePool:
+    """Fixed ring of preallocated frame buffers.
+
+    A buffer is handed out again after `count` more acquires, so anything
+    that keeps a frame longer than that has to copy it, or take it out of
+    the ring with exchange(). mp.Image copies its input, so recognize_async
+    is safe with the default size.
+    """
+
+    def __init__(self, size, count=4, channels=3):
+        width, height = size
+        self.buffers = [
+            np.empty((height, width, channels), dtype=np.uint8)
+            for _ in range(count)
+        ]
+        self.index = 0
+
+    def acquire(self):
+        buf = self.buffers[self.index]
+        self.index = (self.index + 1) % len(self.buffers)
+        return buf
+
+    def exchange(self, buf, spare):
+        """Take `buf` out of the ring, putting `spare` (same shape) in its place.
+
+        Call from the thread that acquires. Returns False if `buf` is not a
+        pool buffer.
+        """
+        for i, held in enumerate(self.buffers):
+            if held is buf:
+                self.buffers[i] = spare
+                return True
+        return False
+
+
+# ==========================
+# Capture Path
+# ==========================
+class PooledCapture:
+    """Grabs RGB frames into a FramePool and converts only on demand."""
+
+    def __init__(self, picam2, size=CAPTURE_SIZE, pool_size=4, mapped=None):
+        self.picam2 = picam2
+        self.size = size
+        self.pool = FramePool(size, pool_size)
+        width, height = size
+        self._display = np.empty((height, width, 3), dtype=np.uint8)
+        self._mirror = np.empty((height, width, 3), dtype=np.uint8)
+
+        if mapped is None:
+            mapped = getattr(picam2, "mapped", None)
+        if mapped is None:
+            from picamera2 import MappedArray
+            mapped = MappedArray
+        self._mapped = mapped
+
+        self.frames = 0
+        self.converted = 0
+        self.last_sensor_ns = 0
+
+    def configure(self):
+        self.picam2.configure(
+            self.picam2.create_preview_configuration(
+                main={"format": MEDIAPIPE_FORMAT, "size": self.size}
+            )
+        )
+
+    def grab(self):
+        """Return the next frame (RGB, unflipped) in a pool buffer.
+
+        The exposure time (CLOCK_MONOTONIC ns) is left in last_sensor_ns.
+        """
+        width, height = self.size
+        request = self.picam2.capture_request()
+        try:
+            metadata = request.get_metadata()
+            self.last_sensor_ns = metadata.get("SensorTimestamp") or time.monotonic_ns()
+            with self._mapped(request, "main") as m:
+                frame = self.pool.acquire()
+                np.copyto(frame, m.array[:height, :width, :3])
+        finally:
+            request.release()
+        self.frames += 1
+        return frame
+
+    def display_frame(self, frame):
+        """BGR, mirrored copy of `frame` for cv2.imshow (reused buffer)."""
+        import cv2
+        cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=self._display)
+        cv2.flip(self._display, 1, dst=self._mirror)
+        self.converted += 1
+        return self._mirror
+
+
+# ==========================
+# Synthetic Camera (off-Pi)
+# ==========================
+class _SyntheticRequest:
+    def __init__(self, array):
+        self.array = array
+
+    def make_array(self, name):
+        return self.array.copy()
+
+    def get_metadata(self):
+        return {"SensorTimestamp": time.monotonic_ns()}
+
+    def release(self):
+        pass
+
+
+class SyntheticCamera:
+    """Minimal Picamera2 stand-in serving a moving gradient."""
+
+    def __init__(self, size=CAPTURE_SIZE):
+        width, height = size
+        self.size = size
+        ramp = np.linspace(0, 255, width, dtype=np.float32)
+        self._base = np.broadcast_to(ramp[None, :, None], (height, width, 3)).astype(np.uint8)
+        self._buffer = np.empty_like(self._base)
+        self._tick = 0
+
+    def create_preview_configuration(self, main=None, **kwargs):
+        return {"main": main}
+
+    def configure(self, config):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _next(self):
+        self._tick = (self._tick + 3) % 256
+        np.add(self._base, self._tick, out=self._buffer, casting="unsafe")
+        return self._buffer
+
+    def capture_array(self, name="main"):
+        return self._next().copy()
+
+    def capture_request(self):
+        return _SyntheticRequest(self._next())
+
+    @staticmethod
+    @contextmanager
+    def mapped(request, name):
+        yield request
+
+
+# ==========================
+# Before/After Report
+# ==========================
+def _legacy_step(picam2, display):
+    import cv2
+    frame = picam2.capture_array()
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame_flipped = cv2.flip(frame, 1)
+    return [frame, frame_rgb, frame_flipped]
+
+
+def _pooled_step(capture, display):
+    frame = capture.grab()
+    if display:
+        return [frame, capture.display_frame(frame)]
+    return [frame]
+
+
+def _run(step, target, frames, display_every, known=()):
+    allocations = 0
+    start = time.perf_counter()
+    for i in range(frames):
+        outputs = step(target, display_every and i % display_every == 0)
+        for out in outputs:
+            if not any(np.shares_memory(out, k) for k in known):
+                allocations += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "fps": frames / elapsed if elapsed else 0.0,
+        "allocations": allocations,
+        "alloc_per_frame": allocations / frames,
+    }
+
+
+def compare_paths(picam2, frames=300, display_every=1, size=CAPTURE_SIZE):
+    """Time the old capture_array/cvtColor/flip loop against PooledCapture.
+
+    A frame-sized allocation is any returned array that does not live in one
+    of the pool or display buffers.
+    """
+    picam2.configure(
+        picam2.create_preview_configuration(main={"format": LEGACY_FORMAT, "size": size})
+    )
+    picam2.start()
+    legacy = _run(_legacy_step, picam2, frames, display_every)
+    picam2.stop()
+
+    capture = PooledCapture(picam2, size)
+    capture.configure()
+    picam2.start()
+    known = capture.pool.buffers + [capture._display, capture._mirror]
+    pooled = _run(_pooled_step, capture, frames, display_every, known)
+    return legacy, pooled
+
+
+def print_report(legacy, pooled):
+    print(f"{'path':<8}{'fps':>10}{'allocs':>10}{'allocs/frame':>15}")
+    for name, r in (("legacy", legacy), ("pooled", pooled)):
+        print(f"{name:<8}{r['fps']:>10.1f}{r['allocations']:>10d}{r['alloc_per_frame']:>15.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture path before/after report")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--display-every", type=int, default=1,
+                        help="convert for display every N frames (0 = headless)")
+    parser.add_argument("--synthetic", action="store_true", help="no camera, use a gradient")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        camera = SyntheticCamera()
+    else:
+        from picamera2 import Picamera2
+        camera = Picamera2()
+    try:
+        print_report(*compare_paths(camera, args.frames, args.display_every))
+    finally:
+        camera.close()
@@ -0,0 +1,101 @@
+"""Confidence-aware debouncing between the recognizer and the serial port.
+
+A gesture becomes a command only after it has scored at least `min_score`
+in `confirm` of the last `window` results. Once active it stays active
+while it scores above the lower `release_score` (hysteresis), and it is
+released only when "no gesture" is confirmed the same way. Each command
+also has a cooldown, so a held toggle can't fire twice in quick succession.
+Releases are not sent; the Teensy ignores code 0 anyway.
+
+Timestamps come from the recognizer callback, so replaying recorded results
+through update() gives the same decisions and delay figures as live.
+"""
+from collections import deque
+
+from gestures import code_for
+
+# Toggles and track skips are expensive to repeat by accident. 10-15 (IMU
+# volume / pitch / crossfade steps, also swipe up / down) match the sketch's
+# GESTURE_COOLDOWN_MS
+DEFAULT_COOLDOWNS_S = {1: 0.3, 2: 0.3, 3: 1.5, 4: 1.0, 5: 1.5, 6: 1.5, 7: 1.0, 8: 0.3,
+                       10: 0.5, 11: 0.5, 12: 0.5, 13: 0.5, 14: 0.5, 15: 0.5}
+
+
+class GestureDebouncer:
+    """Per-gesture N-of-M confirmation with score hysteresis and cooldowns.
+
+    Counters:
+        emitted      commands returned for sending
+        low_score    results ignored for being under the score threshold
+        rejected     candidates that left the window without confirming
+        cooldown     confirmed changes held back by a cooldown (per result)
+    """
+
+    def __init__(self, min_score=0.6, release_score=0.4, confirm=3, window=5,
+                 cooldowns=None, default_cooldown_s=0.3, codes=None):
+        self.min_score = min_score
+        self.codes = codes  # gesture -> code; None uses gestures.code_for
+        self.release_score = release_score
+        self.confirm = confirm
+        self.cooldowns = dict(DEFAULT_COOLDOWNS_S if cooldowns is None else cooldowns)
+        self.default_cooldown_s = default_cooldown_s
+
+        self.active = 0
+        self._history = deque(maxlen=window)
+        self._first_seen = {}  # code -> timestamp_ms it entered the window
+        self._confirmed = set()  # codes that reached `confirm` while in the window
+        self._last_sent = {}   # code -> timestamp_ms it was last emitted
+
+        self.emitted = 0
+        self.low_score = 0
+        self.rejected = 0
+        self.cooldown = 0
+        self._delays_ms = deque(maxlen=256)
+
+    def update(self, gesture, score, timestamp_ms):
+        """Feed one recognizer result. Returns a code to send, or None."""
+        code = code_for(gesture) if self.codes is None else self.codes.get(gesture, 0)
+        needed = self.release_score if code == self.active else self.min_score
+        if code and score < needed:
+            code = 0
+            self.low_score += 1
+
+        self._first_seen.setdefault(code, timestamp_ms)
+        self._history.append(code)
+        for old in [c for c in self._first_seen if c not in self._history]:
+            del self._first_seen[old]
+            if old not in self._confirmed:
+                self.rejected += 1
+            self._confirmed.discard(old)
+
+        if self._history.count(code) < self.confirm:
+            return None
+        self._confirmed.add(code)
+        if code == self.active:
+            return None
+
+        if code == 0:
+            self.active = 0
+            return None
+
+        last = self._last_sent.get(code)
+        if last is not None and timestamp_ms - last < self.cooldowns.get(code, self.default_cooldown_s) * 1000:
+            self.cooldown += 1
+            return None
+
+        self.active = code
+        self._last_sent[code] = timestamp_ms
+        self._delays_ms.append(timestamp_ms - self._first_seen.get(code, timestamp_ms))
+        self.emitted += 1
+        return code
+
+    def stats(self):
+        delays = list(self._delays_ms)
+        return {
+            "emitted": self.emitted,
+            "low_score": self.low_score,
+            "rejected": self.rejected,
+            "cooldown": self.cooldown,
+            "avg_confirm_ms": round(sum(delays) / len(delays), 1) if delays else 0.0,
+            "max_confirm_ms": max(delays) if delays else 0,
+        }
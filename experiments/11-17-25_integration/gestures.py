@@ -0,0 +1,61 @@
+"""Gesture names from the MediaPipe recognizer and their Teensy command codes.
+
+The codes match the switch in loop() of the firmware sketches; 0 means
+"no actionable gesture" and is never acted on by the Teensy. IMU_GESTURE_CODES
+are the wrist gestures imu_classifier.py recognizes from the IMU stream,
+SWIPE_GESTURE_CODES the hand motions swipe.py tracks across frames.
+"""
+
+GESTURE_CODES = {
+    "Open_Palm": 1,    # PLAY Deck A
+    "Closed_Fist": 2,  # STOP Deck A
+    "Victory": 3,      # EQ mode toggle
+    "Pointing_Up": 4,  # next song Deck A
+    "Thumb_Up": 5,     # mixer mode toggle
+    "Thumb_Down": 6,   # tempo mode toggle / stop Deck B
+}
+
+
+# Codes 10-15 are handleGesture() cases added for the host classifier; shake
+# and twist reuse the track-skip codes
+IMU_GESTURE_CODES = {
+    "Roll_Right": 10,    # volume up
+    "Roll_Left": 11,     # volume down
+    "Tilt_Forward": 12,  # pitch up
+    "Tilt_Back": 13,     # pitch down
+    "Push_Left": 14,     # crossfade focus Deck A (mixer mode)
+    "Push_Right": 15,    # crossfade focus Deck B (mixer mode)
+    "Shake": 4,          # next song Deck A
+    "Twist": 7,          # next song Deck B
+}
+
+
+# Dynamic gestures from swipe.py (directions as the user sees them). Swipe
+# right skips Deck A's track, as the README promises. Every code here is
+# shared with another source: 4 / 7 with Pointing_Up and Shake / Twist, and
+# 10 / 11 with the IMU volume rolls. 10 / 11 exist only in teensy_gui.ino;
+# the other sketches have no case for them, so up / down do nothing there.
+# Swipes skip the debouncer, so pipeline.py holds each one to the code's
+# debounce.DEFAULT_COOLDOWNS_S since that code was last sent, whoever sent it
+SWIPE_GESTURE_CODES = {
+    "Swipe_Right": 4,   # next song Deck A
+    "Swipe_Left": 7,    # next song Deck B
+    "Swipe_Up": 10,     # volume up
+    "Swipe_Down": 11,   # volume down
+}
+
+
+# Two-hand mode: each hand drives its own deck (pipeline.py assigns hands to
+# decks). Code 8 is the handleGesture() case added for "play Deck B". Victory
+# and Thumb_Up act on the whole mixer from either hand; Thumb_Down is
+# dropped, since Deck B's hand stops Deck B with a fist.
+DECK_GESTURE_CODES = {
+    "A": {"Open_Palm": 1, "Closed_Fist": 2, "Pointing_Up": 4, "Victory": 3, "Thumb_Up": 5},
+    "B": {"Open_Palm": 8, "Closed_Fist": 6, "Pointing_Up": 7, "Victory": 3, "Thumb_Up": 5},
+}
+GLOBAL_CODES = {3, 5}
+
+
+def code_for(gesture):
+    return (GESTURE_CODES.get(gesture) or IMU_GESTURE_CODES.get(gesture)
+            or SWIPE_GESTURE_CODES.get(gesture, 0))
@@ -0,0 +1,272 @@
+"""Host-side wrist gesture classifier over the Teensy's raw IMU stream.
+
+The sketches decide IMU gestures one filtered sample at a time: a per-axis
+threshold on the iirf() output (handleGyroControls,
+handleLinearGesturesForCrossfade) plus a global GESTURE_COOLDOWN_MS. That
+cannot tell a shake from a push, and every new gesture grows loop() next to
+the audio deadlines. Here the Pi classifies sliding windows of the raw
+stream (imu_stream.ImuRing) instead:
+
+    window   WINDOW_SAMPLES (~290 ms at 80 Hz), one every STEP_SAMPLES
+    batch    every CLASSIFY_INTERVAL_S all new windows are stacked with
+             sliding_window_view and featurised in one NumPy pass
+    features mean gyro x / y / z, first accel-y lobe over threshold,
+             accel RMS and lobes past a deadband
+    scores   one column per gesture, feature / threshold (1.0 = at threshold)
+    decide   best gesture -> GestureDebouncer (N-of-M, per-code cooldowns)
+             -> global cooldown like the sketch's -> sink.write(code)
+
+The commands are IMU_GESTURE_CODES (gestures.py). With
+TeensyLink(binary=True, host_gestures=True) the sketch stops applying its
+own thresholds, so a gesture is never applied twice.
+
+To compare against the firmware, the same batch also replays the sketch's
+rule on the filtered channels carried in each IMU frame. Every host decision
+is matched to the nearest rule firing of the same gesture:
+vs_firmware_ms < 0 means the host decided earlier in sensor time.
+Unmatched decisions count as host_only; shake and twist are always
+host_only, since the rule cannot express them. The rule replay ignores
+mixer mode; handleGesture() applies that gate to both.
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from debounce import GestureDebouncer
+from imu_stream import CHANNELS, THRESHOLDS
+from tracing import RollingWindow
+
+WINDOW_SAMPLES = 24
+STEP_SAMPLES = 4
+CLASSIFY_INTERVAL_S = 0.05
+GESTURE_COOLDOWN_S = 0.5  # GESTURE_COOLDOWN_MS in teensy_gui.ino
+MATCH_S = 0.5             # max sensor-time gap when pairing with a rule firing
+
+# Same units as the stream (the sketch uses 6.0 for every threshold)
+FEATURE_THRESHOLDS = {
+    "roll": 6.0,          # mean gyro x over the window
+    "tilt": 6.0,          # mean gyro y
+    "twist": 6.0,         # |mean gyro z|
+    "push": 6.0,          # first accel-y lobe (accelerate, then brake)
+    "shake_rms": 4.0,     # accel x/y RMS
+    "shake_level": 4.0,   # deadband: smaller swings (noise) are not lobes
+    "shake_lobes": 4,     # lobes past +/- shake_level on one axis in a window
+}
+
+GESTURES = ("Roll_Right", "Roll_Left", "Tilt_Forward", "Tilt_Back",
+            "Push_Right", "Push_Left", "Twist", "Shake")
+
+# Host gesture -> the sketch rule that does the same thing (filtered channel, sign)
+FIRMWARE_RULE = {
+    "Roll_Right": ("fgx", 1), "Roll_Left": ("fgx", -1),
+    "Tilt_Forward": ("fgy", 1), "Tilt_Back": ("fgy", -1),
+    "Push_Right": ("fay", 1), "Push_Left": ("fay", -1),
+}
+
+# A gesture is a deliberate motion: confirm it over 2 of 3 hops (~50 ms)
+IMU_COOLDOWNS_S = {10: 0.5, 11: 0.5, 12: 0.5, 13: 0.5, 14: 0.5, 15: 0.5, 4: 1.0, 7: 1.0}
+
+_AX, _AY, _GX, _GY, _GZ = (CHANNELS.index(c) for c in ("ax", "ay", "gx", "gy", "gz"))
+
+
+def window_scores(windows):
+    """(k, channels, WINDOW_SAMPLES) raw windows -> (k, len(GESTURES)) scores."""
+    th = FEATURE_THRESHOLDS
+    gyro = windows[:, (_GX, _GY, _GZ)].mean(axis=2)
+
+    # Push: sign of the first accel-y lobe over threshold, so the braking lobe
+    # in the same window doesn't read as the opposite push
+    ay = windows[:, _AY]
+    rows = np.arange(len(ay))
+    hi_i, lo_i = ay.argmax(axis=1), ay.argmin(axis=1)
+    hi, lo = ay[rows, hi_i], ay[rows, lo_i]
+    hi_ok, lo_ok = hi >= th["push"], -lo >= th["push"]
+    push = np.where(hi_ok & (~lo_ok | (hi_i < lo_i)), hi,
+                    np.where(lo_ok, lo, np.where(hi > -lo, hi, lo)))
+
+    # Shake: strong and oscillating on either horizontal axis. A push has two
+    # lobes (accelerate, brake), a shake several
+    horiz = windows[:, (_AX, _AY)]
+    rms = np.sqrt((horiz ** 2).mean(axis=2))
+    lobes = sum(np.count_nonzero(np.diff((sign * horiz > th["shake_level"]).astype(np.int8), axis=2) == 1,
+                                 axis=2) for sign in (1, -1))
+    shake = np.minimum(rms / th["shake_rms"], lobes / th["shake_lobes"]).max(axis=1)
+    # A shake is a train of pushes; don't let its lobes win as one
+    push = np.where(shake >= 1.0, 0.0, push)
+
+    scores = np.column_stack((
+        gyro[:, 0] / th["roll"], -gyro[:, 0] / th["roll"],
+        gyro[:, 1] / th["tilt"], -gyro[:, 1] / th["tilt"],
+        push / th["push"], -push / th["push"],
+        np.abs(gyro[:, 2]) / th["twist"],
+        shake,
+    ))
+    return np.clip(scores, 0.0, None)
+
+
+class ImuGestureClassifier:
+    """Batches IMU windows from an ImuRing into debounced Teensy commands.
+
+    Call process() periodically (start() runs it on a thread; AsyncHost
+    calls it from a loop task). `sink` has write(bytes) like the pipeline's.
+    """
+
+    def __init__(self, ring, sink, debouncer=None, on_command=None, verbose=True):
+        self.ring = ring
+        self.sink = sink
+        self.debouncer = debouncer or GestureDebouncer(
+            min_score=0.5, release_score=0.35, confirm=2, window=3, cooldowns=IMU_COOLDOWNS_S)
+        self.on_command = on_command
+        self.verbose = verbose
+        self._next_end = WINDOW_SAMPLES - 1  # sample index ending the next window
+        self._rule_next = 0                  # next sample the firmware rule replays
+        self._last_sent_s = -np.inf
+        self._rule_last_s = -np.inf
+        self._host_events = deque()          # (t_s, gesture) awaiting a rule match
+        self._rule_events = deque()
+        self._min_offset_s = np.inf          # host clock - sensor clock, transport floor
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.windows = 0
+        self.sent = 0
+        self.held = 0
+        self.matched = 0
+        self.host_only = 0
+        self.firmware_only = 0
+        self.batch_ms = RollingWindow()
+        self.host_delay_ms = RollingWindow()
+        self.vs_firmware_ms = RollingWindow()
+
+    # --------------------------
+    # Running
+    # --------------------------
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop.wait(CLASSIFY_INTERVAL_S):
+            self.process()
+
+    # --------------------------
+    # One batch
+    # --------------------------
+    def process(self):
+        """Classify every window completed since the last call. Returns the codes sent."""
+        total = self.ring.total
+        if total <= self._next_end:
+            return []
+        start = time.perf_counter()
+        first = min(self._next_end - WINDOW_SAMPLES + 1, self._rule_next)
+        t, data = self.ring.latest(total - first)
+        first = total - len(t)  # the ring may have lapped a stalled classifier
+        if len(t) < WINDOW_SAMPLES:
+            return []
+        self._min_offset_s = min(self._min_offset_s, time.monotonic() - t[-1])
+
+        self._replay_rule(t[max(0, self._rule_next - first):], data[max(0, self._rule_next - first):])
+        self._rule_next = total
+
+        offset = max(self._next_end - first, WINDOW_SAMPLES - 1) - (WINDOW_SAMPLES - 1)
+        windows = sliding_window_view(data[offset:], WINDOW_SAMPLES, axis=0)[::STEP_SAMPLES]
+        ends = t[offset + WINDOW_SAMPLES - 1::STEP_SAMPLES][:len(windows)]
+        self._next_end = first + offset + WINDOW_SAMPLES - 1 + len(windows) * STEP_SAMPLES
+        self.windows += len(windows)
+
+        scores = window_scores(windows)
+        best = scores.argmax(axis=1)
+        sent = []
+        for t_end, g, score in zip(ends, best, scores[np.arange(len(best)), best]):
+            gesture = GESTURES[g] if score >= 1.0 else None
+            code = self.debouncer.update(gesture, min(1.0, score / 2), int(t_end * 1000))
+            if code is None:
+                continue
+            if t_end - self._last_sent_s < GESTURE_COOLDOWN_S:
+                self.held += 1
+                continue
+            self._last_sent_s = t_end
+            self._send(code, gesture, t_end)
+            sent.append(code)
+
+        self._match(t[-1])
+        self.batch_ms.add((time.perf_counter() - start) * 1000)
+        return sent
+
+    def _send(self, code, gesture, t_end):
+        if self.sink:
+            try:
+                self.sink.write(bytes([code]))
+            except Exception as e:
+                print("Serial write failed:", e)
+                return
+        self.sent += 1
+        self._host_events.append((t_end, gesture))
+        # Wall-clock age of the deciding sample, minus the best transport delay seen
+        self.host_delay_ms.add((time.monotonic() - t_end - self._min_offset_s) * 1000)
+        if self.on_command:
+            self.on_command(code)
+        if self.verbose:
+            print(f"IMU gesture: {gesture} -> {code}")
+
+    # --------------------------
+    # Firmware comparison
+    # --------------------------
+    def _replay_rule(self, t, data):
+        """The sketch's decision on the filtered channels: largest |f|/threshold over 1, then cooldown."""
+        if not len(t):
+            return
+        names = list(THRESHOLDS)
+        cols = [CHANNELS.index(n) for n in names]
+        ratio = data[:, cols] / np.array([THRESHOLDS[n][0] for n in names], dtype=np.float32)
+        over = np.flatnonzero((np.abs(ratio) > 1.0).any(axis=1))
+        candidates = t[over]
+        pos = np.searchsorted(candidates, self._rule_last_s + GESTURE_COOLDOWN_S)
+        while pos < len(over):
+            i = over[pos]
+            channel = int(np.abs(ratio[i]).argmax())
+            sign = 1 if ratio[i, channel] > 0 else -1
+            gesture = next(g for g, rule in FIRMWARE_RULE.items() if rule == (names[channel], sign))
+            self._rule_events.append((t[i], gesture))
+            self._rule_last_s = t[i]
+            pos = np.searchsorted(candidates, t[i] + GESTURE_COOLDOWN_S)
+
+    def _match(self, now_s):
+        # Host decisions older than MATCH_S can no longer gain a partner
+        while self._host_events and self._host_events[0][0] < now_s - MATCH_S:
+            t_host, gesture = self._host_events.popleft()
+            pair = min((e for e in self._rule_events
+                        if e[1] == gesture and abs(e[0] - t_host) <= MATCH_S),
+                       key=lambda e: abs(e[0] - t_host), default=None)
+            if pair is None:
+                self.host_only += 1
+                continue
+            self._rule_events.remove(pair)
+            self.matched += 1
+            self.vs_firmware_ms.add((t_host - pair[0]) * 1000)
+        while self._rule_events and self._rule_events[0][0] < now_s - 2 * MATCH_S:
+            self._rule_events.popleft()
+            self.firmware_only += 1
+
+    def stats(self):
+        return {
+            "windows": self.windows,
+            "sent": self.sent,
+            "held_by_cooldown": self.held,
+            "matched": self.matched,
+            "host_only": self.host_only,
+            "firmware_only": self.firmware_only,
+            "vs_firmware_ms": self.vs_firmware_ms.percentiles(),
+            "host_delay_ms": self.host_delay_ms.percentiles(),
+            "batch_ms": self.batch_ms.percentiles(),
+            "debouncer": self.debouncer.stats(),
+        }
@@ -0,0 +1,339 @@
+"""Offline NumPy model of the firmware IMU control path, for parameter sweeps.
+
+Mirrors the IMU half of loop() in experiments/finalversionforreport.ino:
+updateFilters() (iirf low-pass on linear accel and gyro), then, by mode,
+
+    normal  handleGyroControls         gyro x -> volume +/-0.05 [0, 1]
+                                       gyro y -> pitch  +/-0.05 [0.3, 2.5]
+    mixer   handleLinearGesturesForCrossfade   accel y -> focus A / B
+    eq      handleEQControls           gyro x / gyro y / accel y -> band dB +/-1 [-12, 12]
+                                       (confirms every call, change or not)
+    tempo   handleTempoControls        gyro x -> playback rate +/-0.05 [0.5, 2.0]
+
+each gated by readyForGesture() / GESTURE_COOLDOWN_MS. The quirks are kept
+on purpose: readyForGesture() is checked once per handler, so volume and
+pitch can both step in the same read.
+
+The control logic is sequential in time (filter state, cooldown), so the
+loop runs over samples. Each step is vectorised over a (param combos x
+sessions) grid, so a sweep of a few thousand combinations over a handful of
+recorded sessions is one pass. Sessions of different lengths are padded and
+masked. sweep() can also split the combinations across a process pool.
+
+Sessions are ImuRing.dump() files (.npz, written when IMU_LOG_PATH is set
+in integrate_gui.py) or Serial Monitor captures of the old `IMU:ax,...,gz`
+printf, which are assumed to be IMU_POLL_MS apart.
+
+    python imu_sim.py session1.npz session2.npz --sweep alpha_gyro=0.08:0.4:9 vol_thresh=4,6,8
+    python imu_sim.py capture.txt --mode eq --sweep eq_accel_thresh=0.5:3:6 --workers 4 --json eq.json
+
+Per combination it reports step counts, events per minute and reaction_ms:
+the time from the raw signal crossing a threshold to the controller acting
+on it. That is the responsiveness the alphas trade against noise.
+"""
+import argparse
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from imu_stream import CHANNELS
+
+IMU_POLL_MS = 12
+MODES = {"normal": 0, "mixer": 1, "eq": 2, "tempo": 3}
+
+# Constants of finalversionforreport.ino
+FIRMWARE_DEFAULTS = {
+    "alpha_accel": 0.22,
+    "alpha_gyro": 0.16,
+    "vol_thresh": 6.0,
+    "pitch_thresh": 6.0,
+    "xfade_thresh": 6.0,
+    "eq_gyro_thresh": 6.0,
+    "eq_accel_thresh": 1.0,
+    "tempo_thresh": 6.0,
+    "cooldown_ms": 500.0,
+}
+
+# Event counters reported per combination
+ACTIONS = ("vol_up", "vol_down", "pitch_up", "pitch_down", "focus_a", "focus_b",
+           "eq_up", "eq_down", "eq_calls", "tempo_up", "tempo_down")
+
+_RAW = [CHANNELS.index(c) for c in ("ax", "ay", "az", "gx", "gy", "gz")]
+
+
+# ==========================
+# Sessions
+# ==========================
+class Session:
+    """One recorded IMU log: t_ms (n,), raw (n, 6) = lin accel xyz, gyro xyz, mode (n,) int."""
+
+    def __init__(self, name, t_ms, raw, mode):
+        self.name = name
+        self.t_ms = np.asarray(t_ms, dtype=np.float64)
+        self.raw = np.asarray(raw, dtype=np.float32)
+        self.mode = np.broadcast_to(np.asarray(mode, dtype=np.int8), self.t_ms.shape)
+
+    @property
+    def minutes(self):
+        return (self.t_ms[-1] - self.t_ms[0]) / 60000 if len(self.t_ms) > 1 else 0.0
+
+
+def load_session(path, mode="normal"):
+    """ImuRing.dump() .npz, or a text capture of `IMU:ax,ay,az,gx,gy,gz` lines."""
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as log:
+            data = log["data"]
+            t_ms = log["t"] * 1000.0
+            modes = log["mode"] if "mode" in log.files else MODES[mode]
+        return Session(path.stem, t_ms, data[:, _RAW], modes)
+    rows = []
+    with open(path, errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("IMU:"):
+                try:
+                    rows.append([float(v) for v in line[4:].split(",")][:6])
+                except ValueError:
+                    continue
+    raw = np.array(rows, dtype=np.float32).reshape(-1, 6)
+    return Session(path.stem, np.arange(len(raw)) * float(IMU_POLL_MS), raw, MODES[mode])
+
+
+def _stack(sessions):
+    """Pad sessions to one (s, n) time base; `valid` masks the padding."""
+    n = max(len(s.t_ms) for s in sessions)
+    t = np.zeros((len(sessions), n))
+    raw = np.zeros((len(sessions), n, 6), dtype=np.float32)
+    mode = np.zeros((len(sessions), n), dtype=np.int8)
+    valid = np.zeros((len(sessions), n), dtype=bool)
+    for i, s in enumerate(sessions):
+        k = len(s.t_ms)
+        t[i, :k], raw[i, :k], mode[i, :k], valid[i, :k] = s.t_ms, s.raw, s.mode, True
+    return t, raw, mode, valid
+
+
+# ==========================
+# Parameter grids
+# ==========================
+def parse_range(spec):
+    """'0.1:0.4:7' -> linspace, '4,6,8' -> list, '6' -> [6]."""
+    if ":" in spec:
+        lo, hi, num = spec.split(":")
+        return np.linspace(float(lo), float(hi), int(num))
+    return np.array([float(v) for v in spec.split(",")])
+
+
+def grid(**sweeps):
+    """Cartesian product of the swept values; unswept params keep FIRMWARE_DEFAULTS.
+
+    Returns {param: (p,) array}.
+    """
+    for key in sweeps:
+        if key not in FIRMWARE_DEFAULTS:
+            raise ValueError(f"unknown parameter {key!r}; one of {', '.join(FIRMWARE_DEFAULTS)}")
+    axes = [np.atleast_1d(sweeps.get(k, v)) for k, v in FIRMWARE_DEFAULTS.items()]
+    combos = np.array(list(itertools.product(*axes)), dtype=np.float64).reshape(-1, len(axes))
+    return {k: combos[:, i] for i, k in enumerate(FIRMWARE_DEFAULTS)}
+
+
+# ==========================
+# Simulation
+# ==========================
+def _step(value, up, down, amount, lo, hi):
+    return np.clip(value + amount * (up.astype(np.float32) - down), lo, hi)
+
+
+def simulate(sessions, params):
+    """Run every parameter combination over every session.
+
+    `params` is a grid() dict of (p,) arrays. Returns {metric: (p, s) array}:
+    one counter per ACTIONS entry, the final volume / pitch / rate / eq dB,
+    and reaction_ms (mean raw-crossing -> action delay, NaN if none).
+    """
+    t, raw, mode, valid = _stack(sessions)
+    p = len(next(iter(params.values())))
+    s, n = valid.shape
+    col = {k: np.asarray(v, dtype=np.float32)[:, None] for k, v in params.items()}  # (p, 1)
+
+    shape = (p, s)
+    accel = np.zeros(shape + (3,), dtype=np.float32)
+    gyro = np.zeros(shape + (3,), dtype=np.float32)
+    last_gesture = np.full(shape, -np.inf)
+    volume = np.full(shape, 0.4, dtype=np.float32)
+    pitch = np.full(shape, 1.0, dtype=np.float32)
+    rate = np.full(shape, 1.0, dtype=np.float32)
+    eq_db = np.zeros(shape + (3,), dtype=np.float32)
+    counts = {a: np.zeros(shape, dtype=np.int64) for a in ACTIONS}
+    # Raw onset per axis (gx, gy, ay): when |raw| last rose past the threshold in use
+    onset = np.full(shape + (3,), np.nan)
+    above = np.zeros(shape + (3,), dtype=bool)
+    reaction_sum = np.zeros(shape)
+    reaction_n = np.zeros(shape)
+
+    a_accel, a_gyro = col["alpha_accel"][..., None], col["alpha_gyro"][..., None]
+    cooldown = col["cooldown_ms"]
+    for i in range(n):
+        live = valid[:, i]                     # (s,)
+        now = t[:, i]                          # (s,)
+        x = raw[:, i]                          # (s, 6)
+        m = mode[:, i]
+        is_mixer, is_eq, is_tempo = m == 1, m == 2, m == 3
+        is_normal = ~(is_mixer | is_eq | is_tempo)
+
+        # updateFilters(); padding leaves the state untouched
+        accel += np.where(live[:, None], a_accel * (x[:, :3] - accel), 0)
+        gyro += np.where(live[:, None], a_gyro * (x[:, 3:] - gyro), 0)
+        gx, gy, ay = gyro[..., 0], gyro[..., 1], accel[..., 1]
+
+        # Threshold each axis is compared against in this mode, for reaction_ms
+        th_gx = np.where(is_eq, col["eq_gyro_thresh"], np.where(is_tempo, col["tempo_thresh"],
+                                                                col["vol_thresh"]))
+        th_gy = np.where(is_eq, col["eq_gyro_thresh"], col["pitch_thresh"])
+        th_ay = np.where(is_eq, col["eq_accel_thresh"], col["xfade_thresh"])
+        thresholds = np.stack((th_gx, th_gy, th_ay), axis=-1)
+        raw_axes = np.abs(x[:, (3, 4, 1)])      # (s, 3)
+        now_above = raw_axes[None] > thresholds
+        onset = np.where(now_above & ~above, now[None, :, None], onset)
+        above = now_above
+
+        ready = live & (now - last_gesture >= cooldown)
+        acted = np.zeros(shape + (3,), dtype=bool)
+
+        # handleGyroControls (normal)
+        g = ready & is_normal
+        vol_up, vol_down = g & (gx > col["vol_thresh"]), g & (gx < -col["vol_thresh"])
+        pitch_up, pitch_down = g & (gy > col["pitch_thresh"]), g & (gy < -col["pitch_thresh"])
+        volume = _step(volume, vol_up, vol_down, 0.05, 0.0, 1.0)
+        pitch = _step(pitch, pitch_up, pitch_down, 0.05, 0.3, 2.5)
+        acted[..., 0] |= vol_up | vol_down
+        acted[..., 1] |= pitch_up | pitch_down
+
+        # handleLinearGesturesForCrossfade (mixer)
+        g = ready & is_mixer
+        focus_b, focus_a = g & (ay > col["xfade_thresh"]), g & (ay < -col["xfade_thresh"])
+        acted[..., 2] |= focus_a | focus_b
+
+        # handleEQControls (eq): every call confirms
+        g = ready & is_eq
+        eq_up = np.zeros(shape, dtype=np.int64)
+        eq_down = np.zeros(shape, dtype=np.int64)
+        for band, (value, thresh) in enumerate(((gx, "eq_gyro_thresh"), (gy, "eq_gyro_thresh"),
+                                                (ay, "eq_accel_thresh"))):
+            up, down = g & (value > col[thresh]), g & (value < -col[thresh])
+            eq_db[..., band] = _step(eq_db[..., band], up, down, 1.0, -12.0, 12.0)
+            acted[..., band] |= up | down
+            eq_up += up
+            eq_down += down
+
+        # handleTempoControls (tempo)
+        g = ready & is_tempo
+        tempo_up, tempo_down = g & (gx > col["tempo_thresh"]), g & (gx < -col["tempo_thresh"])
+        rate = _step(rate, tempo_up, tempo_down, 0.05, 0.5, 2.0)
+        acted[..., 0] |= tempo_up | tempo_down
+
+        confirmed = acted.any(axis=-1) | (ready & is_eq)
+        last_gesture = np.where(confirmed, now, last_gesture)
+        for name, hit in (("vol_up", vol_up), ("vol_down", vol_down), ("pitch_up", pitch_up),
+                          ("pitch_down", pitch_down), ("focus_a", focus_a), ("focus_b", focus_b),
+                          ("eq_up", eq_up), ("eq_down", eq_down),
+                          ("eq_calls", ready & is_eq), ("tempo_up", tempo_up),
+                          ("tempo_down", tempo_down)):
+            counts[name] += hit
+        delay = np.where(acted, now[None, :, None] - onset, np.nan)
+        hit = ~np.isnan(delay)
+        reaction_sum += np.where(hit, delay, 0).sum(axis=-1)
+        reaction_n += hit.sum(axis=-1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        reaction = np.where(reaction_n > 0, reaction_sum / reaction_n, np.nan)
+    return {**counts, "volume": volume, "pitch": pitch, "rate": rate,
+            "eq_low": eq_db[..., 0], "eq_mid": eq_db[..., 1], "eq_high": eq_db[..., 2],
+            "reaction_ms": reaction}
+
+
+def _simulate_chunk(args):
+    sessions, params = args
+    return simulate(sessions, params)
+
+
+def sweep(sessions, params, workers=None, chunk=None):
+    """simulate() with the combinations split across a process pool (workers > 1)."""
+    p = len(next(iter(params.values())))
+    if not workers or workers <= 1 or p < 2:
+        return simulate(sessions, params)
+    chunk = chunk or -(-p // workers)
+    parts = [{k: v[i:i + chunk] for k, v in params.items()} for i in range(0, p, chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_simulate_chunk, [(sessions, part) for part in parts]))
+    return {k: np.concatenate([r[k] for r in results]) for k in results[0]}
+
+
+# ==========================
+# Report
+# ==========================
+def summarize(sessions, params, results):
+    """One row per combination, aggregated over sessions."""
+    minutes = sum(s.minutes for s in sessions) or float("nan")
+    swept = [k for k, v in params.items() if len(np.unique(v)) > 1]
+    events = sum(results[a] for a in ACTIONS if a != "eq_calls").sum(axis=1)
+    rows = []
+    for i in range(len(events)):
+        reaction = results["reaction_ms"][i]
+        row = {k: round(float(params[k][i]), 4) for k in swept}
+        row["events"] = int(events[i])
+        row["events_per_min"] = round(float(events[i] / minutes), 2)
+        row["reaction_ms"] = (round(float(np.nanmean(reaction)), 1)
+                              if not np.all(np.isnan(reaction)) else None)
+        for a in ACTIONS:
+            row[a] = int(results[a][i].sum())
+        rows.append(row)
+    return rows
+
+
+def print_rows(rows, sort=None, top=None):
+    if sort:
+        rows = sorted(rows, key=lambda r: (r[sort] is None, r[sort]))
+    rows = rows[:top] if top else rows
+    if not rows:
+        return
+    widths = {k: max(10, len(k) + 2) for k in rows[0]}
+    print("".join(f"{k:>{w}}" for k, w in widths.items()))
+    for row in rows:
+        print("".join(f"{str(row[k]):>{w}}" for k, w in widths.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the firmware IMU controls over recorded logs")
+    parser.add_argument("logs", nargs="+", help=".npz from ImuRing.dump() or IMU: text captures")
+    parser.add_argument("--mode", choices=MODES, default="normal",
+                        help="control mode for logs that don't record one")
+    parser.add_argument("--sweep", nargs="*", default=[], metavar="PARAM=SPEC",
+                        help=f"lo:hi:num or a,b,c; params: {', '.join(FIRMWARE_DEFAULTS)}")
+    parser.add_argument("--workers", type=int, default=1, help="processes for large grids")
+    parser.add_argument("--sort", default=None, help="column to sort by (e.g. reaction_ms)")
+    parser.add_argument("--top", type=int, default=None)
+    parser.add_argument("--json", help="write all rows here")
+    args = parser.parse_args()
+
+    sessions = [load_session(p, args.mode) for p in args.logs]
+    sweeps = dict(spec.split("=", 1) for spec in args.sweep)
+    params = grid(**{k: parse_range(v) for k, v in sweeps.items()})
+    p = len(params["cooldown_ms"])
+    samples = sum(len(s.t_ms) for s in sessions)
+    print(f"{len(sessions)} sessions, {samples} samples, {p} combinations")
+
+    start = time.perf_counter()
+    results = sweep(sessions, params, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {p * samples:,} sample-steps in {elapsed:.2f} s")
+
+    rows = summarize(sessions, params, results)
+    print_rows(rows, sort=args.sort, top=args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
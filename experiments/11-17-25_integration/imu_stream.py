@@ -0,0 +1,122 @@
+"""Teensy IMU stream: NumPy ring buffer and min/max decimation for plotting.
+
+With TeensyLink(binary=True, imu=True) the sketch sends one IMU frame per
+BNO055 read (IMU_POLL_MS = 12, so ~80 Hz): raw linear acceleration and
+gyro, plus the IIR-filtered values its gesture thresholds compare against. The serial
+reader appends each batch to an ImuRing with one vectorised write. The GUI
+reads the newest window and draws it through minmax_decimate(), so a frame
+costs O(plot width) whatever the sample rate.
+
+The ring has a single writer and lock-free readers. The sample count is
+bumped only after the samples are written, so a reader never sees
+unwritten slots. A writer that laps a slow reader can overwrite the oldest
+samples mid-copy; for a plot that is harmless. With shared=True the buffer
+lives in multiprocessing.shared_memory, so the serial process can write
+and the GUI process read (see multiproc.py). dump() saves what the ring
+holds as an .npz session for imu_sim.py.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+CHANNELS = ("ax", "ay", "az", "gx", "gy", "gz", "fax", "fay", "faz", "fgx", "fgy", "fgz")
+IMU_RING_SAMPLES = 4096  # ~50 s at 80 Hz
+MAX_RATE_HZ = 200        # upper bound used to size a window read
+
+# Mirrors the consts in teensy_gui.ino; these are what the plots overlay.
+# channel -> (threshold, what crossing it does)
+THRESHOLDS = {
+    "fay": (6.0, "crossfade (XFADE_THRESH, mixer mode)"),
+    "fgx": (6.0, "volume (VOL_THRESH)"),
+    "fgy": (6.0, "pitch (PITCH_THRESH)"),
+}
+
+
+class ImuRing:
+    """Fixed-size ring of IMU samples: t (s, float64) and CHANNELS (float32)."""
+    HEADER_BYTES = 8  # total samples written (int64)
+
+    def __init__(self, capacity=IMU_RING_SAMPLES, name=None, shared=False):
+        self.capacity = capacity
+        size = self.HEADER_BYTES + capacity * (8 + 4 * len(CHANNELS))
+        self._owner = name is None
+        self.shm = None
+        if shared or name:
+            self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+            buf = self.shm.buf
+        else:
+            buf = bytearray(size)
+        self.name = self.shm.name if self.shm else None
+        self._count = np.ndarray((1,), dtype=np.int64, buffer=buf)
+        self._t = np.ndarray((capacity,), dtype=np.float64, buffer=buf, offset=self.HEADER_BYTES)
+        self._data = np.ndarray((capacity, len(CHANNELS)), dtype=np.float32, buffer=buf,
+                                offset=self.HEADER_BYTES + capacity * 8)
+        if self._owner:
+            self._count[0] = 0
+
+    @property
+    def total(self):
+        return int(self._count[0])
+
+    def extend(self, samples):
+        """Append decode_imu() tuples (t_ms first) in one vectorised write."""
+        if not samples:
+            return
+        block = np.asarray(samples, dtype=np.float64)[-self.capacity:]
+        count = int(self._count[0]) + len(samples)
+        idx = (count - len(block) + np.arange(len(block))) % self.capacity
+        self._t[idx] = block[:, 0] / 1000.0
+        self._data[idx] = block[:, 1:]
+        self._count[0] = count
+
+    def latest(self, n):
+        """Copy of the newest n samples in time order: (t, data[n, channels])."""
+        count = int(self._count[0])
+        n = min(n, count, self.capacity)
+        idx = (count - n + np.arange(n)) % self.capacity
+        return self._t[idx], self._data[idx]
+
+    def window(self, seconds):
+        """Samples from the last `seconds` of sensor time."""
+        t, data = self.latest(int(seconds * MAX_RATE_HZ))
+        if len(t):
+            start = np.searchsorted(t, t[-1] - seconds)
+            t, data = t[start:], data[start:]
+        return t, data
+
+    def dump(self, path):
+        """Save the buffered samples (t in s, data[n, CHANNELS]) as .npz; returns the count."""
+        t, data = self.latest(self.capacity)
+        np.savez(path, t=t, data=data, channels=np.array(CHANNELS))
+        return len(t)
+
+    def close(self):
+        if self.shm is None:
+            return
+        del self._count, self._t, self._data
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def minmax_decimate(t, y, buckets):
+    """Reduce (t, y) to at most 2 * buckets points keeping every peak.
+
+    The samples are split into `buckets` equal runs and each run keeps its
+    min and max, in time order. Drawn one bucket per pixel column, the line
+    looks the same as the full-rate one, so a threshold crossing is never
+    decimated away. Leftover samples are dropped from the old end.
+    """
+    n = len(y)
+    if n <= 2 * buckets:
+        return t, y
+    per = n // buckets
+    start = n - per * buckets
+    block = y[start:].reshape(buckets, per)
+    lo = block.argmin(axis=1)
+    hi = block.argmax(axis=1)
+    base = start + np.arange(buckets) * per
+    idx = np.empty(2 * buckets, dtype=np.intp)
+    idx[0::2] = base + np.minimum(lo, hi)
+    idx[1::2] = base + np.maximum(lo, hi)
+    return t[idx], y[idx]
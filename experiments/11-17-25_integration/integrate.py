@@ -1,25 +1,58 @@
-import time
-import cv2
-import mediapipe as mp
-import serial
+# First: starts the launch clock, then loads the heavy modules on background
+# threads while the rest of this script imports
+from startup import prefetch, timer as startup_timer, TTFG_TARGET_S
+prefetch("mediapipe", "picamera2", "cv2")
+
 from pathlib import Path
 from typing import Optional
-from picamera2 import Picamera2
-from gui import run,send_gesture_to_gui
+from capture import CAPTURE_SIZE
+from metrics import HostMetrics, serve_metrics
+from pipeline import build_pipeline
+from protocol import TeensyLink
+from serial_reader import SerialReader
+from telemetry import TelemetryLog
+from vision import run_vision
+try:
+   from gui import send_gesture_to_gui
+except ImportError:
+   send_gesture_to_gui = None
 
 
 # ==========================
 # Serial to Teensy
 # ==========================
-try:
-   teensy = serial.Serial('/dev/ttyACM0', 115200, timeout=0, write_timeout=0)
-   print("✅ Connected to Teensy at /dev/ttyACM1")
-except Exception as e:
-   print("❌ Could not open serial port:", e)
-   teensy = None
-
-
-last_sent_gesture = None  # Only send when gesture changes
+# teensy_emulator.py prints a /dev/pts/N to put here for runs without hardware
+SERIAL_PORT = '/dev/ttyACM0'
+# Framed binary link (protocol.py). Only teensy_gui.ino speaks it; the other
+# sketches read every byte as a gesture code, so a frame header would run as
+# commands there. Leave False unless teensy_gui.ino is flashed
+BINARY_PROTOCOL = False
+# Every command, ack and Teensy STATE (plus deck / song changes) to columnar
+# segment files for replaying a show; python telemetry.py telemetry/ summarizes
+TELEMETRY_DIR: Optional[Path] = None  # e.g. Path(__file__).parent / "telemetry"
+telemetry = None
+teensy = None
+reader = None
+# Live counters + latency histograms, Prometheus text at
+# http://127.0.0.1:METRICS_PORT/metrics (metrics.py); off while None
+METRICS_PORT: Optional[int] = None  # e.g. 9108
+metrics = HostMetrics() if METRICS_PORT else None
+
+def open_teensy():
+   # Runs alongside the model load and camera bring-up (vision.run_vision)
+   global telemetry, teensy, reader
+   try:
+      telemetry = TelemetryLog(TELEMETRY_DIR) if TELEMETRY_DIR else None
+      # Reader thread services acks/retransmits and drains STATE frames
+      teensy = TeensyLink.open(SERIAL_PORT, binary=BINARY_PROTOCOL, telemetry=telemetry)
+      reader = SerialReader(teensy, on_state=pipeline.tracer.state if pipeline.tracer else None).start()
+      if metrics:
+         metrics.bind(link=teensy, reader=reader)
+      print(f"✅ Connected to Teensy at {SERIAL_PORT}")
+      return teensy
+   except Exception as e:
+      print("❌ Could not open serial port:", e)
+      return None
 
 
 # ==========================
@@ -27,15 +60,61 @@ last_sent_gesture = None  # Only send when gesture changes
 # ==========================
 current_directory = Path(__file__).parent
 MODEL_PATH = current_directory / 'gesture_recognizer.task'
-BaseOptions = mp.tasks.BaseOptions
-GestureRecognizer = mp.tasks.vision.GestureRecognizer
-GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
-RunningMode = mp.tasks.vision.RunningMode
-Image = mp.Image
 
 
-_latest_gesture: Optional[str] = None
-processing_frame = False
+INFERENCE_IN_FLIGHT = 1  # concurrent recognize_async calls
+# "recognizer": stock GestureRecognizer. "landmarks": hand landmarks + NumPy
+# centroid classifier (landmark_classifier.py; train the centroids first)
+ENGINE = "recognizer"
+# Crop around the last seen hand, full-frame search when lost. With this on,
+# CAPTURE_SIZE can be raised without growing the image MediaPipe sees.
+ROI_TRACKING = True
+# One hand per deck from the same inference (left hand Deck A, right hand
+# Deck B; see pipeline.py for the per-frame cost)
+TWO_HANDS = False
+# Swipe right / left / up / down from the hand's trajectory (swipe.py)
+SWIPES = True
+# Closed-loop quality: step recognizer input size, inference stride and
+# preview rate to hold capture -> result p90 under LATENCY_BUDGET_MS
+# (adaptive.py; every change is printed). Same constants on a Pi 4, Pi 5 or laptop
+ADAPTIVE = True
+LATENCY_BUDGET_MS = 120.0
+# Skip the recognizer while the scene is static (None to disable)
+MOTION_THRESHOLD: Optional[float] = 4.0
+# Per-stage latency from sensor exposure to Teensy STATE, summarized at exit;
+# TRACE_PATH also dumps every trace
+TRACE_LATENCY = False
+TRACE_PATH: Optional[Path] = None  # e.g. current_directory / "latency_trace.json"
+# Record raw frames + results for replay (bench_replay.py takes .gstrec files)
+RECORD_PATH: Optional[Path] = None  # e.g. current_directory / "session.gstrec"
+# cv2 debug window (annotated, vision.PREVIEW_FPS); off keeps the loop headless
+SHOW_PREVIEW = False
+# Per-phase startup breakdown + time to first gesture vs TTFG_TARGET_S
+# (hold a gesture up to the camera while it boots)
+STARTUP_REPORT = True
+
+
+def on_command(code):
+   startup_timer.first("first_command")
+   if send_gesture_to_gui:
+      send_gesture_to_gui(code)
+
+
+# Recognizer result -> debounced Teensy command (shared with bench_replay.py).
+# The Teensy is attached as the sink once open_teensy() returns.
+pipeline = build_pipeline(
+   None,
+   CAPTURE_SIZE,
+   roi=ROI_TRACKING,
+   motion_threshold=MOTION_THRESHOLD,
+   trace=TRACE_LATENCY,
+   two_hands=TWO_HANDS,
+   swipes=SWIPES,
+   adaptive=ADAPTIVE,
+   budget_ms=LATENCY_BUDGET_MS,
+   metrics=metrics,
+   on_command=on_command,
+)
 
 
 
@@ -44,49 +123,10 @@ processing_frame = False
 # Callback from MediaPipe
 # ==========================
 def print_result(result, output_image, timestamp_ms: int):
-   global _latest_gesture, processing_frame, last_sent_gesture
-
-
-   gesture_code = 0  # default: send nothing (music state unchanged)
-
-
-   if result and result.gestures:
-       gesture = result.gestures[0][0].category_name
-       _latest_gesture = gesture
-
-
-       # ✅ Translate gestures to Teensy command codes
-       if gesture == "Open_Palm":
-           gesture_code = 1   # PLAY
-       elif gesture == "Closed_Fist":
-           gesture_code = 2   # PAUSE
-       elif gesture == "Victory":
-           gesture_code = 3
-       elif gesture == "Pointing_Up":
-           gesture_code = 4
-       elif gesture == "Thumb_Up":
-           gesture_code = 5
-       elif gesture == "Thumb_Down":
-           gesture_code =6
-       else:
-           gesture_code = 0   # No actionable gesture
-   else:
-       _latest_gesture = None
-       gesture_code = 0
-
-
-   # ✅ Only send when gesture CHANGES (prevents USB overload)
-   if gesture_code != last_sent_gesture and teensy:
-       try:
-           teensy.write(bytes([gesture_code]))
-           send_gesture_to_gui(gesture_code)
-           last_sent_gesture = gesture_code
-           print("Sent gesture:", gesture_code)
-       except Exception as e:
-           print("Serial write failed:", e)
-
-
-   processing_frame = False
+   startup_timer.first("first_result")
+   pipeline.handle_result(result, timestamp_ms)
+   if pipeline.latest_gesture not in (None, "None"):
+      startup_timer.first("first_gesture")
 
 
 
@@ -94,87 +134,51 @@ def print_result(result, output_image, timestamp_ms: int):
 # ==========================
 # Main Program
 # ==========================
-def main():
-  
-   global processing_frame
-
-
-   # Gesture Recognizer setup
-   options = GestureRecognizerOptions(
-       base_options=BaseOptions(model_asset_path=MODEL_PATH),
-       running_mode=RunningMode.LIVE_STREAM,
-       result_callback=print_result,
-   )
-  
-   with GestureRecognizer.create_from_options(options) as recognizer:
-
-
-       # Camera Setup
-       picam2 = Picamera2()
-       picam2.configure(
-           picam2.create_preview_configuration(
-               main={"format": "RGB888", "size": (320, 240)}
-           )
-       )
-       picam2.start()
-
-
-       frame_counter = 0
-
+def attach_teensy(opened):
+   pipeline.sink = opened["serial"]
 
-       try:
-           while True:
-              
-               frame = picam2.capture_array()
-               frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-               frame_flipped = cv2.flip(frame, 1)
 
-
-               frame_counter += 1
-
-
-               # ✅ Process frames asynchronously
-               if frame_counter % 1 == 0 and not processing_frame:
-                   processing_frame = True
-                   timestamp_ms = int(time.time() * 1000)
-                   mp_image = Image(
-                       image_format=mp.ImageFormat.SRGB,
-                       data=frame_rgb
-                   )
-                   recognizer.recognize_async(mp_image, timestamp_ms)
-
-
-               # Display current gesture for debugging
-               if _latest_gesture:
-                   cv2.putText(
-                       frame_flipped, _latest_gesture, (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2
-                   )
-
-
-               cv2.imshow("Gesture Live", frame_flipped)
-               if cv2.waitKey(1) & 0xFF == ord("q"):
-                   break
-
-
-       finally:
-           cv2.destroyAllWindows()
-           picam2.close()
+def main():
+   # Camera, recognizer and scheduler live in vision.py (shared with multiproc.py).
+   # Model, camera and serial port come up concurrently.
+   server = None
+   if metrics:
+      try:
+         server = serve_metrics(metrics.bind(pipeline=pipeline), METRICS_PORT)
+      except OSError as e:
+         print("❌ Could not start the metrics endpoint:", e)
+   try:
+      run_vision(
+          pipeline,
+          result_callback=print_result,
+          model_path=MODEL_PATH,
+          engine=ENGINE,
+          frame_size=CAPTURE_SIZE,
+          in_flight=INFERENCE_IN_FLIGHT,
+          record_path=RECORD_PATH,
+          trace_path=TRACE_PATH,
+          show=SHOW_PREVIEW,
+          init_tasks={"serial": open_teensy},
+          on_init=attach_teensy,
+          startup=startup_timer,
+      )
+   finally:
+      if server:
+         server.shutdown()
+      if reader:
+         reader.stop()
+         print("Serial reader:", reader.stats())
+      if teensy:
+         print("Teensy link:", teensy.stats())
+         teensy.close()
+      if telemetry:
+         telemetry.close()
+         print(f"Telemetry: {telemetry.stats()} -> {telemetry.path}")
+      if STARTUP_REPORT:
+         startup_timer.print_report(TTFG_TARGET_S)
 
 
 
 
 if __name__ == '__main__':
    main()
-
-
-
-
-
-
-
-
-
-
-
-
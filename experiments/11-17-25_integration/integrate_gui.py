@@ -1,14 +1,22 @@
-import time
-import cv2
-import mediapipe as mp
-import serial
+import argparse
+import asyncio
 import threading
-import queue
 import json
 import sys
 from pathlib import Path
 from typing import Optional
-from picamera2 import Picamera2
+from capture import CAPTURE_SIZE
+from pipeline import build_pipeline
+from vision import run_vision
+from metrics import HostMetrics, serve_metrics, METRICS_PORT as DEFAULT_METRICS_PORT
+from multiproc import (run_processes, layout_summary, print_layout_summary, add_classifier_summary,
+                       SharedFrame)
+from aio_host import AsyncHost
+from imu_classifier import ImuGestureClassifier
+from imu_stream import ImuRing
+from protocol import TeensyLink
+from serial_reader import SerialReader, StateMailbox
+from telemetry import TelemetryLog
 
 # ==========================
 # GUI Import
@@ -16,217 +24,341 @@ from picamera2 import Picamera2
 # Add python_gui to path
 sys.path.append(str(Path(__file__).parent / "python_gui"))
 from app import GestureAudioApp
+from queue_hardware import QueueHardware
 
 # ==========================
 # Shared Queue & Hardware Interface
 # ==========================
-gui_queue = queue.Queue()
-
-class QueueHardware:
-    def __init__(self):
-        self.state = {
-            "volume": 0.4,
-            "pitch_a": 1.0,
-            "pitch_b": 1.0,
-            "deck_a_playing": False,
-            "deck_b_playing": False,
-            "mixer_mode": False,
-            "echo_enabled": False,
-            "eq_bands": [0.5, 0.5, 0.5],
-            "song_a": "song1.wav",
-            "song_b": "song2.wav"
-        }
-    
-    def update(self):
-        try:
-            while True:
-                msg_type, data = gui_queue.get_nowait()
-                if msg_type == "STATE":
-                    self.state["volume"] = data.get("vol", self.state["volume"])
-                    self.state["pitch_a"] = data.get("pitchA", self.state["pitch_a"])
-                    self.state["pitch_b"] = data.get("pitchB", self.state["pitch_b"])
-                    self.state["deck_a_playing"] = bool(data.get("deckA", self.state["deck_a_playing"]))
-                    self.state["deck_b_playing"] = bool(data.get("deckB", self.state["deck_b_playing"]))
-                    self.state["mixer_mode"] = bool(data.get("mix", self.state["mixer_mode"]))
-                    self.state["echo_enabled"] = bool(data.get("echo", self.state["echo_enabled"]))
-        except queue.Empty:
-            pass
-
-    def get_state(self):
-        return self.state
+# Latest Teensy STATE only; a burst overwrites stale snapshots instead of queueing
+state_mailbox = StateMailbox()
+stop_event = threading.Event()
 
 # ==========================
 # Serial to Teensy
 # ==========================
-try:
-   # Note: integrate.py used /dev/ttyACM0, but print said /dev/ttyACM1. I'll stick to ACM0 but user should verify.
-   teensy = serial.Serial('/dev/ttyACM0', 115200, timeout=0.1, write_timeout=0)
-   print("✅ Connected to Teensy at /dev/ttyACM0")
-except Exception as e:
-   print("❌ Could not open serial port:", e)
-   teensy = None
+# Note: integrate.py used /dev/ttyACM0, but print said /dev/ttyACM1. I'll stick to ACM0 but user should verify.
+SERIAL_PORT = '/dev/ttyACM0'
+# Framed binary link (protocol.py): acked commands, 50 Hz STATE. Only
+# teensy_gui.ino speaks it; the other sketches would run the frame bytes as
+# gesture codes, so the default is the old bare-byte / STATE:{json} text
+# protocol. --binary turns it on
+BINARY_PROTOCOL = False
+# Stream raw + filtered IMU (~80 Hz) and plot it under the mixer with the
+# sketch's gesture thresholds, for tuning them. Needs BINARY_PROTOCOL.
+IMU_STREAM = True
+# Classify wrist gestures on the Pi from the raw IMU stream (imu_classifier.py)
+# and send them as commands; the sketch's own IMU thresholds are switched off.
+IMU_CLASSIFIER = False
+# Save the IMU ring (last IMU_RING_SAMPLES) at exit, for imu_sim.py sweeps
+IMU_LOG_PATH: Optional[Path] = None  # e.g. Path(__file__).parent / "imu_session.npz"
+# Every command, ack and Teensy STATE (plus deck / song changes) to columnar
+# segment files for replaying a show; python telemetry.py telemetry/ summarizes.
+# Off unless set here or with --telemetry DIR
+TELEMETRY_DIR: Optional[Path] = None  # e.g. Path(__file__).parent / "telemetry"
+teensy = None  # opened in run_threads(); --processes opens it in the serial process
+telemetry = None
+# Live counters + latency histograms, Prometheus text at
+# http://127.0.0.1:METRICS_PORT/metrics (metrics.py); off while None, and
+# --metrics [PORT] turns it on. --processes serves vision on METRICS_PORT
+# and serial on METRICS_PORT + 1
+METRICS_PORT: Optional[int] = None  # e.g. 9108
+metrics = HostMetrics() if METRICS_PORT else None
+metrics_server = None
 
-last_sent_gesture = None  # Only send when gesture changes
+def open_teensy():
+   global telemetry
+   try:
+      telemetry = TelemetryLog(TELEMETRY_DIR) if TELEMETRY_DIR else None
+      link = TeensyLink.open(SERIAL_PORT, binary=BINARY_PROTOCOL, imu=IMU_STREAM,
+                             host_gestures=IMU_CLASSIFIER, telemetry=telemetry)
+      print(f"✅ Connected to Teensy at {SERIAL_PORT}")
+      return link
+   except Exception as e:
+      print("❌ Could not open serial port:", e)
+      return None
 
 # ==========================
 # MediaPipe Setup
 # ==========================
 current_directory = Path(__file__).parent
 MODEL_PATH = current_directory / 'gesture_recognizer.task'
-BaseOptions = mp.tasks.BaseOptions
-GestureRecognizer = mp.tasks.vision.GestureRecognizer
-GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
-RunningMode = mp.tasks.vision.RunningMode
-Image = mp.Image
 
-_latest_gesture: Optional[str] = None
-processing_frame = False
+INFERENCE_IN_FLIGHT = 1  # concurrent recognize_async calls
+# "recognizer": stock GestureRecognizer. "landmarks": hand landmarks + NumPy
+# centroid classifier (landmark_classifier.py; train the centroids first)
+ENGINE = "recognizer"
+# Crop around the last seen hand, full-frame search when lost. With this on,
+# CAPTURE_SIZE can be raised without growing the image MediaPipe sees.
+ROI_TRACKING = True
+# One hand per deck from the same inference (left hand Deck A, right hand
+# Deck B; see pipeline.py for the per-frame cost)
+TWO_HANDS = False
+# Swipe right / left / up / down from the hand's trajectory (swipe.py)
+SWIPES = True
+# Closed-loop quality: step recognizer input size, inference stride and
+# preview rate to hold capture -> result p90 under LATENCY_BUDGET_MS
+# (adaptive.py; every change is printed). Same constants on a Pi 4, Pi 5 or laptop
+ADAPTIVE = True
+LATENCY_BUDGET_MS = 120.0
+# Skip the recognizer while the scene is static (None to disable)
+MOTION_THRESHOLD: Optional[float] = 4.0
+# Per-stage latency from sensor exposure to Teensy STATE, summarized at exit;
+# TRACE_PATH also dumps every trace. --trace / --trace-json PATH turn them on
+TRACE_LATENCY = False
+TRACE_PATH: Optional[Path] = None  # e.g. current_directory / "latency_trace.json"
+# Record raw frames + results for replay (bench_replay.py takes .gstrec files)
+RECORD_PATH: Optional[Path] = None  # e.g. current_directory / "session.gstrec"
+# Downscaled camera preview in the GUI (vision.PREVIEW_FPS); the capture loop
+# itself is headless. False: no preview at all.
+GUI_PREVIEW = True
+
+# Recognizer result -> debounced Teensy command (shared with bench_replay.py).
+# Built in run_threads() once the port is open.
+pipeline = None
+vision_stats = {}
 
 # ==========================
 # Callback from MediaPipe
 # ==========================
 def print_result(result, output_image, timestamp_ms: int):
-   global _latest_gesture, processing_frame, last_sent_gesture
-
-   gesture_code = 0  # default: send nothing (music state unchanged)
-
-   if result and result.gestures:
-       gesture = result.gestures[0][0].category_name
-       _latest_gesture = gesture
-
-       # ✅ Translate gestures to Teensy command codes
-       if gesture == "Open_Palm":
-           gesture_code = 1   # PLAY
-       elif gesture == "Closed_Fist":
-           gesture_code = 2   # PAUSE
-       elif gesture == "Victory":
-           gesture_code = 3
-       elif gesture == "Pointing_Up":
-           gesture_code = 4
-       elif gesture == "Thumb_Up":
-           gesture_code = 5
-       elif gesture == "Thumb_Down":
-           gesture_code = 6
-       else:
-           gesture_code = 0   # No actionable gesture
-   else:
-       _latest_gesture = None
-       gesture_code = 0
-
-   # ✅ Only send when gesture CHANGES (prevents USB overload)
-   if gesture_code != last_sent_gesture and teensy:
-       try:
-           teensy.write(bytes([gesture_code]))
-           # send_gesture_to_gui(gesture_code) # Replaced by queue if needed, but we rely on state feedback
-           last_sent_gesture = gesture_code
-           print("Sent gesture:", gesture_code)
-       except Exception as e:
-           print("Serial write failed:", e)
-
-   processing_frame = False
-
-# ==========================
-# Serial Read Loop (New)
-# ==========================
-def run_serial_read():
-    while True:
-        if teensy and teensy.is_open:
-            try:
-                # Use a blocking read with timeout or check in_waiting to avoid busy loop
-                if teensy.in_waiting > 0:
-                    line = teensy.readline().decode('utf-8').strip()
-                    if line.startswith("STATE:"):
-                        json_str = line[6:]
-                        try:
-                            state = json.loads(json_str)
-                            gui_queue.put(("STATE", state))
-                        except json.JSONDecodeError:
-                            pass
-            except Exception as e:
-                print(f"Serial read error: {e}")
-                time.sleep(1)
-        time.sleep(0.01)
+   pipeline.handle_result(result, timestamp_ms)
 
 # ==========================
 # Camera Loop (Originally main)
 # ==========================
-def run_camera_loop():
-   global processing_frame
-
-   # Gesture Recognizer setup
-   options = GestureRecognizerOptions(
-       base_options=BaseOptions(model_asset_path=MODEL_PATH),
-       running_mode=RunningMode.LIVE_STREAM,
-       result_callback=print_result,
-   )
-  
-   with GestureRecognizer.create_from_options(options) as recognizer:
-
-       # Camera Setup
-       picam2 = Picamera2()
-       picam2.configure(
-           picam2.create_preview_configuration(
-               main={"format": "RGB888", "size": (320, 240)}
-           )
-       )
-       picam2.start()
-
-       frame_counter = 0
-
-       try:
-           while True:
-              
-               frame = picam2.capture_array()
-               frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-               frame_flipped = cv2.flip(frame, 1)
-
-               frame_counter += 1
-
-               # ✅ Process frames asynchronously
-               if frame_counter % 2 == 0 and not processing_frame: # Changed to % 2 for performance
-                   processing_frame = True
-                   timestamp_ms = int(time.time() * 1000)
-                   mp_image = Image(
-                       image_format=mp.ImageFormat.SRGB,
-                       data=frame_rgb
-                   )
-                   recognizer.recognize_async(mp_image, timestamp_ms)
-
-               # Display current gesture for debugging
-               # Note: cv2.imshow in a thread might be problematic on some systems, 
-               # but we'll keep it as requested. If it crashes, user can disable.
-               if _latest_gesture:
-                   cv2.putText(
-                       frame_flipped, _latest_gesture, (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2
-                   )
-
-               cv2.imshow("Gesture Live", frame_flipped)
-               if cv2.waitKey(1) & 0xFF == ord("q"):
-                   break
-               
-               time.sleep(0.01)
-
-       except Exception as e:
-           print("Camera loop error:", e)
-       finally:
-           # cv2.destroyAllWindows()
-           picam2.close()
+def run_camera_loop(preview=None):
+   # Camera, recognizer and scheduler live in vision.py (shared with multiproc.py).
+   # Headless: no HighGUI off the main thread; the GUI draws `preview` instead.
+   try:
+      vision_stats.update(run_vision(
+          pipeline,
+          result_callback=print_result,
+          model_path=MODEL_PATH,
+          engine=ENGINE,
+          frame_size=CAPTURE_SIZE,
+          in_flight=INFERENCE_IN_FLIGHT,
+          record_path=RECORD_PATH,
+          trace_path=TRACE_PATH,
+          stop_event=stop_event,
+          publish=preview.publish if preview else None,
+      ))
+   finally:
+      stop_event.set()
 
 # ==========================
-# Main Execution
+# GUI
 # ==========================
-if __name__ == '__main__':
-    # 1. Start Serial Reader Thread
-    serial_thread = threading.Thread(target=run_serial_read, daemon=True)
-    serial_thread.start()
+def save_imu_log(imu):
+    if imu is not None and IMU_LOG_PATH:
+        print(f"IMU log: {imu.dump(IMU_LOG_PATH)} samples -> {IMU_LOG_PATH}")
 
-    # 2. Start Camera Thread
-    camera_thread = threading.Thread(target=run_camera_loop, daemon=True)
-    camera_thread.start()
+def start_gui(source, preview=None, stop=stop_event, seconds=None, imu=None):
+    """GUI mainloop with the camera preview panel.
 
-    # 3. Start GUI
+    `preview` is the SharedFrame the capture loop publishes to (None or
+    GUI_PREVIEW=False hides the panel); `imu` is an ImuRing to plot (None
+    hides the IMU panel).
+    """
     print("Starting GUI...")
-    hardware = QueueHardware()
-    app = GestureAudioApp(hardware_interface=hardware)
+    # Push mode: the watcher wakes the GUI per new state; only changed widgets redraw
+    hardware = QueueHardware(source)
+    app = GestureAudioApp(hardware_interface=hardware, poll_ms=None, imu=imu,
+                          preview=preview if GUI_PREVIEW else None)
+    hardware.watch(app.notify)
+    if metrics:
+        metrics.bind(app=app)
+
+    # Close with the rest of the host ('q' in the preview, a dead process, --seconds)
+    def watch_stop():
+        if stop.is_set():
+            app.destroy()
+        else:
+            app.after(200, watch_stop)
+
+    app.after(200, watch_stop)
+    if seconds:
+        app.after(int(seconds * 1000), app.destroy)
     app.mainloop()
+    return app.render_stats()
+
+# ==========================
+# Layouts
+# ==========================
+def open_host():
+    global teensy, pipeline, metrics_server
+    teensy = open_teensy()
+    pipeline = build_pipeline(
+        teensy,
+        CAPTURE_SIZE,
+        roi=ROI_TRACKING,
+        motion_threshold=MOTION_THRESHOLD,
+        trace=TRACE_LATENCY,
+        two_hands=TWO_HANDS,
+        swipes=SWIPES,
+        adaptive=ADAPTIVE,
+        budget_ms=LATENCY_BUDGET_MS,
+        metrics=metrics,
+    )
+    if metrics:
+        try:
+            metrics_server = serve_metrics(metrics.bind(pipeline=pipeline, link=teensy), METRICS_PORT)
+        except OSError as e:
+            print("❌ Could not start the metrics endpoint:", e)
+
+def close_outputs():
+    if metrics_server:
+        metrics_server.shutdown()
+    if telemetry:
+        telemetry.close()
+        print(f"Telemetry: {telemetry.stats()} -> {telemetry.path}")
+
+def run_asyncio(seconds=None):
+    open_host()
+    imu = ImuRing() if teensy and teensy.imu else None
+    classifier = ImuGestureClassifier(imu, teensy) if teensy and teensy.host_gestures else None
+    preview = SharedFrame((CAPTURE_SIZE[1], CAPTURE_SIZE[0], 3)) if GUI_PREVIEW else None
+    host = AsyncHost(
+        pipeline,
+        teensy,
+        gui_factory=lambda hardware: GestureAudioApp(hardware_interface=hardware, poll_ms=None,
+                                                     imu=imu if IMU_STREAM else None,
+                                                     preview=preview),
+        imu=imu,
+        preview=preview,
+        imu_classifier=classifier,
+        frame_size=CAPTURE_SIZE,
+        max_in_flight=INFERENCE_IN_FLIGHT,
+        model_path=MODEL_PATH,
+        engine=ENGINE,
+        record_path=RECORD_PATH,
+        trace_path=TRACE_PATH,
+    )
+    try:
+        return asyncio.run(host.run(seconds))
+    finally:
+        if preview:
+            preview.close()
+        save_imu_log(imu)
+        if teensy:
+            print("Teensy link:", teensy.stats())
+            teensy.close()
+        close_outputs()
+
+def run_threads(seconds=None):
+    open_host()
+
+    # 1. Start Serial Reader Thread (blocks on the port, coalesces STATE, fills the IMU ring)
+    reader = None
+    imu = None
+    classifier = None
+    if teensy:
+        on_state = pipeline.tracer.state if pipeline.tracer else None
+        imu = ImuRing() if teensy.imu else None
+        reader = SerialReader(teensy, state_mailbox, on_state=on_state, imu=imu).start()
+        if metrics:
+            metrics.bind(reader=reader)
+        if teensy.host_gestures:
+            classifier = ImuGestureClassifier(imu, teensy).start()
+
+    # 2. Start Camera Thread (headless; publishes the preview frame)
+    preview = SharedFrame((CAPTURE_SIZE[1], CAPTURE_SIZE[0], 3)) if GUI_PREVIEW else None
+    camera_thread = threading.Thread(target=run_camera_loop, args=(preview,), daemon=True)
+    camera_thread.start()
+
+    # 3. Start GUI (blocks until the window closes)
+    gui_stats = None
+    try:
+        gui_stats = start_gui(state_mailbox, preview=preview, seconds=seconds,
+                              imu=imu if IMU_STREAM else None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        camera_thread.join(timeout=5.0)
+        if preview and not camera_thread.is_alive():
+            preview.close()
+        if classifier:
+            classifier.stop()
+        if reader:
+            reader.stop()
+            print("Serial reader:", reader.stats())
+        save_imu_log(imu)
+        if teensy:
+            print("Teensy link:", teensy.stats())
+            teensy.close()
+        close_outputs()
+    summary = layout_summary("threads", vision_stats, pipeline)
+    if gui_stats:
+        summary["gui_render"] = gui_stats
+    if classifier:
+        add_classifier_summary(summary, classifier.stats())
+    return summary
+
+# ==========================
+# Main Execution
+# ==========================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gesture host with GUI")
+    layout = parser.add_mutually_exclusive_group()
+    layout.add_argument("--processes", action="store_true",
+                        help="run vision, serial I/O and GUI as separate processes (multiproc.py)")
+    layout.add_argument("--asyncio", action="store_true",
+                        help="run everything on one asyncio event loop (aio_host.py)")
+    parser.add_argument("--seconds", type=float, help="quit after this long (for layout comparisons)")
+    parser.add_argument("--port", default=SERIAL_PORT,
+                        help="Teensy serial device (teensy_emulator.py prints a /dev/pts/N for load tests)")
+    parser.add_argument("--binary", action="store_true", default=BINARY_PROTOCOL,
+                        help="framed protocol (protocol.py); only teensy_gui.ino speaks it")
+    parser.add_argument("--telemetry", type=Path, default=TELEMETRY_DIR, metavar="DIR",
+                        help="log commands, acks and STATE to segment files here (telemetry.py)")
+    parser.add_argument("--trace", action="store_true", default=TRACE_LATENCY,
+                        help="trace per-stage latency, sensor exposure -> Teensy STATE")
+    parser.add_argument("--trace-json", type=Path, default=TRACE_PATH, metavar="PATH",
+                        help="also write every trace here (implies --trace)")
+    parser.add_argument("--metrics", type=int, nargs="?", const=DEFAULT_METRICS_PORT,
+                        default=METRICS_PORT, metavar="PORT",
+                        help=f"Prometheus endpoint on localhost (default port {DEFAULT_METRICS_PORT})")
+    parser.add_argument("--json", help="write the layout summary here")
+    args = parser.parse_args()
+    SERIAL_PORT = args.port
+    BINARY_PROTOCOL = args.binary
+    TELEMETRY_DIR = args.telemetry
+    TRACE_PATH = args.trace_json
+    TRACE_LATENCY = args.trace or TRACE_PATH is not None
+    METRICS_PORT = args.metrics
+    metrics = HostMetrics() if METRICS_PORT else None
+
+    if args.processes:
+        summary = run_processes(
+            args.port,
+            binary=BINARY_PROTOCOL,
+            imu=BINARY_PROTOCOL and IMU_STREAM,
+            host_gestures=BINARY_PROTOCOL and IMU_CLASSIFIER,
+            imu_log_path=IMU_LOG_PATH,
+            telemetry_dir=TELEMETRY_DIR,
+            metrics_port=METRICS_PORT,
+            gui=start_gui,
+            seconds=args.seconds,
+            frame_size=CAPTURE_SIZE,
+            roi=ROI_TRACKING,
+            motion_threshold=MOTION_THRESHOLD,
+            trace=TRACE_LATENCY,
+            two_hands=TWO_HANDS,
+            swipes=SWIPES,
+            adaptive=ADAPTIVE,
+            budget_ms=LATENCY_BUDGET_MS,
+            in_flight=INFERENCE_IN_FLIGHT,
+            record_path=RECORD_PATH,
+            trace_path=TRACE_PATH,
+            model_path=MODEL_PATH,
+            engine=ENGINE,
+        )
+    elif args.asyncio:
+        summary = run_asyncio(args.seconds)
+    else:
+        summary = run_threads(args.seconds)
+
+    print_layout_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,242 @@
+"""Landmark-only gesture engine: HandLandmarker + a NumPy nearest-centroid classifier.
+
+The stock GestureRecognizer runs the hand landmark model, then a gesture
+embedding and classifier network on top of it. This engine stops after
+the landmarks. It classifies each hand's 21 points with one distance
+computation against a few dozen centroids, and returns results shaped like
+the recognizer's (gestures / hand_landmarks / handedness). The pipeline,
+debouncer and gesture codes are unchanged, so it is a drop-in
+ENGINE = "landmarks" in the integrate scripts and --engine landmarks in
+bench_replay.py.
+
+The hand landmark model is read from inside gesture_recognizer.task (the
+.task file is a zip bundle), so no extra download is needed. Centroids
+are learned from session recordings (recording.py). Every recorded frame
+carries the stock recognizer's label and landmarks, so no hand-labelling
+is needed:
+
+    python landmark_classifier.py session.gstrec [more.gstrec] --holdout 0.3
+
+This prints the held-out agreement with the stock labels per gesture and
+writes CENTROIDS_PATH. For latency, throughput and agreement on the same
+frames through the full pipeline:
+
+    python bench_replay.py session.gstrec --json stock.json
+    python bench_replay.py session.gstrec --engine landmarks --baseline stock.json
+
+Features: the points are taken relative to the wrist, x is scaled by the
+image aspect, and everything is divided by the largest wrist distance,
+which makes them translation- and scale-free. Orientation is kept, since
+Thumb_Up and Thumb_Down differ only by it. Each gesture gets two centroids
+(training hands and their mirror images), so one model serves either hand.
+A hand's score is exp(-(z / SCORE_SIGMAS)^2 / 2), where z is its distance
+in units of the centroid's training spread. At z = SCORE_SIGMAS that is
+0.61, just over the debouncer's default min_score.
+"""
+import argparse
+import zipfile
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from recording import GESTURE_NAMES, NUM_LANDMARKS, UNKNOWN_GESTURE, open_recording
+
+MODEL_PATH = Path(__file__).parent / "gesture_recognizer.task"
+CENTROIDS_PATH = Path(__file__).parent / "landmark_centroids.npz"
+LANDMARKER_ASSET = "hand_landmarker.task"  # member of the gesture_recognizer.task bundle
+SCORE_SIGMAS = 2.0
+MIN_SAMPLES = 5  # fewer frames than this and a gesture gets no centroid
+
+# Stand-ins for the recognizer's result objects
+Category = namedtuple("Category", "category_name score")
+LandmarkResult = namedtuple("LandmarkResult", "gestures hand_landmarks handedness")
+
+
+# ==========================
+# Features + Classifier
+# ==========================
+def landmark_features(points, aspect=1.0):
+    """(n, 21, 2) normalized landmarks -> (n, 42) translation- and scale-free features."""
+    p = np.array(points, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 2)
+    p[..., 0] *= aspect
+    p -= p[:, :1]
+    scale = np.linalg.norm(p, axis=2).max(axis=1)
+    return (p / np.maximum(scale, 1e-6)[:, None, None]).reshape(len(p), -1)
+
+
+def mirrored(features):
+    flipped = features.reshape(len(features), NUM_LANDMARKS, 2).copy()
+    flipped[..., 0] *= -1
+    return flipped.reshape(len(features), -1)
+
+
+class CentroidClassifier:
+    """Nearest centroid over landmark_features(), scaled by each centroid's spread."""
+
+    def __init__(self, labels, centroids, spread):
+        self.labels = np.asarray(labels)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.spread = np.asarray(spread, dtype=np.float32)
+        self._sq = (self.centroids ** 2).sum(axis=1)
+
+    @classmethod
+    def fit(cls, features, names):
+        labels, centroids, spread = [], [], []
+        names = np.asarray(names)
+        for name in np.unique(names):
+            x = features[names == name]
+            if len(x) < MIN_SAMPLES:
+                continue
+            for variant in (x, mirrored(x)):
+                c = variant.mean(axis=0)
+                labels.append(name)
+                centroids.append(c)
+                spread.append(max(np.sqrt(((variant - c) ** 2).sum(axis=1).mean()), 1e-3))
+        if not labels:
+            raise ValueError("no gesture has enough samples to fit")
+        return cls(labels, centroids, spread)
+
+    def predict(self, features):
+        """(n, 42) -> (names, scores), one nearest centroid per row."""
+        d2 = (features ** 2).sum(axis=1)[:, None] - 2 * features @ self.centroids.T + self._sq
+        z = np.sqrt(np.maximum(d2, 0.0)) / self.spread
+        best = z.argmin(axis=1)
+        scores = np.exp(-0.5 * (z[np.arange(len(best)), best] / SCORE_SIGMAS) ** 2)
+        return self.labels[best], scores
+
+    def save(self, path=CENTROIDS_PATH):
+        np.savez(path, labels=self.labels, centroids=self.centroids, spread=self.spread)
+        return path
+
+    @classmethod
+    def load(cls, path=CENTROIDS_PATH):
+        if not Path(path).exists():
+            raise SystemExit(f"No centroids at {path}; train them with "
+                             f"python landmark_classifier.py session.gstrec")
+        with np.load(path) as f:
+            return cls(f["labels"], f["centroids"], f["spread"])
+
+
+def classify_result(classifier, result, width, height):
+    """HandLandmarker result -> recognizer-shaped LandmarkResult."""
+    if not result.hand_landmarks:
+        return LandmarkResult([], [], [])
+    points = [[(lm.x, lm.y) for lm in hand] for hand in result.hand_landmarks]
+    names, scores = classifier.predict(landmark_features(points, width / height))
+    gestures = [[Category(str(n), float(s))] for n, s in zip(names, scores)]
+    return LandmarkResult(gestures, result.hand_landmarks, result.handedness)
+
+
+# ==========================
+# Engines
+# ==========================
+def landmarker_asset(model_path=MODEL_PATH):
+    """The hand landmark model bytes, read from the gesture recognizer bundle."""
+    with zipfile.ZipFile(model_path) as bundle:
+        return bundle.read(LANDMARKER_ASSET)
+
+
+def _landmarker_options(mp, model_path, num_hands, running_mode, **kwargs):
+    vision = mp.tasks.vision
+    return vision.HandLandmarkerOptions(
+        base_options=mp.tasks.BaseOptions(model_asset_buffer=landmarker_asset(model_path)),
+        running_mode=running_mode,
+        num_hands=num_hands,
+        **kwargs,
+    )
+
+
+class LandmarkRecognizer:
+    """LIVE_STREAM stand-in for GestureRecognizer (recognize_async, close, with)."""
+
+    def __init__(self, result_callback, model_path=MODEL_PATH, num_hands=1,
+                 centroids_path=CENTROIDS_PATH):
+        import mediapipe as mp
+        classifier = CentroidClassifier.load(centroids_path)
+
+        def on_landmarks(result, output_image, timestamp_ms):
+            result_callback(classify_result(classifier, result, output_image.width, output_image.height),
+                            output_image, timestamp_ms)
+
+        self._landmarker = mp.tasks.vision.HandLandmarker.create_from_options(_landmarker_options(
+            mp, model_path, num_hands, mp.tasks.vision.RunningMode.LIVE_STREAM,
+            result_callback=on_landmarks))
+        self.recognize_async = self._landmarker.detect_async
+
+    def close(self):
+        self._landmarker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_landmark_engine(model_path=MODEL_PATH, num_hands=1, centroids_path=CENTROIDS_PATH):
+    """VIDEO-mode engine for bench_replay.py: (rgb, ts) -> LandmarkResult."""
+    import mediapipe as mp
+    classifier = CentroidClassifier.load(centroids_path)
+    landmarker = mp.tasks.vision.HandLandmarker.create_from_options(_landmarker_options(
+        mp, model_path, num_hands, mp.tasks.vision.RunningMode.VIDEO))
+
+    def run(rgb, timestamp_ms):
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(rgb))
+        result = landmarker.detect_for_video(image, timestamp_ms)
+        return classify_result(classifier, result, rgb.shape[1], rgb.shape[0])
+
+    run.close = landmarker.close
+    return run
+
+
+# ==========================
+# Training
+# ==========================
+def training_set(path, holdout=0.0):
+    """(features, names) from one recording, split in time into train and held-out tails."""
+    rec = open_recording(path)
+    meta = rec.meta[rec.order()]
+    keep = ((meta["gesture"] >= 0) & (meta["gesture"] != UNKNOWN_GESTURE)
+            & (np.abs(meta["landmarks"]).sum(axis=(1, 2)) > 0))
+    features = landmark_features(meta["landmarks"][keep], rec.width / rec.height)
+    names = np.array(GESTURE_NAMES)[meta["gesture"][keep]]
+    split = int(len(names) * (1 - holdout))
+    return (features[:split], names[:split]), (features[split:], names[split:])
+
+
+def agreement(classifier, features, names):
+    """Per-gesture and overall fraction of frames labelled like the stock recognizer."""
+    predicted, _ = classifier.predict(features)
+    report = {str(name): round(float((predicted[names == name] == name).mean()), 3)
+              for name in np.unique(names)}
+    report["overall"] = round(float((predicted == names).mean()), 3) if len(names) else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the landmark classifier from session recordings")
+    parser.add_argument("recordings", nargs="+", help=".gstrec files recorded with the stock recognizer")
+    parser.add_argument("--holdout", type=float, default=0.3,
+                        help="tail fraction of each recording kept out of training for scoring")
+    parser.add_argument("--out", default=str(CENTROIDS_PATH))
+    args = parser.parse_args()
+
+    train, test = zip(*(training_set(p, args.holdout) for p in args.recordings))
+    x_train = np.concatenate([x for x, _ in train])
+    y_train = np.concatenate([y for _, y in train])
+    x_test = np.concatenate([x for x, _ in test])
+    y_test = np.concatenate([y for _, y in test])
+
+    classifier = CentroidClassifier.fit(x_train, y_train)
+    print(f"{len(y_train)} training frames, {len(classifier.labels)} centroids "
+          f"({', '.join(sorted(set(classifier.labels)))})")
+    if len(y_test):
+        print(f"held-out agreement with the stock recognizer ({len(y_test)} frames):")
+        for name, value in agreement(classifier, x_test, y_test).items():
+            print(f"  {name:<14}{value}")
+    print("Centroids written to", classifier.save(args.out))
+
+
+if __name__ == "__main__":
+    main()
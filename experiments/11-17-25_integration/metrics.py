@@ -0,0 +1,191 @@
+"""Live host health on localhost in the Prometheus text format.
+
+    python integrate_gui.py --metrics      (integrate.py: METRICS_PORT = 9108)
+    curl -s localhost:9108/metrics
+
+The counters are the ones the components already keep for their stats()
+(PooledCapture.frames, the scheduler's inferred / superseded / dropped,
+TeensyLink and FrameParser counts, SerialReader errors). They are read
+only when the endpoint is scraped, so they cost nothing in between. The
+only new per-event work is Histogram.observe(): one bisect and two adds,
+on the thread that already has the value.
+
+    gesture_capture_to_result_ms   sensor exposure -> result callback
+    gesture_inference_ms           recognize_async submit -> result
+    gesture_result_handler_ms      time inside GesturePipeline.handle_result
+    gesture_gui_render_ms          GestureAudioApp.update_gui (summary over
+                                   its last 512 renders)
+
+FPS gauges are the frame and inference counters' rates between two
+scrapes. HostMetrics.bind() takes whatever the layout has (pipeline, link,
+reader, app); missing parts are left out of the output. The tree has no
+serial reconnect logic, so gesture_serial_read_errors_total (a read
+failure the reader retried after) stands in for reconnects.
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+LATENCY_BUCKETS_MS = (5, 10, 20, 35, 50, 75, 100, 150, 250, 500, 1000)
+HANDLER_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative Prometheus histogram; observe() from one thread at a time."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: above the top bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _snapshot(values, tries=3):
+    """Copy of a deque another thread appends to; empty if it kept changing."""
+    for _ in range(tries):
+        try:
+            return list(values)
+        except RuntimeError:  # deque mutated during iteration
+            pass
+    return []
+
+
+class HostMetrics:
+    """Everything one host process exports; render() builds the scrape body."""
+
+    def __init__(self):
+        self.capture_to_result_ms = Histogram()
+        self.inference_ms = Histogram()
+        self.result_handler_ms = Histogram(HANDLER_BUCKETS_MS)
+        self.pipeline = None
+        self.link = None
+        self.reader = None
+        self.app = None
+        self._rates = {}
+
+    def bind(self, pipeline=None, link=None, reader=None, app=None):
+        for name, value in (("pipeline", pipeline), ("link", link), ("reader", reader), ("app", app)):
+            if value is not None:
+                setattr(self, name, value)
+        return self
+
+    def _rate(self, name, count):
+        now = time.monotonic()
+        last = self._rates.get(name)
+        self._rates[name] = (now, count)
+        if last is None or now <= last[0]:
+            return 0.0
+        return (count - last[1]) / (now - last[0])
+
+    # --------------------------
+    # Exposition
+    # --------------------------
+    def render(self):
+        out = []
+
+        def metric(name, kind, help_text, value):
+            out.append(f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n{name} {value}\n")
+
+        def histogram(name, help_text, hist):
+            lines = [f"# HELP {name} {help_text}\n# TYPE {name} histogram\n"]
+            total = 0
+            for bound, n in zip(hist.buckets + ("+Inf",), list(hist.counts)):
+                total += n
+                lines.append(f'{name}_bucket{{le="{bound}"}} {total}\n')
+            lines.append(f"{name}_sum {hist.sum:.3f}\n{name}_count {total}\n")
+            out.append("".join(lines))
+
+        pipeline = self.pipeline
+        capture = getattr(pipeline, "capture", None)
+        scheduler = getattr(pipeline, "scheduler", None)
+        if capture is not None:
+            metric("gesture_camera_frames_total", "counter", "Frames grabbed from the camera", capture.frames)
+            metric("gesture_camera_fps", "gauge", "Camera frames per second since the last scrape",
+                   f"{self._rate('camera', capture.frames):.2f}")
+        if scheduler is not None:
+            metric("gesture_inferences_total", "counter", "Recognizer results", scheduler.inferred)
+            metric("gesture_inference_fps", "gauge", "Recognizer results per second since the last scrape",
+                   f"{self._rate('inference', scheduler.inferred):.2f}")
+            metric("gesture_frames_superseded_total", "counter",
+                   "Frames replaced by a newer one before inference", scheduler.superseded)
+            metric("gesture_inferences_dropped_total", "counter",
+                   "Submitted frames whose result never came", scheduler.dropped)
+        if pipeline is not None and pipeline.motion_gate:
+            metric("gesture_frames_skipped_static_total", "counter",
+                   "Frames the motion gate kept from the recognizer", pipeline.motion_gate.skipped)
+        if pipeline is not None:
+            histogram("gesture_capture_to_result_ms", "Sensor exposure to result callback",
+                      self.capture_to_result_ms)
+            histogram("gesture_inference_ms", "Recognizer submit to result", self.inference_ms)
+            histogram("gesture_result_handler_ms", "Time inside the result handler",
+                      self.result_handler_ms)
+
+        link = self.link
+        if link is not None:
+            parser = link.parser.stats()
+            counts = link.counts
+            metric("gesture_serial_bytes_in_total", "counter", "Bytes read from the Teensy", link.bytes_in)
+            metric("gesture_serial_bytes_out_total", "counter", "Bytes written to the Teensy", link.bytes_out)
+            metric("gesture_serial_parse_errors_total", "counter",
+                   "CRC, JSON and overlong-line errors", parser["parse_errors"])
+            metric("gesture_serial_commands_total", "counter", "Commands sent", counts["sent"])
+            metric("gesture_serial_retransmits_total", "counter", "Command retransmits", counts["retransmits"])
+            metric("gesture_serial_commands_lost_total", "counter",
+                   "Commands never acked after every retry", counts["lost"])
+            metric("gesture_serial_states_total", "counter", "STATE reports received", counts["states"])
+        if self.reader is not None:
+            metric("gesture_serial_read_errors_total", "counter",
+                   "Serial read failures the reader retried after", self.reader.errors)
+
+        if self.app is not None:
+            # render_ms belongs to the Tk thread; this runs on the HTTP one
+            times = sorted(_snapshot(self.app.render_ms))
+            lines = ["# HELP gesture_gui_render_ms GUI render time over the last renders\n"
+                     "# TYPE gesture_gui_render_ms summary\n"]
+            for q in (0.5, 0.95, 0.99):
+                value = times[min(int(len(times) * q), len(times) - 1)] if times else "NaN"
+                lines.append(f'gesture_gui_render_ms{{quantile="{q}"}} {value}\n')
+            # No _sum / _count: over a sliding window they would not be counters
+            out.append("".join(lines))
+        return "".join(out)
+
+
+# ==========================
+# Endpoint
+# ==========================
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per scrape would be the terminal spam this replaces
+
+
+def serve_metrics(metrics, port=METRICS_PORT, host=METRICS_HOST):
+    """Serve `metrics` at http://host:port/metrics from a daemon thread; shutdown() stops it.
+
+    Raises OSError if the port can't be bound; callers carry on without the endpoint.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
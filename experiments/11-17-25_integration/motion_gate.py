@@ -0,0 +1,97 @@
+"""Motion gate in front of the inference scheduler.
+
+Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+thumbnail of the last frame that was allowed through. The comparison is
+against that last frame, not the previous one, so slow drift still adds up.
+If the mean absolute difference is under `threshold`, the frame is
+skipped. Any motion re-arms the gate at once and keeps it open for
+`hold_frames` more frames so the end of a gesture is seen. A frame is also
+let through every `max_idle_s` so a hand that leaves slowly still clears
+the gesture. That interval is on the wall clock unless the caller passes
+the frame's own time (bench_replay.py does, so a replay gates the same
+frames on any machine).
+
+Only skips made while the recognizer had a free slot count as saved
+inference (`skipped_idle`). With the latest-frame-wins scheduler, a frame
+skipped while it was busy would mostly have been superseded anyway.
+"""
+import time
+
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, frame_size, scale=8, threshold=4.0, hold_frames=5, max_idle_s=1.0):
+        width, height = frame_size
+        self.thumb_size = (max(1, width // scale), max(1, height // scale))
+        self.threshold = threshold
+        self.hold_frames = hold_frames
+        self.max_idle_s = max_idle_s
+
+        thumb_w, thumb_h = self.thumb_size
+        self._small = np.empty((thumb_h, thumb_w, 3), dtype=np.uint8)
+        self._gray = np.empty((thumb_h, thumb_w), dtype=np.uint8)
+        self._reference = np.zeros((thumb_h, thumb_w), dtype=np.uint8)
+        self._diff = np.empty((thumb_h, thumb_w), dtype=np.uint8)
+        self._hold = 0
+        self._last_pass = None
+
+        self.passed = 0
+        self.skipped = 0
+        self.skipped_idle = 0  # skips the scheduler would have submitted
+        self.gate_s = 0.0
+        self.last_motion = 0.0
+
+    def should_infer(self, frame, now_s=None, idle=True):
+        """True if `frame` should go to the recognizer; `now_s` is its time in seconds.
+
+        `idle` says whether the scheduler could take the frame right now; it
+        only feeds the saved-time estimate.
+        """
+        import cv2
+        start = time.perf_counter()
+        now = start if now_s is None else now_s
+        cv2.resize(frame, self.thumb_size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        cv2.absdiff(self._gray, self._reference, dst=self._diff)
+        self.last_motion = cv2.mean(self._diff)[0]
+
+        if self.last_motion >= self.threshold:
+            self._hold = self.hold_frames
+            infer = True
+        elif self._hold > 0:
+            self._hold -= 1
+            infer = True
+        else:
+            infer = self._last_pass is None or now - self._last_pass >= self.max_idle_s
+
+        if infer:
+            np.copyto(self._reference, self._gray)
+            self._last_pass = now
+            self.passed += 1
+        else:
+            self.skipped += 1
+            if idle:
+                self.skipped_idle += 1
+        self.gate_s += time.perf_counter() - start
+        return infer
+
+    def stats(self, avg_inference_ms=0.0):
+        """Counters plus an estimate of the inference time saved.
+
+        `avg_inference_ms` is the measured recognizer latency (see
+        InferenceScheduler.avg_latency_ms). Only skips made while the
+        recognizer was idle count; the gate's own cost is subtracted.
+        """
+        gate_ms = self.gate_s * 1000
+        saved_ms = self.skipped_idle * avg_inference_ms
+        total = self.passed + self.skipped
+        return {
+            "passed": self.passed,
+            "skipped": self.skipped,
+            "skipped_idle": self.skipped_idle,
+            "skip_ratio": self.skipped / total if total else 0.0,
+            "gate_ms": round(gate_ms, 1),
+            "saved_ms": round(saved_ms, 1),
+            "net_saved_ms": round(saved_ms - gate_ms, 1),
+        }
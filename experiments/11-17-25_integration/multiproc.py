@@ -0,0 +1,461 @@
+"""Multi-process host layout: vision, serial I/O and GUI in separate processes.
+
+    vision   capture + recognizer + GesturePipeline (vision.run_vision)
+    serial   owns the Teensy link (protocol.py): commands out, STATE in
+    GUI      the parent process: GestureAudioApp with its camera preview
+
+Each role gets its own interpreter and GIL, so Tk redraws, serial polling
+and the preview no longer compete with the capture loop. The newest
+preview frame goes vision -> GUI through a SharedFrame in
+multiprocessing.shared_memory, so pixels are never pickled. Commands
+(vision -> serial) and states (serial -> GUI, and serial -> vision for the
+latency tracer) are a few bytes each and use multiprocessing queues.
+With imu=True the serial process writes the IMU stream straight into an
+ImuRing in shared memory, which the GUI plots; neither side blocks the
+other, and the vision process never sees it. With host_gestures=True the
+IMU classifier runs in the serial process too, next to the port it
+writes to. The session telemetry log (telemetry.py) is written there as
+well, since every command and STATE passes through that port. With
+metrics_port the vision process serves its /metrics (metrics.py) there and
+the serial process on the next port up.
+
+Start it with integrate_gui.py --processes. Every layout (threads, this,
+and --asyncio) prints the same layout summary, and --json writes it, so
+they can be compared on the Pi. The command latency stages need --trace:
+
+    python integrate_gui.py --trace --seconds 60 --json threads.json
+    python integrate_gui.py --processes --trace --seconds 60 --json processes.json
+    python multiproc.py threads.json processes.json
+
+This is the tooling only. No threads vs processes numbers have been
+measured yet; they need the Pi with its camera and a Teensy, or
+teensy_emulator.py.
+
+Children are started with "spawn", so nothing the parent opened (camera,
+Tk, the serial fd) leaks into them. Each child ignores SIGINT. Ctrl-C,
+closing the GUI, or any role exiting sets the shared stop event. The
+parent then joins every child, terminates stragglers and unlinks the
+shared memory.
+"""
+import json
+import multiprocessing as mp
+import queue
+import signal
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from adaptive import LATENCY_BUDGET_MS
+from imu_classifier import ImuGestureClassifier
+from imu_stream import ImuRing
+from metrics import HostMetrics, serve_metrics
+from protocol import TeensyLink
+from telemetry import TelemetryLog
+from serial_reader import SerialReader
+from tracing import RollingWindow
+
+CONTEXT = mp.get_context("spawn")
+STARTUP_TIMEOUT_S = 30.0   # recognizer + camera bring-up on a Pi 4 is slow
+SHUTDOWN_TIMEOUT_S = 5.0
+STATE_QUEUE_SIZE = 4       # latest snapshots only; the oldest is evicted when full
+SUMMARY_STAGES = ("capture_to_result", "write_to_state", "capture_to_state")
+
+
+# ==========================
+# Shared-memory frame slot
+# ==========================
+class SharedFrame:
+    """Newest frame in shared memory, guarded by a sequence counter.
+
+    The writer bumps the counter to odd, copies the frame, then bumps it to
+    even. A reader skips an odd counter and re-checks it after copying, so
+    it never keeps a torn frame. There is no lock and the writer never waits.
+    The frame's gesture label travels with it (`label` after a read). The
+    threaded layout uses one in-process for the GUI preview too.
+    """
+    LABEL_BYTES = 32
+    HEADER_BYTES = 16 + LABEL_BYTES  # seq, timestamp_ms (int64 each), label (utf-8)
+
+    def __init__(self, shape, name=None):
+        self.shape = tuple(shape)
+        self._owner = name is None
+        size = self.HEADER_BYTES + int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self.name = self.shm.name
+        self._header = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+        self._label = self.shm.buf[16:self.HEADER_BYTES]
+        self._frame = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=self.HEADER_BYTES)
+        if self._owner:
+            self._header[:] = 0
+        self._last_seq = 0
+        self.label = None
+        self.published = 0
+        self.torn = 0
+
+    def publish(self, frame, timestamp_ms=0, label=None):
+        seq = int(self._header[0])
+        self._header[0] = seq + 1
+        np.copyto(self._frame, frame)
+        self._header[1] = timestamp_ms
+        self._label[:] = (label or "").encode()[:self.LABEL_BYTES].ljust(self.LABEL_BYTES, b"\0")
+        self._header[0] = seq + 2
+        self.published += 1
+
+    def read(self, out):
+        """Copy a newer frame into `out`. Returns its timestamp, or None if nothing new."""
+        seq = int(self._header[0])
+        if seq == self._last_seq or seq & 1:
+            return None
+        np.copyto(out, self._frame)
+        timestamp_ms = int(self._header[1])
+        label = bytes(self._label).rstrip(b"\0").decode(errors="replace")
+        if int(self._header[0]) != seq:
+            self.torn += 1
+            return None
+        self._last_seq = seq
+        self.label = label or None
+        return timestamp_ms
+
+    def close(self):
+        # Views must go before close(), or the mmap refuses to unmap
+        self._label.release()
+        del self._header, self._label, self._frame
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+class QueueSink:
+    """serial.Serial stand-in for the vision process: forwards bytes to the serial process."""
+
+    def __init__(self, commands):
+        self.commands = commands
+
+    def write(self, data):
+        self.commands.put((time.monotonic_ns(), bytes(data)))
+        return len(data)
+
+
+# ==========================
+# Summary (shared by both layouts)
+# ==========================
+def layout_summary(layout, vision_stats, pipeline):
+    summary = {"layout": layout}
+    for key in ("elapsed_s", "frames", "camera_fps", "inference_fps", "avg_latency_ms"):
+        summary[key] = vision_stats.get(key)
+    debouncers = (pipeline.deck_debouncers or {"": pipeline.debouncer}).values()
+    summary["commands"] = sum(d.stats()["emitted"] for d in debouncers)
+    if pipeline.tracer:
+        stages = pipeline.tracer.summary()
+        for stage in SUMMARY_STAGES:
+            summary[stage] = stages[stage]
+    if pipeline.controller:
+        adaptive = pipeline.controller.stats()
+        summary["adaptive_level"] = adaptive["level"]
+        summary["adaptive_adjustments"] = adaptive["adjustments"]
+    return summary
+
+
+def add_classifier_summary(summary, stats):
+    """IMU classifier figures for the layout summary (full stats are printed)."""
+    print("IMU classifier:", stats)
+    summary["imu_commands"] = stats["sent"]
+    summary["imu_vs_firmware_ms"] = stats["vs_firmware_ms"]
+    summary["imu_batch_ms"] = stats["batch_ms"]
+
+
+def print_layout_summary(summary):
+    print("Layout summary:")
+    for key, value in summary.items():
+        if isinstance(value, dict):
+            value = "  ".join(f"{k} {v}" for k, v in value.items())
+        print(f"  {key:<20}{value}")
+
+
+def compare(a, b):
+    """Side-by-side view of two layout summaries (e.g. threads vs processes)."""
+    print(f"{'':<28}{a['layout']:>14}{b['layout']:>14}")
+    for key in ("camera_fps", "inference_fps", "avg_latency_ms", "commands"):
+        print(f"{key:<28}{str(a.get(key)):>14}{str(b.get(key)):>14}")
+    for stage in SUMMARY_STAGES + ("command_transit_ms",):
+        for q in ("p50", "p95"):
+            va = (a.get(stage) or {}).get(q)
+            vb = (b.get(stage) or {}).get(q)
+            print(f"{stage + ' ' + q:<28}{str(va):>14}{str(vb):>14}")
+
+
+# ==========================
+# Child processes
+# ==========================
+def _put_latest(q, item):
+    """put_nowait that evicts the oldest entry when full. Returns the number dropped."""
+    try:
+        q.put_nowait(item)
+        return 0
+    except queue.Full:
+        pass
+    try:
+        q.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        pass
+    return 1
+
+
+def serial_worker(port, binary, commands, states, tracer_states, events, stop, imu_name=None,
+                  host_gestures=False, telemetry_dir=None, metrics_port=None):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Readers may be gone at shutdown; don't block exit flushing their queues
+    states.cancel_join_thread()
+    tracer_states.cancel_join_thread()
+    # Shared when the GUI plots it, private when only the classifier reads it
+    imu = ImuRing(name=imu_name) if imu_name else ImuRing() if host_gestures else None
+    telemetry = TelemetryLog(telemetry_dir) if telemetry_dir else None
+    try:
+        teensy = TeensyLink.open(port, binary=binary, imu=imu is not None,
+                                 host_gestures=host_gestures, telemetry=telemetry)
+        print(f"✅ Connected to Teensy at {port}")
+    except Exception as e:
+        print("❌ Could not open serial port:", e)
+        teensy = None
+
+    transit = RollingWindow()
+    counts = {"written": 0, "states_dropped": 0}
+
+    # Writes get their own thread so a command never waits behind read()
+    def write_commands():
+        while True:
+            item = commands.get()
+            if item is None:
+                break
+            sent_ns, data = item
+            if teensy:
+                try:
+                    teensy.write(data)
+                    counts["written"] += 1
+                except Exception as e:
+                    print("Serial write failed:", e)
+            transit.add((time.monotonic_ns() - sent_ns) / 1e6)
+
+    writer = threading.Thread(target=write_commands, daemon=True)
+    writer.start()
+
+    # Coalesced STATE snapshots go to the GUI and to the vision process's tracer
+    def forward(state):
+        for q in (states, tracer_states):
+            counts["states_dropped"] += _put_latest(q, ("STATE", state))
+
+    reader = SerialReader(teensy, on_state=forward, imu=imu).start() if teensy else None
+    server = None
+    if metrics_port and teensy:
+        try:
+            server = serve_metrics(HostMetrics().bind(link=teensy, reader=reader), metrics_port + 1)
+        except OSError as e:
+            print("❌ Could not start the serial metrics endpoint:", e)
+    classifier = None
+    if teensy and teensy.host_gestures:
+        classifier = ImuGestureClassifier(imu, teensy).start()
+    events.put(("ready", "serial", None))
+
+    try:
+        stop.wait()
+    finally:
+        if server:
+            server.shutdown()
+        if classifier:
+            classifier.stop()
+            counts["imu_classifier"] = classifier.stats()
+        if reader:
+            reader.stop()
+            counts["reader"] = reader.stats()
+        writer.join(timeout=SHUTDOWN_TIMEOUT_S)
+        if teensy:
+            counts["link"] = teensy.stats()
+            teensy.close()
+        if imu:
+            imu.close()
+        if telemetry:
+            telemetry.close()
+            counts["telemetry"] = telemetry.stats()
+        events.put(("stats", "serial", {**counts, "command_transit_ms": transit.percentiles()}))
+        stop.set()
+
+
+def vision_worker(frame_name, frame_shape, commands, tracer_states, events, stop, config):
+    from pipeline import build_pipeline
+    from vision import run_vision
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    preview = SharedFrame(frame_shape, name=frame_name)
+    pipeline = build_pipeline(
+        QueueSink(commands), config["frame_size"], roi=config["roi"],
+        motion_threshold=config["motion_threshold"], trace=config["trace"],
+        two_hands=config.get("two_hands", False),
+        swipes=config.get("swipes", False),
+        adaptive=config.get("adaptive", False),
+        budget_ms=config.get("budget_ms", LATENCY_BUDGET_MS),
+        metrics=HostMetrics() if config.get("metrics_port") else None,
+    )
+    server = None
+    if pipeline.metrics:
+        try:
+            server = serve_metrics(pipeline.metrics.bind(pipeline=pipeline), config["metrics_port"])
+        except OSError as e:
+            print("❌ Could not start the vision metrics endpoint:", e)
+
+    # STATE lines parsed by the serial process close the latency traces here
+    def feed_tracer():
+        while not stop.is_set():
+            try:
+                _, state = tracer_states.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if pipeline.tracer:
+                pipeline.tracer.state(state)
+
+    threading.Thread(target=feed_tracer, daemon=True).start()
+    stats = {}
+    try:
+        stats = run_vision(
+            pipeline,
+            model_path=config["model_path"],
+            engine=config.get("engine", "recognizer"),
+            frame_size=config["frame_size"],
+            in_flight=config["in_flight"],
+            record_path=config["record_path"],
+            trace_path=config["trace_path"],
+            show=False,
+            stop_event=stop,
+            publish=preview.publish,
+            on_start=lambda: events.put(("ready", "vision", None)),
+        )
+    finally:
+        if server:
+            server.shutdown()
+        events.put(("stats", "vision", layout_summary("processes", stats, pipeline)))
+        preview.close()
+        stop.set()
+
+
+# ==========================
+# Orchestration
+# ==========================
+def _wait_ready(name, proc, events, stats):
+    deadline = time.monotonic() + STARTUP_TIMEOUT_S
+    while time.monotonic() < deadline:
+        try:
+            kind, role, payload = events.get(timeout=0.2)
+        except queue.Empty:
+            if proc.exitcode is not None:
+                break
+            continue
+        if kind == "ready" and role == name:
+            return
+        if kind == "stats":
+            stats[role] = payload
+    raise RuntimeError(f"{name} process did not start (exit code {proc.exitcode})")
+
+
+def _shutdown(procs, events, stats):
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT_S
+    # Drain events while children exit; a child blocked on a full pipe never would
+    while any(p.is_alive() for p in procs.values()) and time.monotonic() < deadline:
+        try:
+            kind, role, payload = events.get(timeout=0.1)
+            if kind == "stats":
+                stats[role] = payload
+        except queue.Empty:
+            pass
+    for name, p in procs.items():
+        if p.is_alive():
+            print(f"{name} process did not exit, terminating")
+            p.terminate()
+        p.join(timeout=1.0)
+    while True:
+        try:
+            kind, role, payload = events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "stats":
+            stats[role] = payload
+
+
+def run_processes(port, binary=False, gui=None, seconds=None, imu=False, host_gestures=False,
+                  imu_log_path=None, telemetry_dir=None, metrics_port=None, **config):
+    """Run the host as serial + vision child processes with the GUI in this one.
+
+    `gui(states, preview, stop, seconds, imu=ring)` runs the GUI mainloop
+    and returns when the window closes; ring is None unless imu=True.
+    host_gestures=True runs the IMU classifier in the serial process.
+    imu_log_path saves the shared IMU ring at exit (ImuRing.dump).
+    telemetry_dir logs the session there from the serial process (telemetry.py).
+    metrics_port serves vision /metrics there and serial on metrics_port + 1.
+    Without a GUI this process just waits for `seconds` or Ctrl-C. Returns
+    the layout summary.
+    """
+    stop = CONTEXT.Event()
+    commands = CONTEXT.Queue()
+    states = CONTEXT.Queue(maxsize=STATE_QUEUE_SIZE)
+    tracer_states = CONTEXT.Queue(maxsize=STATE_QUEUE_SIZE)
+    events = CONTEXT.Queue()
+    width, height = config["frame_size"]
+    preview = SharedFrame((height, width, 3))
+    imu_ring = ImuRing(shared=True) if imu and binary else None
+
+    # Serial first, so the first command already has a port to go to
+    procs = {
+        "serial": CONTEXT.Process(
+            target=serial_worker, name="serial",
+            args=(port, binary, commands, states, tracer_states, events, stop,
+                  imu_ring.name if imu_ring else None, host_gestures, telemetry_dir, metrics_port)),
+        "vision": CONTEXT.Process(
+            target=vision_worker, name="vision",
+            args=(preview.name, preview.shape, commands, tracer_states, events, stop,
+                  dict(config, metrics_port=metrics_port))),
+    }
+    stats = {}
+    started = time.perf_counter()
+    try:
+        for name, proc in procs.items():
+            proc.start()
+            _wait_ready(name, proc, events, stats)
+        print(f"Processes up in {time.perf_counter() - started:.1f} s")
+        if gui:
+            stats["gui"] = gui(states, preview, stop, seconds, imu=imu_ring)
+        else:
+            stop.wait(seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        commands.put(None)
+        _shutdown(procs, events, stats)
+        preview.close()
+        if imu_ring:
+            if imu_log_path:
+                print(f"IMU log: {imu_ring.dump(imu_log_path)} samples -> {imu_log_path}")
+            imu_ring.close()
+
+    summary = stats.get("vision", {"layout": "processes"})
+    if stats.get("gui"):
+        summary["gui_render"] = stats["gui"]
+    if "serial" in stats:
+        summary["command_transit_ms"] = stats["serial"].pop("command_transit_ms")
+        if "imu_classifier" in stats["serial"]:
+            add_classifier_summary(summary, stats["serial"].pop("imu_classifier"))
+        summary["serial"] = stats["serial"]
+    return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python multiproc.py threads.json processes.json")
+    with open(sys.argv[1]) as fa, open(sys.argv[2]) as fb:
+        compare(json.load(fa), json.load(fb))
@@ -0,0 +1,269 @@
+"""Recognizer result -> Teensy command.
+
+This is the logic that used to live in print_result. It is pulled out so the
+integrate scripts and bench_replay.py run exactly the same code: motion gate,
+ROI crop, debouncing, serial write and latency tracing. Nothing here
+imports picamera2 or opens a port; the caller hands in a `sink` with a
+write(bytes) method (a serial.Serial, a fake, or None).
+
+With two_hands=True the recognizer runs with num_hands=2. Each hand is
+assigned to a deck by its handedness (by position when the two labels
+agree) and gets its own debouncer over DECK_GESTURE_CODES. Both decks are
+controlled from the same single inference per frame.
+
+MediaPipe runs its palm detector only when it is not already tracking the
+hands. The landmark model and the gesture classifier run once per tracked
+hand. With both hands in view that adds one landmark + classifier pass to
+each inference; the detector cost is unchanged. The ROI crop also grows to
+span both hands. Measure the difference on the Pi with bench_replay.py:
+
+    python bench_replay.py clip.gstrec --json one.json
+    python bench_replay.py clip.gstrec --hands 2 --baseline one.json
+
+With swipes=True a SwipeDetector (swipe.py) also follows the hand across
+results. Its codes go out alongside the static ones and skip the
+debouncer, since a swipe is already a windowed decision. They share codes
+with the static and IMU gestures (gestures.py), so a swipe is held back
+while its code is within its debounce cooldown of the last time it was
+sent by anything. In two-hand mode it follows Deck A's hand.
+
+With adaptive=True an AdaptiveController (adaptive.py) sees every result's
+capture -> result latency, and the capture loop lets it step the recognizer
+input size, inference stride and preview rate to hold a latency budget.
+
+With `metrics` (a metrics.HostMetrics) each result also lands in its
+capture -> result and handler-time histograms for the /metrics endpoint.
+"""
+import time
+
+import numpy as np
+
+from adaptive import AdaptiveController, LATENCY_BUDGET_MS
+from debounce import GestureDebouncer
+from gestures import DECK_GESTURE_CODES, GLOBAL_CODES
+from motion_gate import MotionGate
+from roi import HandRoiTracker
+from swipe import SwipeDetector
+from tracing import LatencyTracer
+
+# MediaPipe labels handedness as if the image were mirrored (selfie view). The
+# camera frames are not mirrored, so the user's left hand comes back "Right".
+# The user's left hand drives Deck A, the left column of the GUI.
+HANDEDNESS_DECK = {"Right": "A", "Left": "B"}
+
+
+class GesturePipeline:
+    def __init__(self, sink, debouncer, roi_tracker=None, motion_gate=None,
+                 tracer=None, recorder=None, on_command=None, verbose=True, deck_debouncers=None,
+                 swipe=None, controller=None, metrics=None):
+        self.sink = sink
+        self.debouncer = debouncer
+        # {"A": GestureDebouncer, "B": ...}: two-hand mode, one hand per deck
+        self.deck_debouncers = deck_debouncers
+        self.num_hands = 2 if deck_debouncers else 1
+        self._global_sent = {}  # code -> timestamp_ms, so both hands can't toggle at once
+        self._sent_at = {}      # code -> timestamp_ms of the last write, for swipe cooldowns
+        self.swipes_held = 0
+        self.deck_landmarks = {}
+        self.swipe = swipe
+        self.controller = controller
+        self.metrics = metrics
+        self.roi_tracker = roi_tracker
+        self.motion_gate = motion_gate
+        self.tracer = tracer
+        self.recorder = recorder
+        self.scheduler = None  # set once the recognizer exists
+        self.capture = None    # and the camera
+        self.on_command = on_command
+        self.verbose = verbose
+        self.latest_gesture = None
+        self.latest_landmarks = None  # (21, 2) normalized to the full frame
+
+    # --------------------------
+    # Frame side
+    # --------------------------
+    def should_infer(self, frame, now_s=None):
+        if self.motion_gate is None:
+            return True
+        # Replays have no scheduler: every frame would have been inferred
+        idle = self.scheduler.idle if self.scheduler else True
+        return self.motion_gate.should_infer(frame, now_s, idle)
+
+    def prepare(self, frame, timestamp_ms):
+        """Image to hand the recognizer for this frame."""
+        if self.tracer:
+            self.tracer.submitted(timestamp_ms)
+        if self.roi_tracker:
+            frame = self.roi_tracker.prepare(frame, timestamp_ms)
+        return frame
+
+    # --------------------------
+    # Result side
+    # --------------------------
+    def handle_result(self, result, timestamp_ms):
+        """Process one recognizer result. Returns the code sent, or None."""
+        if not self.metrics:
+            return self._handle_result(result, timestamp_ms)
+        start = time.perf_counter()
+        self.metrics.capture_to_result_ms.observe(time.monotonic_ns() / 1e6 - timestamp_ms)
+        gesture_code = self._handle_result(result, timestamp_ms)
+        self.metrics.result_handler_ms.observe((time.perf_counter() - start) * 1000)
+        return gesture_code
+
+    def _handle_result(self, result, timestamp_ms):
+        if self.tracer:
+            self.tracer.result(timestamp_ms)
+        if self.controller:
+            self.controller.observe(timestamp_ms)
+        box = self.roi_tracker.observe(result, timestamp_ms) if self.roi_tracker else None
+
+        if self.deck_debouncers:
+            gesture, score, gesture_code = self._handle_decks(result, box, timestamp_ms)
+        else:
+            if result and result.gestures:
+                top = result.gestures[0][0]
+                self.latest_gesture = top.category_name
+                gesture, score = top.category_name, top.score
+            else:
+                self.latest_gesture = None
+                gesture, score = None, 0.0
+
+            if result and result.hand_landmarks:
+                self.latest_landmarks = self._to_frame(result.hand_landmarks[0], box)
+            else:
+                self.latest_landmarks = None
+
+            # ✅ Debounce: min score, N-of-M confirmation, hysteresis and cooldowns.
+            # Only confirmed changes come back, so flicker never reaches the USB link.
+            gesture_code = self.debouncer.update(gesture, score, timestamp_ms)
+            self._send(gesture_code, timestamp_ms)
+
+        if self.swipe:
+            landmarks = self.deck_landmarks.get("A") if self.deck_debouncers else self.latest_landmarks
+            swipe_code = self.swipe.update(timestamp_ms, landmarks)
+            last = self._sent_at.get(swipe_code)
+            if last is not None and timestamp_ms - last < self.debouncer.cooldowns.get(
+                    swipe_code, self.debouncer.default_cooldown_s) * 1000:
+                self.swipes_held += 1
+            elif self._send(swipe_code, timestamp_ms) and gesture_code is None:
+                gesture_code = swipe_code
+
+        if self.recorder:
+            self.recorder.result(timestamp_ms, gesture, score, self.latest_landmarks, gesture_code)
+        if self.scheduler:
+            self.scheduler.complete(timestamp_ms)
+        return gesture_code
+
+    def _handle_decks(self, result, box, timestamp_ms):
+        """Two-hand mode: debounce each deck's hand. Returns Deck A's (gesture, score) and the first code sent."""
+        hands = self.assign_decks(result, box)
+        self.deck_landmarks = {deck: hand[2] for deck, hand in hands.items()}
+        self.latest_landmarks = next(iter(self.deck_landmarks.values()), None)
+        labels = [f"{deck}:{hands[deck][0]}" for deck in self.deck_debouncers if deck in hands]
+        self.latest_gesture = " ".join(labels) or None
+
+        sent = None
+        for deck, debouncer in self.deck_debouncers.items():
+            gesture, score, _ = hands.get(deck, (None, 0.0, None))
+            code = debouncer.update(gesture, score, timestamp_ms)
+            if code in GLOBAL_CODES:
+                last = self._global_sent.get(code)
+                if last is not None and timestamp_ms - last < debouncer.cooldowns.get(code, 0) * 1000:
+                    continue
+                self._global_sent[code] = timestamp_ms
+            if code is not None and self._send(code, timestamp_ms) and sent is None:
+                sent = code
+        gesture, score, _ = hands.get("A", (None, 0.0, None))
+        return gesture, score, sent
+
+    def assign_decks(self, result, box=None):
+        """{deck: (gesture, score, landmarks normalized to the frame)} for up to two hands."""
+        if not (result and result.hand_landmarks):
+            return {}
+        hands = []
+        for i, landmarks in enumerate(result.hand_landmarks[:2]):
+            top = result.gestures[i][0] if i < len(result.gestures) and result.gestures[i] else None
+            side = result.handedness[i][0].category_name \
+                if i < len(result.handedness) and result.handedness[i] else None
+            hands.append([HANDEDNESS_DECK.get(side), top.category_name if top else None,
+                          top.score if top else 0.0, self._to_frame(landmarks, box)])
+
+        decks = [hand[0] for hand in hands]
+        if None in decks or len(set(decks)) < len(decks):
+            # Unsure or same label twice (crossed or side-on hands): go by wrist x.
+            # Unmirrored, the user's left hand (Deck A) is the right one in the image
+            if len(hands) == 1:
+                hands[0][0] = "A" if hands[0][3][0, 0] >= 0.5 else "B"
+            else:
+                right_first = sorted(hands, key=lambda hand: -hand[3][0, 0])
+                right_first[0][0], right_first[1][0] = "A", "B"
+        return {hand[0]: tuple(hand[1:]) for hand in hands}
+
+    def _to_frame(self, landmarks, box):
+        if box is not None:
+            return self.roi_tracker.to_frame_normalized(landmarks, box)
+        return np.array([(lm.x, lm.y) for lm in landmarks], dtype=np.float32)
+
+    def _send(self, gesture_code, timestamp_ms):
+        """Write one command to the sink. True if it went out."""
+        if gesture_code is None or not self.sink:
+            return False
+        try:
+            self.sink.write(bytes([gesture_code]))
+            self._sent_at[gesture_code] = timestamp_ms
+            if self.tracer:
+                self.tracer.written(timestamp_ms, gesture_code)
+            if self.on_command:
+                self.on_command(gesture_code)
+            if self.verbose:
+                print("Sent gesture:", gesture_code)
+            return True
+        except Exception as e:
+            print("Serial write failed:", e)
+            return False
+
+    # --------------------------
+    # Reporting
+    # --------------------------
+    def print_stats(self, trace_path=None):
+        avg_inference_ms = 0.0
+        if self.scheduler:
+            print("Inference scheduler:", self.scheduler.stats())
+            avg_inference_ms = self.scheduler.avg_latency_ms
+        if self.roi_tracker:
+            print("ROI tracker:", self.roi_tracker.stats())
+        if self.motion_gate:
+            print("Motion gate:", self.motion_gate.stats(avg_inference_ms))
+        if self.swipe:
+            print("Swipes:", {**self.swipe.stats(), "held_by_cooldown": self.swipes_held})
+        if self.controller:
+            print("Adaptive:", self.controller.stats())
+        if self.deck_debouncers:
+            for deck, debouncer in self.deck_debouncers.items():
+                print(f"Debouncer (Deck {deck}):", debouncer.stats())
+        else:
+            print("Debouncer:", self.debouncer.stats())
+        if self.recorder:
+            print("Recorder:", self.recorder.stats())
+        if self.tracer:
+            self.tracer.print_summary()
+            if trace_path:
+                print("Latency trace written to", self.tracer.dump(trace_path))
+
+
+def build_pipeline(sink, frame_size, roi=True, motion_threshold=4.0, trace=False, two_hands=False,
+                   swipes=False, adaptive=False, budget_ms=LATENCY_BUDGET_MS, **kwargs):
+    """Standard component stack; the integrate scripts pass their config constants."""
+    decks = {deck: GestureDebouncer(codes=codes) for deck, codes in DECK_GESTURE_CODES.items()}
+    roi_tracker = HandRoiTracker(frame_size, num_hands=2 if two_hands else 1) if roi else None
+    return GesturePipeline(
+        sink,
+        GestureDebouncer(),
+        roi_tracker=roi_tracker,
+        motion_gate=MotionGate(frame_size, threshold=motion_threshold) if motion_threshold is not None else None,
+        tracer=LatencyTracer() if trace else None,
+        deck_debouncers=decks if two_hands else None,
+        swipe=SwipeDetector(frame_size) if swipes else None,
+        controller=AdaptiveController(roi_tracker, budget_ms) if adaptive else None,
+        **kwargs,
+    )
@@ -0,0 +1,356 @@
+"""Framed binary protocol between the host scripts and teensy_gui.ino.
+
+Every frame is
+
+    A5 5A | type u8 | seq u8 | len u8 | payload[len] | crc16 u16 (LE)
+
+with CRC-16/CCITT-FALSE over type..payload (binascii.crc_hqx, init 0xFFFF).
+
+    COMMAND  host -> Teensy   payload: gesture code u8
+    ACK      Teensy -> host   payload: acked seq u8, status u8
+    STATE    Teensy -> host   payload: STATE_STRUCT (19 bytes)
+    IMU      Teensy -> host   payload: IMU_STRUCT (52 bytes), one per IMU read
+    MODE     host -> Teensy   payload: MODE_TEXT / MODE_BINARY, | MODE_IMU, | MODE_HOST_GESTURES
+
+The Teensy boots in text mode: bare gesture bytes in, `STATE:{json}` lines
+out every 200 ms, exactly the old behaviour, so the Serial Monitor and old
+scripts still work. A MODE frame switches it to binary. Only teensy_gui.ino
+understands frames; the other sketches (finalversionforreport.ino,
+everythingworksversion2_11_19.ino) run every incoming byte as a gesture
+code, header included, so binary is opt-in (TeensyLink(binary=True),
+integrate_gui.py --binary). STATE is then sent
+every 20 ms and right after each command, and every command is acked.
+With MODE_IMU set as well, every IMU read (~80 Hz) is streamed as an IMU
+frame: raw linear acceleration and gyro plus the filtered values the
+sketch's thresholds compare against. The stream is opt-in, so a host that
+does not plot it never pays for it.
+Debug prints stay plain text lines between frames; the parser hands them
+back as TEXT. Text-mode `STATE:` lines are decoded too, so one parser reads
+either mode.
+
+The Teensy remembers the last few command seqs and re-acks duplicates
+without re-running them, so a retransmitted toggle (mixer mode) is never
+applied twice.
+"""
+import binascii
+import json
+import struct
+import threading
+import time
+
+from tracing import RollingWindow
+
+SYNC = b"\xa5\x5a"
+HEADER_BYTES = 5  # sync(2) type seq len
+CRC_BYTES = 2
+
+MSG_COMMAND = 0x01
+MSG_ACK = 0x02
+MSG_STATE = 0x03
+MSG_IMU = 0x04
+MSG_MODE = 0x05
+
+MODE_TEXT = 0
+MODE_BINARY = 1
+MODE_IMU = 2  # flag: also stream IMU frames (binary mode only)
+MODE_HOST_GESTURES = 4  # flag: skip the sketch's IMU thresholds; imu_classifier.py decides
+
+ACK_OK = 0
+ACK_DUPLICATE = 1  # already executed, not run again
+ACK_UNKNOWN = 2    # not a gesture code the sketch knows
+
+# millis, vol, pitchA, pitchB, flags, songA, songB
+STATE_STRUCT = struct.Struct("<IfffBBB")
+STATE_FLAGS = (("deckA", 0x01), ("deckB", 0x02), ("mix", 0x04), ("eq", 0x08), ("echo", 0x10))
+# millis, linear accel xyz, gyro xyz, filtered accel xyz, filtered gyro xyz
+IMU_STRUCT = struct.Struct("<I12f")
+
+MAX_LINE_BYTES = 1024  # longer runs without a newline are dropped, not buffered
+BAUD = 115200
+READ_TIMEOUT_S = 0.05
+ACK_TIMEOUT_S = 0.1
+MAX_RETRIES = 2
+
+
+def encode(msg_type, seq, payload=b""):
+    body = bytes((msg_type, seq & 0xFF, len(payload))) + payload
+    return SYNC + body + struct.pack("<H", binascii.crc_hqx(body, 0xFFFF))
+
+
+def decode_state(payload):
+    t_ms, vol, pitch_a, pitch_b, flags, song_a, song_b = STATE_STRUCT.unpack(payload)
+    state = {"t_ms": t_ms, "vol": round(vol, 3), "pitchA": round(pitch_a, 3),
+             "pitchB": round(pitch_b, 3), "songA": song_a, "songB": song_b}
+    for name, bit in STATE_FLAGS:
+        state[name] = int(bool(flags & bit))
+    return state
+
+
+def decode_imu(payload):
+    """IMU payload as a flat (t_ms, ax, ay, az, gx, gy, gz, fax, ..., fgz) tuple."""
+    return IMU_STRUCT.unpack(payload)
+
+
+def encode_state(state, seq=0):
+    """Inverse of decode_state (for tests and emulators)."""
+    flags = sum(bit for name, bit in STATE_FLAGS if state.get(name))
+    payload = STATE_STRUCT.pack(int(state.get("t_ms", 0)) & 0xFFFFFFFF, state.get("vol", 0.0),
+                                state.get("pitchA", 1.0), state.get("pitchB", 1.0), flags,
+                                state.get("songA", 0), state.get("songB", 1))
+    return encode(MSG_STATE, seq, payload)
+
+
+def encode_imu(sample, seq=0):
+    """Inverse of decode_imu (for tests and emulators)."""
+    return encode(MSG_IMU, seq, IMU_STRUCT.pack(int(sample[0]) & 0xFFFFFFFF, *sample[1:]))
+
+
+# ==========================
+# Parser
+# ==========================
+class FrameParser:
+    """Incremental decoder for a byte stream mixing frames and text lines.
+
+    feed() returns (kind, seq, data) tuples:
+        ("STATE", seq, dict)          binary frame (seq None for a text STATE: line)
+        ("ACK", seq, (acked, status))
+        ("IMU", seq, tuple)           see decode_imu
+        ("TEXT", None, str)           any other text line
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._text = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.json_errors = 0
+        self.text_lines = 0
+        self.overflows = 0
+
+    def feed(self, data):
+        buf = self._buf
+        buf += data
+        out = []
+        while buf:
+            i = buf.find(SYNC)
+            if i < 0:
+                # A trailing A5 may be the start of a frame split across reads
+                keep = 1 if buf[-1] == SYNC[0] else 0
+                self._text_bytes(buf[:len(buf) - keep], out)
+                del buf[:len(buf) - keep]
+                break
+            if i:
+                self._text_bytes(buf[:i], out)
+                del buf[:i]
+            if len(buf) < HEADER_BYTES:
+                break
+            end = HEADER_BYTES + buf[4] + CRC_BYTES
+            if len(buf) < end:
+                break
+            body = bytes(buf[2:end - CRC_BYTES])
+            crc = buf[end - 2] | (buf[end - 1] << 8)
+            if binascii.crc_hqx(body, 0xFFFF) != crc:
+                # Not a real frame (or a corrupt one): drop the sync byte and resync
+                self.crc_errors += 1
+                del buf[:1]
+                continue
+            del buf[:end]
+            message = self._decode(body[0], body[1], body[3:])
+            if message:
+                self.frames += 1
+                out.append(message)
+        return out
+
+    def _decode(self, msg_type, seq, payload):
+        if msg_type == MSG_STATE and len(payload) == STATE_STRUCT.size:
+            return ("STATE", seq, decode_state(payload))
+        if msg_type == MSG_ACK and len(payload) == 2:
+            return ("ACK", seq, (payload[0], payload[1]))
+        if msg_type == MSG_IMU and len(payload) == IMU_STRUCT.size:
+            return ("IMU", seq, decode_imu(payload))
+        return None
+
+    def _text_bytes(self, data, out):
+        self._text += data
+        while True:
+            nl = self._text.find(b"\n")
+            if nl < 0:
+                if len(self._text) > MAX_LINE_BYTES:
+                    self.overflows += 1
+                    self._text.clear()
+                break
+            line = self._text[:nl].decode("utf-8", "replace").strip()
+            del self._text[:nl + 1]
+            if not line:
+                continue
+            self.text_lines += 1
+            if line.startswith("STATE:"):
+                try:
+                    out.append(("STATE", None, json.loads(line[6:])))
+                    continue
+                except ValueError:
+                    self.json_errors += 1
+            out.append(("TEXT", None, line))
+
+    def stats(self):
+        return {"frames": self.frames, "text_lines": self.text_lines,
+                "parse_errors": self.crc_errors + self.json_errors + self.overflows,
+                "crc_errors": self.crc_errors}
+
+
+# ==========================
+# Link
+# ==========================
+class TeensyLink:
+    """Serial port speaking the framed protocol.
+
+    write() has the serial.Serial signature GesturePipeline uses. Each byte
+    becomes a COMMAND frame that is tracked until acked and retransmitted
+    after ACK_TIMEOUT_S, up to MAX_RETRIES times, before being counted lost.
+    read() returns the STATE/TEXT messages that have arrived; acks are
+    consumed there. With binary=False it is a plain passthrough in text mode
+    (bare bytes out, STATE: lines in) and sends no frames at all, so it is
+    safe against sketches that predate the protocol. imu=True asks the
+    sketch to stream IMU frames too; read() returns them as ("IMU", tuple).
+    host_gestures=True (implies imu) also turns the sketch's own IMU
+    thresholds off, for when imu_classifier.py sends the IMU commands.
+    `telemetry` (a telemetry.TelemetryLog) gets every command, ack, lost
+    command and STATE, coalesced or not.
+    """
+
+    def __init__(self, port, binary=False, ack_timeout_s=ACK_TIMEOUT_S, max_retries=MAX_RETRIES,
+                 imu=False, host_gestures=False, telemetry=None):
+        self.port = port
+        self.telemetry = telemetry
+        self.binary = binary
+        self.imu = binary and (imu or host_gestures)
+        self.host_gestures = binary and host_gestures
+        self.ack_timeout_ns = int(ack_timeout_s * 1e9)
+        self.max_retries = max_retries
+        self.parser = FrameParser()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._pending = {}  # seq -> [code, first_sent_ns, last_sent_ns, tries]
+        self.ack_rtt = RollingWindow()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.counts = {"sent": 0, "acked": 0, "duplicate": 0, "unknown": 0,
+                       "retransmits": 0, "lost": 0, "states": 0, "imu": 0}
+        if binary:
+            mode = MODE_BINARY | (MODE_IMU if self.imu else 0)
+            mode |= MODE_HOST_GESTURES if self.host_gestures else 0
+            self._send_frame(MSG_MODE, bytes([mode]))
+
+    @classmethod
+    def open(cls, device, binary=False, **kwargs):
+        import serial
+
+        return cls(serial.Serial(device, BAUD, timeout=READ_TIMEOUT_S, write_timeout=0),
+                   binary, **kwargs)
+
+    @property
+    def is_open(self):
+        return self.port.is_open
+
+    def _send_frame(self, msg_type, payload, code=None):
+        with self._lock:
+            seq = self._seq
+            self._seq = (self._seq + 1) & 0xFF
+            if code is not None:
+                # Registered before the write, so even an instant ack finds it
+                now = time.monotonic_ns()
+                self._pending[seq] = [code, now, now, 1]
+                self.counts["sent"] += 1
+            frame = encode(msg_type, seq, payload)
+            self.port.write(frame)
+            self.bytes_out += len(frame)
+        if code is not None and self.telemetry:
+            self.telemetry.command(code, seq)
+        return seq
+
+    # --------------------------
+    # Commands
+    # --------------------------
+    def write(self, data):
+        if not self.binary:
+            if self.telemetry:
+                for code in data:
+                    self.telemetry.command(code)
+            self.bytes_out += len(data)
+            return self.port.write(data)
+        for code in data:
+            self._send_frame(MSG_COMMAND, bytes([code]), code=code)
+        return len(data)
+
+    def _acked(self, seq, status):
+        now = time.monotonic_ns()
+        with self._lock:
+            entry = self._pending.pop(seq, None)
+            if entry is None:
+                return
+            self.ack_rtt.add((now - entry[1]) / 1e6)
+            if self.telemetry:
+                self.telemetry.ack(entry[0], seq, (now - entry[1]) / 1e6)
+            self.counts["acked"] += 1
+            if status == ACK_DUPLICATE:
+                self.counts["duplicate"] += 1
+            elif status == ACK_UNKNOWN:
+                self.counts["unknown"] += 1
+
+    def _retransmit(self):
+        now = time.monotonic_ns()
+        with self._lock:
+            due = [(seq, e) for seq, e in self._pending.items() if now - e[2] > self.ack_timeout_ns]
+            for seq, entry in due:
+                if entry[3] > self.max_retries:
+                    del self._pending[seq]
+                    self.counts["lost"] += 1
+                    if self.telemetry:
+                        self.telemetry.lost(entry[0], seq)
+                    print(f"Command {entry[0]} (seq {seq}) lost after {entry[3]} tries")
+                    continue
+                # Same seq, so the Teensy can tell a retry from a new command
+                frame = encode(MSG_COMMAND, seq, bytes([entry[0]]))
+                self.port.write(frame)
+                self.bytes_out += len(frame)
+                entry[2] = now
+                entry[3] += 1
+                self.counts["retransmits"] += 1
+
+    # --------------------------
+    # Incoming
+    # --------------------------
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def read(self):
+        """Block up to the port timeout for data; returns [(kind, data)]."""
+        return self.feed(self.port.read(self.port.in_waiting or 1))
+
+    def feed(self, data):
+        """Parse bytes already read from the port; services acks and retransmits."""
+        messages = []
+        self.bytes_in += len(data)
+        for kind, seq, payload in self.parser.feed(data):
+            if kind == "ACK":
+                self._acked(*payload)
+                continue
+            if kind == "STATE":
+                self.counts["states"] += 1
+                if self.telemetry:
+                    self.telemetry.state(payload)
+            elif kind == "IMU":
+                self.counts["imu"] += 1
+            messages.append((kind, payload))
+        if self._pending:
+            self._retransmit()
+        return messages
+
+    def close(self):
+        self.port.close()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts, pending=len(self._pending))
+        return {**counts, **self.parser.stats(), "ack_rtt_ms": self.ack_rtt.percentiles()}
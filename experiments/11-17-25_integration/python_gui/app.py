@@ -1,13 +1,19 @@
+import threading
+import time
 import tkinter as tk
+from collections import deque
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from mock_hardware import MockHardware
 
+FRAME_MS = 16  # render at most once per display frame (~60 Hz)
+
 class GestureAudioApp(ttk.Window):
-    def __init__(self, hardware_interface=None):
+    def __init__(self, hardware_interface=None, poll_ms=200, imu=None, preview=None):
         super().__init__(themename="cyborg")
         self.title("Gesture Audio Processor")
-        self.geometry("800x600")
+        height = 600 + (220 if imu is not None else 0) + (180 if preview is not None else 0)
+        self.geometry(f"800x{height}")
         
         if hardware_interface:
             self.hardware = hardware_interface
@@ -23,8 +29,23 @@ class GestureAudioApp(ttk.Window):
         self.create_deck_panels()
         self.create_mixer_panel()
         self.create_effects_panel()
+        self.imu_plot = None
+        if imu is not None:
+            self.create_imu_panel(imu)
+        self.preview = None
+        if preview is not None:
+            self.create_preview_panel(preview)
         
-        # Start update loop
+        # Start update loop. poll_ms=None: push mode, the hardware side calls notify()
+        self.poll_ms = poll_ms
+        self._tk_thread = threading.current_thread()
+        self._shown = {}
+        self._render_pending = False
+        self._last_render = 0.0
+        self.render_ms = deque(maxlen=512)
+        self.widget_updates = 0
+        self.renders_coalesced = 0
+        self.bind("<<HardwareState>>", lambda event: self._schedule_render())
         self.update_gui()
 
     def create_header(self):
@@ -108,7 +129,8 @@ class GestureAudioApp(ttk.Window):
         fx_frame.grid(row=3, column=0, columnspan=2, sticky="ew", padx=10, pady=10)
         
         # Echo
-        self.echo_check = ttk.Checkbutton(fx_frame, text="Echo", bootstyle="round-toggle", state="disabled")
+        self.echo_var = tk.BooleanVar(value=False)
+        self.echo_check = ttk.Checkbutton(fx_frame, text="Echo", variable=self.echo_var, bootstyle="round-toggle", state="disabled")
         self.echo_check.pack(side="left", padx=20)
         
         # EQ
@@ -124,58 +146,122 @@ class GestureAudioApp(ttk.Window):
             bar.pack(pady=5)
             self.eq_bars.append(bar)
 
+    def create_imu_panel(self, ring):
+        # Scrolls on its own timer: IMU samples arrive far faster than STATE
+        from imu_plot import ImuPlot, PLOT_MS
+        self.imu_plot = ImuPlot(self, ring)
+        self.imu_plot.grid(row=4, column=0, columnspan=2, sticky="ew", padx=10, pady=10)
+
+        def tick():
+            self.imu_plot.refresh()
+            self.after(PLOT_MS, tick)
+
+        self.after(PLOT_MS, tick)
+
+    def create_preview_panel(self, source):
+        # Camera frames from a SharedFrame, on their own capped timer
+        from preview_panel import FramePreview, PREVIEW_MS
+        self.preview = FramePreview(self, source)
+        self.preview.grid(row=5, column=0, columnspan=2, sticky="ew", padx=10, pady=10)
+
+        def tick():
+            self.preview.refresh()
+            self.after(PREVIEW_MS, tick)
+
+        self.after(PREVIEW_MS, tick)
+
+    # ---------- Rendering ----------
+    def notify(self):
+        """New hardware state is ready. Safe from any thread; renders at most once per frame."""
+        if threading.current_thread() is self._tk_thread:
+            self._schedule_render()
+            return
+        try:
+            self.event_generate("<<HardwareState>>", when="tail")
+        except tk.TclError:
+            pass  # window already closed
+
+    def _schedule_render(self):
+        if self._render_pending:
+            self.renders_coalesced += 1
+            return
+        self._render_pending = True
+        wait = self._last_render + FRAME_MS / 1000 - time.perf_counter()
+        self.after(max(0, int(wait * 1000)), self._render_frame)
+
+    def _render_frame(self):
+        self._render_pending = False
+        self.update_gui()
+
+    def _set(self, key, value, apply):
+        """Touch a widget only when the value it shows actually changes."""
+        if self._shown.get(key) == value:
+            return
+        self._shown[key] = value
+        apply(value)
+        self.widget_updates += 1
+
     def update_gui(self):
         self.hardware.update()
         state = self.hardware.get_state()
-        
+        start = time.perf_counter()
+        self.render(state)
+        self._last_render = time.perf_counter()
+        self.render_ms.append((self._last_render - start) * 1000)
+
+        # Poll mode only (MockHardware simulates its own changes)
+        if self.poll_ms:
+            self.after(self.poll_ms, self.update_gui)
+
+    def render(self, state):
         # Update Decks
-        self.song_a_label.config(text=f"Song: {state['song_a']}")
-        self.song_b_label.config(text=f"Song: {state['song_b']}")
-        
-        if state['deck_a_playing']:
-            self.status_a_label.config(text="PLAYING", bootstyle="success")
-        else:
-            self.status_a_label.config(text="STOPPED", bootstyle="danger")
-            
-        if state['deck_b_playing']:
-            self.status_b_label.config(text="PLAYING", bootstyle="success")
-        else:
-            self.status_b_label.config(text="STOPPED", bootstyle="danger")
-
-        # Update Pitch Meters
-        self.pitch_a_meter.configure(amountused=int(state['pitch_a'] * 100 / 2.5)) # Scale roughly to meter
-        self.pitch_a_meter.amountusedvar.set(int(state['pitch_a'] * 100 / 2.5)) # Hack for meter update sometimes
-        # Actually meter text update:
-        # ttkbootstrap meter doesn't easily let us change the center text to float without subclassing or variable trickery
-        # We'll just rely on the visual arc for now or try to set the variable if it was bound.
-        # Let's just update the label if we can, but Meter handles its own text.
-        
-        self.pitch_b_meter.configure(amountused=int(state['pitch_b'] * 100 / 2.5))
+        self._set("song_a", state['song_a'], lambda v: self.song_a_label.config(text=f"Song: {v}"))
+        self._set("song_b", state['song_b'], lambda v: self.song_b_label.config(text=f"Song: {v}"))
+        self._set("deck_a", bool(state['deck_a_playing']), lambda v: self.status_a_label.config(
+            text="PLAYING" if v else "STOPPED", bootstyle="success" if v else "danger"))
+        self._set("deck_b", bool(state['deck_b_playing']), lambda v: self.status_b_label.config(
+            text="PLAYING" if v else "STOPPED", bootstyle="success" if v else "danger"))
+
+        # Update Pitch Meters (scaled roughly to the meter; the arc only moves in whole steps)
+        self._set("pitch_a", int(state['pitch_a'] * 100 / 2.5),
+                  lambda v: self.pitch_a_meter.configure(amountused=v))
+        self._set("pitch_b", int(state['pitch_b'] * 100 / 2.5),
+                  lambda v: self.pitch_b_meter.configure(amountused=v))
 
         # Update Mixer
-        self.vol_progress['value'] = state['volume'] * 100
-        self.vol_label.config(text=f"{int(state['volume']*100)}%")
-        
-        if state['mixer_mode']:
-            self.mixer_mode_label.config(text="MODE: MIXER (LOCKED)", bootstyle="danger-inverse")
-        else:
-            self.mixer_mode_label.config(text="MODE: NORMAL", bootstyle="light-inverse")
+        def show_volume(v):
+            self.vol_progress['value'] = v
+            self.vol_label.config(text=f"{v}%")
+        self._set("volume", int(state['volume'] * 100), show_volume)
+        self._set("mixer_mode", bool(state['mixer_mode']), lambda v: self.mixer_mode_label.config(
+            text="MODE: MIXER (LOCKED)" if v else "MODE: NORMAL",
+            bootstyle="danger-inverse" if v else "light-inverse"))
 
-        # Update Effects
-        # Checkbutton state variable would be better, but we can just select/deselect
-        if state['echo_enabled']:
-            if "selected" not in self.echo_check.state():
-                self.echo_check.invoke() 
-        else:
-            if "selected" in self.echo_check.state():
-                self.echo_check.invoke()
+        # Update Effects (bound variable; no invoke() just to sync the box)
+        self._set("echo", bool(state['echo_enabled']), self.echo_var.set)
 
         # Update EQ
         for i, bar in enumerate(self.eq_bars):
-            bar['value'] = state['eq_bands'][i] * 100
+            self._set(f"eq_{i}", int(state['eq_bands'][i] * 100),
+                      lambda v, bar=bar: bar.configure(value=v))
 
-        # Schedule next update
-        self.after(200, self.update_gui)
+    def render_stats(self):
+        times = sorted(self.render_ms)
+        if not times:
+            return {"renders": 0}
+        stats = {
+            "renders": len(times),
+            "p50_ms": round(times[len(times) // 2], 3),
+            "p95_ms": round(times[int(len(times) * 0.95)], 3),
+            "max_ms": round(times[-1], 3),
+            "widget_updates": self.widget_updates,
+            "coalesced": self.renders_coalesced,
+        }
+        if self.imu_plot is not None:
+            stats.update(self.imu_plot.stats())
+        if self.preview is not None:
+            stats.update(self.preview.stats())
+        return stats
 
 if __name__ == "__main__":
     app = GestureAudioApp()
@@ -0,0 +1,104 @@
+import time
+import tkinter as tk
+from collections import deque
+
+import numpy as np
+import ttkbootstrap as ttk
+
+from imu_stream import CHANNELS, THRESHOLDS, minmax_decimate
+
+PLOT_MS = 50         # scroll rate (20 Hz); independent of the IMU sample rate
+PLOT_WINDOW_S = 5.0
+STRIP_HEIGHT = 70
+BUCKET_PX = 2        # one min/max pair per 2 px column, so <= width points per line
+RANGE_X_THRESH = 2.0 # each strip spans +/- 2x its threshold; larger values are clipped
+
+RAW_COLOR = "#555555"
+FILTERED_COLOR = "#2a9fd6"
+THRESH_COLOR = "#cc0000"
+
+
+class ImuPlot(ttk.Labelframe):
+    """Scrolling strips of the IMU channels the sketch thresholds, one per THRESHOLDS entry.
+
+    Canvas items are created once and only their coords change per refresh,
+    and each line is min/max decimated to the canvas width first, so a
+    refresh costs the same at 80 Hz or 800 Hz of IMU data.
+    """
+    def __init__(self, master, ring, window_s=PLOT_WINDOW_S):
+        super().__init__(master, text="IMU (filtered; raw in grey; red = gesture threshold)",
+                         padding=5, bootstyle="secondary")
+        self.ring = ring
+        self.window_s = window_s
+        self.canvas = tk.Canvas(self, height=STRIP_HEIGHT * len(THRESHOLDS),
+                                bg="#222222", highlightthickness=0)
+        self.canvas.pack(fill="x", expand=True)
+
+        # channel "fgy" is the filtered twin of raw "gy"
+        self.strips = []
+        for name, (thresh, label) in THRESHOLDS.items():
+            c = self.canvas
+            self.strips.append({
+                "thresh": thresh,
+                "raw": CHANNELS.index(name[1:]),
+                "filtered": CHANNELS.index(name),
+                "zero": c.create_line(0, 0, 0, 0, fill="#444444"),
+                "upper": c.create_line(0, 0, 0, 0, fill=THRESH_COLOR, dash=(4, 3)),
+                "lower": c.create_line(0, 0, 0, 0, fill=THRESH_COLOR, dash=(4, 3)),
+                "raw_line": c.create_line(0, 0, 0, 0, fill=RAW_COLOR),
+                "filtered_line": c.create_line(0, 0, 0, 0, fill=FILTERED_COLOR, width=2),
+                "label": c.create_text(4, 0, anchor="nw", fill="#aaaaaa", font=("Helvetica", 9),
+                                       text=f"{name}: {label} ±{thresh:g}"),
+            })
+        self.canvas.bind("<Configure>", self._layout)
+        self._last_total = -1
+        self.refresh_ms = deque(maxlen=512)
+        self.points_drawn = 0
+
+    def _strip_box(self, i):
+        top = i * STRIP_HEIGHT
+        return top, top + STRIP_HEIGHT / 2, STRIP_HEIGHT / 2 - 2  # top, mid, half-height
+
+    def _layout(self, event=None):
+        width = self.canvas.winfo_width()
+        for i, s in enumerate(self.strips):
+            top, mid, half = self._strip_box(i)
+            offset = half / RANGE_X_THRESH  # threshold sits halfway to the edge
+            self.canvas.coords(s["zero"], 0, mid, width, mid)
+            self.canvas.coords(s["upper"], 0, mid - offset, width, mid - offset)
+            self.canvas.coords(s["lower"], 0, mid + offset, width, mid + offset)
+            self.canvas.coords(s["label"], 4, top + 2)
+        self._last_total = -1  # redraw the lines at the new width
+
+    def refresh(self):
+        """Redraw from the ring. Skips the work when no new samples arrived."""
+        total = self.ring.total
+        if total == self._last_total:
+            return
+        self._last_total = total
+        start = time.perf_counter()
+        t, data = self.ring.window(self.window_s)
+        width = self.canvas.winfo_width()
+        if len(t) < 2 or width < 2:
+            return
+        x = (t - (t[-1] - self.window_s)) * (width / self.window_s)
+        buckets = max(1, width // BUCKET_PX)
+        for i, s in enumerate(self.strips):
+            _, mid, half = self._strip_box(i)
+            scale = half / (RANGE_X_THRESH * s["thresh"])
+            for column, line in ((s["raw"], s["raw_line"]), (s["filtered"], s["filtered_line"])):
+                xd, yd = minmax_decimate(x, data[:, column], buckets)
+                yd = mid - np.clip(yd * scale, -half, half)
+                self.canvas.coords(line, np.column_stack((xd, yd)).ravel().tolist())
+                self.points_drawn += len(xd)
+        self.refresh_ms.append((time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        times = sorted(self.refresh_ms)
+        if not times:
+            return {"plot_refreshes": 0}
+        return {
+            "plot_refreshes": len(times),
+            "plot_p95_ms": round(times[int(len(times) * 0.95)], 3),
+            "plot_points": self.points_drawn,
+        }
@@ -0,0 +1,51 @@
+import time
+import tkinter as tk
+from collections import deque
+
+import numpy as np
+import ttkbootstrap as ttk
+
+PREVIEW_MS = 100     # 10 Hz, matches vision.PREVIEW_FPS; the loop publishes no faster
+PREVIEW_WIDTH = 200  # px; frames are decimated by an integer stride to at most this
+
+
+class FramePreview(ttk.Labelframe):
+    """Downscaled, mirrored camera preview fed from a SharedFrame.
+
+    The capture loop only copies the raw RGB frame into `source` at a capped
+    rate; every pixel operation here (stride decimation, mirror, PPM encode)
+    runs on the Tk thread, off the inference path. Without a new frame a
+    refresh costs one sequence-counter read.
+    """
+    def __init__(self, master, source, width=PREVIEW_WIDTH):
+        super().__init__(master, text="Camera", padding=5, bootstyle="secondary")
+        self.source = source
+        height, src_width = source.shape[:2]
+        self.stride = max(1, -(-src_width // width))
+        self._frame = np.empty(source.shape, dtype=np.uint8)
+        h, w = -(-height // self.stride), -(-src_width // self.stride)
+        self._header = f"P6 {w} {h} 255\n".encode()
+        self.photo = tk.PhotoImage(width=w, height=h)
+        ttk.Label(self, image=self.photo).pack(side="left")
+        self.gesture_label = ttk.Label(self, text="Gesture: -", font=("Helvetica", 12))
+        self.gesture_label.pack(side="left", padx=10)
+        self.refresh_ms = deque(maxlen=512)
+
+    def refresh(self):
+        """Show the newest frame, if one arrived since the last call."""
+        if self.source.read(self._frame) is None:
+            return
+        start = time.perf_counter()
+        small = np.ascontiguousarray(self._frame[::self.stride, ::-self.stride])
+        self.photo.configure(data=self._header + small.tobytes(), format="PPM")
+        self.gesture_label.configure(text=f"Gesture: {self.source.label or '-'}")
+        self.refresh_ms.append((time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        times = sorted(self.refresh_ms)
+        if not times:
+            return {"preview_frames": 0}
+        return {
+            "preview_frames": len(times),
+            "preview_p95_ms": round(times[int(len(times) * 0.95)], 3),
+        }
@@ -0,0 +1,75 @@
+import queue
+import threading
+
+class QueueHardware:
+    """Hardware interface fed by ("STATE", dict) messages from a serial reader.
+
+    Works with serial_reader.StateMailbox (threads) and multiprocessing.Queue
+    (processes); anything with get()/get_nowait() raising queue.Empty will do.
+
+    Poll mode: update() drains the source. Push mode: watch(notify) blocks on
+    the source in a daemon thread and calls notify() for each new state;
+    update() then applies the newest one.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.state = {
+            "volume": 0.4,
+            "pitch_a": 1.0,
+            "pitch_b": 1.0,
+            "deck_a_playing": False,
+            "deck_b_playing": False,
+            "mixer_mode": False,
+            "echo_enabled": False,
+            "eq_bands": [0.5, 0.5, 0.5],
+            "song_a": "song1.wav",
+            "song_b": "song2.wav"
+        }
+        self._lock = threading.Lock()
+        self._latest = None
+        self._watcher = None
+
+    def watch(self, notify):
+        def run():
+            while True:
+                try:
+                    msg_type, data = self.source.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                except (EOFError, OSError):
+                    break  # multiprocessing queue closed at shutdown
+                if msg_type == "STATE":
+                    with self._lock:
+                        self._latest = data
+                    notify()
+
+        self._watcher = threading.Thread(target=run, daemon=True)
+        self._watcher.start()
+        return self
+
+    def update(self):
+        if self._watcher:
+            with self._lock:
+                data, self._latest = self._latest, None
+            if data is not None:
+                self._apply(data)
+            return
+        try:
+            while True:
+                msg_type, data = self.source.get_nowait()
+                if msg_type == "STATE":
+                    self._apply(data)
+        except queue.Empty:
+            pass
+
+    def _apply(self, data):
+        self.state["volume"] = data.get("vol", self.state["volume"])
+        self.state["pitch_a"] = data.get("pitchA", self.state["pitch_a"])
+        self.state["pitch_b"] = data.get("pitchB", self.state["pitch_b"])
+        self.state["deck_a_playing"] = bool(data.get("deckA", self.state["deck_a_playing"]))
+        self.state["deck_b_playing"] = bool(data.get("deckB", self.state["deck_b_playing"]))
+        self.state["mixer_mode"] = bool(data.get("mix", self.state["mixer_mode"]))
+        self.state["echo_enabled"] = bool(data.get("echo", self.state["echo_enabled"]))
+
+    def get_state(self):
+        return self.state
@@ -0,0 +1,232 @@
+"""Memory-mapped session recording of camera frames and recognizer results.
+
+A recording is one preallocated file:
+
+    [header, 4 KiB][frames: capacity x H x W x 3 uint8][meta: capacity records]
+
+The camera loop only copies each frame into a small in-memory staging ring
+and enqueues its index. A background thread moves frames and results into
+the mapped file, so page faults and writeback never land on the camera
+thread. If the writer falls behind, frames are dropped and counted rather
+than blocking. In ring mode the file keeps the newest `capacity` frames. In
+segment mode a full file is closed and the next one (name_0001.gstrec, ...)
+is started.
+
+open_recording() maps a file back read-only; frames come out as NumPy views
+of the mapping with no copy.
+"""
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"GSTREC1\0"
+HEADER_BYTES = 4096
+NUM_LANDMARKS = 21
+# Index stored in meta["gesture"]; -1 means no result for that frame and 0
+# a result with no gesture (or no hand). A label not in this list is stored
+# as "Unknown", so a missed recognition stays apart from an empty frame.
+# Append only: the indices are in recorded files
+GESTURE_NAMES = ("None", "Closed_Fist", "Open_Palm", "Pointing_Up",
+                 "Thumb_Down", "Thumb_Up", "Victory", "ILoveYou", "Unknown")
+UNKNOWN_GESTURE = GESTURE_NAMES.index("Unknown")
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("version", "<u4"), ("width", "<u4"), ("height", "<u4"),
+    ("channels", "<u4"), ("capacity", "<u8"), ("count", "<u8"), ("ring", "<u1"),
+])
+META_DTYPE = np.dtype([
+    ("timestamp_ms", "<i8"),
+    ("sensor_ns", "<i8"),
+    ("gesture", "<i1"),
+    ("score", "<f4"),
+    ("code", "<i1"),          # command sent for this frame, -1 if none
+    ("landmarks", "<f4", (NUM_LANDMARKS, 2)),  # full-frame normalized x, y
+])
+
+
+def _layout(width, height, channels, capacity):
+    frame_bytes = capacity * width * height * channels
+    meta_offset = HEADER_BYTES + frame_bytes
+    return frame_bytes, meta_offset, meta_offset + capacity * META_DTYPE.itemsize
+
+
+def _gesture_index(name):
+    if name is None:
+        return 0
+    try:
+        return GESTURE_NAMES.index(name)
+    except ValueError:
+        return UNKNOWN_GESTURE
+
+
+# ==========================
+# Writer
+# ==========================
+class SessionRecorder:
+    def __init__(self, path, frame_size, capacity=1800, ring=True, staging=8):
+        self.path = Path(path)
+        self.width, self.height = frame_size
+        self.capacity = capacity
+        self.ring = ring
+        self.segment = 0
+
+        self._staging = np.empty((staging, self.height, self.width, 3), dtype=np.uint8)
+        self._free = queue.SimpleQueue()
+        for i in range(staging):
+            self._free.put(i)
+        self._jobs = queue.SimpleQueue()
+        self._slots = {}  # timestamp_ms -> slot in the current file
+
+        self.frames = 0
+        self.results = 0
+        self.dropped = 0
+
+        self._open_file(self.path)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _segment_path(self):
+        if self.segment == 0:
+            return self.path
+        return self.path.with_name(f"{self.path.stem}_{self.segment:04d}{self.path.suffix}")
+
+    def _open_file(self, path):
+        _, meta_offset, total = _layout(self.width, self.height, 3, self.capacity)
+        with open(path, "wb") as f:
+            f.truncate(total)
+        self._header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        self._header[0] = (MAGIC, 1, self.width, self.height, 3, self.capacity, 0, self.ring)
+        self._frames = np.memmap(path, dtype=np.uint8, mode="r+", offset=HEADER_BYTES,
+                                 shape=(self.capacity, self.height, self.width, 3))
+        self._meta = np.memmap(path, dtype=META_DTYPE, mode="r+", offset=meta_offset,
+                               shape=(self.capacity,))
+        self._meta["gesture"] = -1
+        self._meta["code"] = -1
+        self._count = 0
+        self._slots.clear()
+
+    # --------------------------
+    # Camera / callback side (never block)
+    # --------------------------
+    def append(self, frame, timestamp_ms, sensor_ns=0):
+        try:
+            i = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        np.copyto(self._staging[i], frame)
+        self._jobs.put(("frame", i, timestamp_ms, sensor_ns))
+
+    def result(self, timestamp_ms, gesture, score, landmarks=None, code=None):
+        self._jobs.put(("result", timestamp_ms, gesture, score, landmarks, code))
+
+    # --------------------------
+    # Background writer
+    # --------------------------
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            if job[0] == "frame":
+                self._write_frame(*job[1:])
+            else:
+                self._write_result(*job[1:])
+
+    def _write_frame(self, i, timestamp_ms, sensor_ns):
+        if self._count >= self.capacity and not self.ring:
+            self._close_file()
+            self.segment += 1
+            self._open_file(self._segment_path())
+
+        slot = self._count % self.capacity
+        self._frames[slot] = self._staging[i]
+        self._free.put(i)
+        meta = self._meta[slot]
+        meta["timestamp_ms"] = timestamp_ms
+        meta["sensor_ns"] = sensor_ns
+        meta["gesture"] = -1
+        meta["code"] = -1
+        meta["landmarks"] = 0  # ring slots are reused; no stale hand for a handless result
+        self._slots[timestamp_ms] = slot
+        if len(self._slots) > self.capacity:
+            self._slots.pop(next(iter(self._slots)))
+        self._count += 1
+        self._header[0]["count"] = self._count
+        self.frames += 1
+
+    def _write_result(self, timestamp_ms, gesture, score, landmarks, code):
+        slot = self._slots.get(timestamp_ms)
+        if slot is None:
+            return
+        meta = self._meta[slot]
+        meta["gesture"] = _gesture_index(gesture)
+        meta["score"] = score
+        if landmarks is not None:
+            meta["landmarks"] = landmarks
+        if code is not None:
+            meta["code"] = code
+        self.results += 1
+
+    def _close_file(self):
+        for m in (self._frames, self._meta, self._header):
+            m.flush()
+        del self._frames, self._meta, self._header
+
+    def close(self):
+        self._jobs.put(None)
+        self._thread.join(timeout=5.0)
+        self._close_file()
+
+    def stats(self):
+        return {"frames": self.frames, "results": self.results,
+                "dropped": self.dropped, "segment": self.segment}
+
+
+# ==========================
+# Reader
+# ==========================
+class Recording:
+    """Read-only view of a recording file; all arrays map the file directly."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r", shape=(1,))[0]
+        if header["magic"] != MAGIC.rstrip(b"\0"):
+            raise ValueError(f"{path} is not a gesture session recording")
+        self.width = int(header["width"])
+        self.height = int(header["height"])
+        self.capacity = int(header["capacity"])
+        self.count = int(header["count"])
+        self.ring = bool(header["ring"])
+        _, meta_offset, _ = _layout(self.width, self.height, int(header["channels"]), self.capacity)
+        self.frames = np.memmap(self.path, dtype=np.uint8, mode="r", offset=HEADER_BYTES,
+                                shape=(self.capacity, self.height, self.width, int(header["channels"])))
+        self.meta = np.memmap(self.path, dtype=META_DTYPE, mode="r", offset=meta_offset,
+                              shape=(self.capacity,))
+
+    def order(self):
+        """Slot indices in capture order (handles ring wrap-around)."""
+        n = min(self.count, self.capacity)
+        if self.count <= self.capacity:
+            return np.arange(n)
+        return (np.arange(n) + self.count) % self.capacity
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def __iter__(self):
+        for slot in self.order():
+            yield self.frames[slot], self.meta[slot]
+
+    def fps(self):
+        ts = self.meta["timestamp_ms"][self.order()]
+        if len(ts) < 2 or ts[-1] <= ts[0]:
+            return None
+        return (len(ts) - 1) * 1000.0 / (ts[-1] - ts[0])
+
+
+def open_recording(path):
+    return Recording(path)
@@ -0,0 +1,150 @@
+"""Hand region-of-interest tracking for the gesture recognizer.
+
+Once a hand has been seen, the next frames are cropped to a square around
+the previous result's landmarks (expanded so the hand can move between
+frames) and resized to `crop_size` before inference. The crop comes from the
+full capture frame. That means CAPTURE_SIZE can be raised for more pixels
+on a distant hand without the recognizer ever seeing a bigger image. When
+the hand is missed `max_misses` times in a row the tracker falls back to a
+full-frame search, downscaled to `search_size`. With num_hands=2 the crop
+covers both hands and is kept only while both are seen. With one hand in
+view the full frame is searched, so the other hand can come in.
+
+prepare() runs on the scheduler's submitter thread and observe() on the
+MediaPipe callback thread. The crop box used for each timestamp is
+remembered so results can be mapped back to full-frame coordinates.
+"""
+import threading
+
+import numpy as np
+
+
+class HandRoiTracker:
+    def __init__(self, frame_size, crop_size=(256, 256), search_size=(320, 240),
+                 expand=1.8, min_side=64, max_misses=3, num_hands=1):
+        self.frame_size = frame_size
+        self.num_hands = num_hands
+        self.expand = expand
+        self.min_side = min_side
+        self.max_misses = max_misses
+        self.resize(search_size, crop_size)
+
+        self._lock = threading.Lock()
+        self._box = None      # (x0, y0, x1, y1) in capture pixels, None = search
+        self._misses = 0
+        self._pending = {}    # timestamp_ms -> box the image was cut from
+
+        self.tracked_frames = 0
+        self.search_frames = 0
+        self.acquired = 0
+        self.lost = 0
+
+    def resize(self, search_size, crop_size):
+        """Change the recognizer input sizes; safe while prepare() runs (adaptive.py)."""
+        search_w, search_h = search_size
+        crop_w, crop_h = crop_size
+        # One attribute, swapped whole, so prepare() never pairs a size with the wrong buffer
+        self._sizes = (tuple(search_size), np.empty((search_h, search_w, 3), dtype=np.uint8),
+                       tuple(crop_size), np.empty((crop_h, crop_w, 3), dtype=np.uint8))
+
+    @property
+    def search_size(self):
+        return self._sizes[0]
+
+    @property
+    def crop_size(self):
+        return self._sizes[2]
+
+    # --------------------------
+    # Submit side
+    # --------------------------
+    def prepare(self, frame, timestamp_ms):
+        """Return the image to feed the recognizer for `frame`."""
+        import cv2
+        with self._lock:
+            box = self._box
+        search_size, search, crop_size, crop = self._sizes
+
+        if box is None:
+            width, height = self.frame_size
+            box = (0, 0, width, height)
+            if search_size == tuple(self.frame_size):
+                image = frame
+            else:
+                image = cv2.resize(frame, search_size, dst=search,
+                                   interpolation=cv2.INTER_AREA)
+            self.search_frames += 1
+        else:
+            x0, y0, x1, y1 = box
+            image = cv2.resize(frame[y0:y1, x0:x1], crop_size, dst=crop,
+                               interpolation=cv2.INTER_LINEAR)
+            self.tracked_frames += 1
+
+        with self._lock:
+            self._pending[timestamp_ms] = box
+        return image
+
+    # --------------------------
+    # Callback side
+    # --------------------------
+    def observe(self, result, timestamp_ms):
+        """Update the box from a result. Returns the box the result refers to."""
+        with self._lock:
+            box = self._pending.pop(timestamp_ms, None)
+            for ts in [ts for ts in self._pending if ts < timestamp_ms]:
+                del self._pending[ts]
+            if box is None:
+                return None
+
+            if result and len(result.hand_landmarks) >= self.num_hands:
+                points = np.concatenate([self.to_frame_pixels(hand, box)
+                                         for hand in result.hand_landmarks[:self.num_hands]])
+                if self._box is None:
+                    self.acquired += 1
+                self._box = self._box_around(points.min(axis=0), points.max(axis=0))
+                self._misses = 0
+            elif self._box is not None:
+                self._misses += 1
+                if self._misses >= self.max_misses:
+                    self._box = None
+                    self.lost += 1
+                else:
+                    # Hand may have left the crop, widen the next one
+                    x0, y0, x1, y1 = self._box
+                    self._box = self._box_around((x0, y0), (x1, y1))
+        return box
+
+    # --------------------------
+    # Geometry
+    # --------------------------
+    @staticmethod
+    def to_frame_pixels(landmarks, box):
+        """Landmarks normalized to the fed image -> capture pixel coordinates."""
+        x0, y0, x1, y1 = box
+        pts = np.array([(lm.x, lm.y) for lm in landmarks], dtype=np.float32)
+        pts[:, 0] = x0 + pts[:, 0] * (x1 - x0)
+        pts[:, 1] = y0 + pts[:, 1] * (y1 - y0)
+        return pts
+
+    def to_frame_normalized(self, landmarks, box):
+        """Landmarks normalized to the fed image -> normalized to the full frame."""
+        width, height = self.frame_size
+        return self.to_frame_pixels(landmarks, box) / np.array([width, height], dtype=np.float32)
+
+    def _box_around(self, lo, hi):
+        width, height = self.frame_size
+        cx = (lo[0] + hi[0]) / 2
+        cy = (lo[1] + hi[1]) / 2
+        side = max(hi[0] - lo[0], hi[1] - lo[1]) * self.expand
+        side = int(min(max(side, self.min_side), width, height))
+        x0 = int(min(max(cx - side / 2, 0), width - side))
+        y0 = int(min(max(cy - side / 2, 0), height - side))
+        return (x0, y0, x0 + side, y0 + side)
+
+    def stats(self):
+        return {
+            "tracked_frames": self.tracked_frames,
+            "search_frames": self.search_frames,
+            "acquired": self.acquired,
+            "lost": self.lost,
+        }
@@ -0,0 +1,179 @@
+"""Latest-frame-wins scheduler for recognize_async.
+
+The camera loop posts every frame into a single-slot mailbox and never
+waits. A submitter thread hands the newest frame to the recognizer as soon
+as one of `max_in_flight` slots is free, so inference runs back to back at
+whatever rate the Pi can sustain instead of on a fixed frame_counter stride.
+
+The result callback calls complete(). In LIVE_STREAM mode MediaPipe may
+silently skip an input while it is busy, so slots whose result never comes
+back are reclaimed after `stale_after` seconds (or as soon as a later
+timestamp completes) and counted as dropped.
+
+min_interval_s spaces submissions out (the inference stride). It is 0 by
+default, and adaptive.py raises it when the host can't keep up.
+
+With the camera's FramePool (`pool`), offer() copies nothing: the pooled
+buffer is swapped out of the ring for the scheduler's free one. Without a
+pool, or for a frame that isn't a pool buffer, it is copied.
+"""
+import threading
+import time
+
+import numpy as np
+
+
+class InferenceScheduler:
+    """Single-slot mailbox plus a bounded number of in-flight inferences.
+
+    Counters:
+        offered     frames posted by the camera loop
+        superseded  frames replaced in the mailbox before being submitted
+        submitted   frames handed to the recognizer
+        inferred    results delivered back through complete()
+        dropped     submissions that never produced a result (or failed)
+
+    avg_latency_ms is an exponential moving average of submit -> result.
+    """
+
+    def __init__(self, submit, frame_shape, max_in_flight=1, stale_after=0.5, min_interval_s=0.0,
+                 pool=None):
+        self._submit = submit
+        self._pool = pool
+        self.max_in_flight = max_in_flight
+        self.stale_after = stale_after
+        self.min_interval_s = min_interval_s
+        self._next_submit = 0.0
+
+        # Double buffer: the camera fills _slot (or swaps a pool buffer in),
+        # the submitter swaps it with _spare under the lock and reads the
+        # frame outside of it.
+        self._slot = np.empty(frame_shape, dtype=np.uint8)
+        self._spare = np.empty(frame_shape, dtype=np.uint8)
+        self._slot_ts = None
+        self._last_ts = -1
+
+        self._cond = threading.Condition()
+        self._in_flight = {}  # timestamp_ms -> submit time
+        self._stopped = False
+        self._thread = None
+
+        self.offered = 0
+        self.superseded = 0
+        self.submitted = 0
+        self.inferred = 0
+        self.dropped = 0
+        self.avg_latency_ms = 0.0
+        self.latency_histogram = None  # metrics.Histogram, when the endpoint is on
+
+    # --------------------------
+    # Camera side
+    # --------------------------
+    def offer(self, frame, timestamp_ms):
+        """Post the newest frame. Never blocks on inference."""
+        with self._cond:
+            if self._slot_ts is not None:
+                self.superseded += 1
+            # The old slot buffer (free, or a superseded frame) goes back to the camera
+            if self._pool is not None and self._pool.exchange(frame, self._slot):
+                self._slot = frame
+            else:
+                np.copyto(self._slot, frame)
+            self._slot_ts = timestamp_ms
+            self.offered += 1
+            self._cond.notify()
+
+    @property
+    def idle(self):
+        """True if an offered frame would be submitted now (read without the lock)."""
+        return len(self._in_flight) < self.max_in_flight and time.perf_counter() >= self._next_submit
+
+    # --------------------------
+    # Callback side
+    # --------------------------
+    def complete(self, timestamp_ms):
+        """Mark the inference for `timestamp_ms` as finished."""
+        with self._cond:
+            sent = self._in_flight.pop(timestamp_ms, None)
+            if sent is not None:
+                latency_ms = (time.perf_counter() - sent) * 1000
+                if self.inferred:
+                    self.avg_latency_ms += 0.1 * (latency_ms - self.avg_latency_ms)
+                else:
+                    self.avg_latency_ms = latency_ms
+                if self.latency_histogram:
+                    self.latency_histogram.observe(latency_ms)
+                self.inferred += 1
+            # Results arrive in timestamp order, anything older was skipped
+            for ts in [ts for ts in self._in_flight if ts < timestamp_ms]:
+                del self._in_flight[ts]
+                self.dropped += 1
+            self._cond.notify()
+
+    # --------------------------
+    # Submitter thread
+    # --------------------------
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _reclaim_stale(self, now):
+        for ts, sent in list(self._in_flight.items()):
+            if now - sent > self.stale_after:
+                del self._in_flight[ts]
+                self.dropped += 1
+
+    def _ready(self):
+        return (self._slot_ts is not None and len(self._in_flight) < self.max_in_flight
+                and time.perf_counter() >= self._next_submit)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._ready():
+                    wait = self.stale_after / 2
+                    if self._slot_ts is not None:
+                        wait = min(wait, max(self._next_submit - time.perf_counter(), 0.001))
+                    self._cond.wait(timeout=wait)
+                    self._reclaim_stale(time.perf_counter())
+                if self._stopped:
+                    return
+
+                # MediaPipe requires strictly increasing timestamps
+                timestamp_ms = max(self._slot_ts, self._last_ts + 1)
+                self._last_ts = timestamp_ms
+                self._slot, self._spare = self._spare, self._slot
+                frame = self._spare
+                self._slot_ts = None
+                self._in_flight[timestamp_ms] = time.perf_counter()
+                self._next_submit = self._in_flight[timestamp_ms] + self.min_interval_s
+                self.submitted += 1
+
+            try:
+                self._submit(frame, timestamp_ms)
+            except Exception as e:
+                print("recognize_async failed:", e)
+                with self._cond:
+                    if self._in_flight.pop(timestamp_ms, None) is not None:
+                        self.dropped += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "offered": self.offered,
+                "superseded": self.superseded,
+                "submitted": self.submitted,
+                "inferred": self.inferred,
+                "dropped": self.dropped,
+                "in_flight": len(self._in_flight),
+                "avg_latency_ms": round(self.avg_latency_ms, 1),
+            }
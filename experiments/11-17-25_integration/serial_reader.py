@@ -0,0 +1,168 @@
+"""Event-driven Teensy reader with latest-snapshot STATE coalescing.
+
+SerialReader blocks in the port's read (a select() inside pyserial), so an
+idle link costs a couple of wake-ups a second. Once bytes arrive it takes
+everything already buffered in one read and parses the batch with
+FrameParser. Only the newest STATE in the batch is published. Consumers
+read a StateMailbox, which holds one snapshot, so a burst from a chatty
+firmware build overwrites stale states instead of queueing them behind
+the GUI.
+
+IMU frames (TeensyLink(binary=True, imu=True)) from the same batch go into an
+imu_stream.ImuRing in one vectorised write, so an 80 Hz stream adds no
+per-sample Python work beyond the parse.
+
+Memory is bounded: one snapshot, the parser's partial frame or line
+(MAX_LINE_BYTES), the last few debug text lines and the fixed IMU ring.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+# Port timeout while waiting. Short while commands await an ack, since
+# retransmits are checked after each read
+IDLE_TIMEOUT_S = 0.5
+ACK_POLL_S = 0.02
+RECENT_TEXT_LINES = 50
+
+
+class StateMailbox:
+    """Single-slot latest-value holder.
+
+    Same get_nowait() shape as the old gui_queue ("STATE", dict), so
+    QueueHardware reads it unchanged. Each snapshot is returned once, and a
+    snapshot overwritten before anyone read it counts as stale.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._state = None
+        self._version = 0
+        self._read_version = 0
+        self.published = 0
+        self.stale = 0
+
+    def put(self, state):
+        with self._cond:
+            if self._version != self._read_version:
+                self.stale += 1
+            self._state = state
+            self._version += 1
+            self.published += 1
+            self._cond.notify_all()
+
+    def get_nowait(self):
+        with self._cond:
+            if self._version == self._read_version:
+                raise queue.Empty
+            self._read_version = self._version
+            return "STATE", self._state
+
+    def get(self, timeout=None):
+        """Block until a snapshot newer than the last one read arrives (queue.Queue.get shape)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._version != self._read_version, timeout):
+                raise queue.Empty
+            self._read_version = self._version
+            return "STATE", self._state
+
+    @property
+    def latest(self):
+        return self._state
+
+
+class SerialReader:
+    """Reader thread for a TeensyLink; publishes STATE into a StateMailbox.
+
+    `on_state(state)` runs on the reader thread once per batch with the
+    newest state (the latency tracer hooks in there). IMU samples are
+    appended to `imu` (an ImuRing) when given, and dropped otherwise.
+    """
+
+    def __init__(self, link, mailbox=None, on_state=None, imu=None):
+        self.link = link
+        self.mailbox = mailbox if mailbox is not None else StateMailbox()
+        self.on_state = on_state
+        self.imu = imu
+        self.recent_text = deque(maxlen=RECENT_TEXT_LINES)
+        self._stop = threading.Event()
+        self._thread = None
+        self.bytes = 0
+        self.reads = 0
+        self.states = 0
+        self.imu_samples = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2 * IDLE_TIMEOUT_S)
+
+    def _set_timeout(self, timeout):
+        # pyserial reconfigures the tty on every assignment; only touch it on change
+        if self.link.port.timeout != timeout:
+            self.link.port.timeout = timeout
+
+    def _run(self):
+        port = self.link.port
+        while not self._stop.is_set() and port.is_open:
+            self._set_timeout(ACK_POLL_S if self.link.pending else IDLE_TIMEOUT_S)
+            try:
+                # Block for the first byte, then take whatever else is buffered
+                data = port.read(1)
+                if data and port.in_waiting:
+                    data += port.read(port.in_waiting)
+            except Exception as e:
+                if self._stop.is_set() or not port.is_open:
+                    break
+                self.errors += 1
+                print(f"Serial read error: {e}")
+                time.sleep(1)
+                continue
+            if data:
+                self.reads += 1
+                self.bytes += len(data)
+            self._handle(self.link.feed(data))
+
+    def _handle(self, messages):
+        newest = None
+        imu = []
+        for kind, data in messages:
+            if kind == "IMU":
+                imu.append(data)
+            elif kind == "STATE":
+                if newest is not None:
+                    self.coalesced += 1
+                newest = data
+                self.states += 1
+            elif kind == "TEXT":
+                self.recent_text.append(data)
+        if imu:
+            self.imu_samples += len(imu)
+            if self.imu is not None:
+                self.imu.extend(imu)
+        if newest is not None:
+            self.mailbox.put(newest)
+            if self.on_state:
+                self.on_state(newest)
+
+    def stats(self):
+        parser = self.link.parser.stats()
+        return {
+            "bytes": self.bytes,
+            "reads": self.reads,
+            "lines": parser["text_lines"],
+            "frames": parser["frames"],
+            "parse_errors": parser["parse_errors"],
+            "states": self.states,
+            "imu_samples": self.imu_samples,
+            "stale_dropped": self.coalesced + self.mailbox.stale,
+            "read_errors": self.errors,
+        }
@@ -0,0 +1,119 @@
+"""Dynamic gestures (swipes) from the hand's landmark trajectory.
+
+The recognizer only sees static poses. SwipeDetector keeps the last
+RING_SAMPLES results' wrist and fingertip points in a fixed NumPy ring. On
+every result it looks at the newest SWIPE_WINDOW_MS of them:
+
+    track      mean of the wrist and five fingertips (steadier than one point
+               while the pose changes mid-swipe)
+    travel     displacement from the window's first sample to the newest,
+               x scaled by the frame aspect so both axes share units
+    decide     major-axis travel >= MIN_TRAVEL (in frame heights), off-axis
+               travel <= MAX_OFF_AXIS of it, and >= MIN_STEADY of the steps
+               that move (over STEP_EPS; jitter while still doesn't count)
+               going the same way; then a COOLDOWN_MS hold and a cleared ring
+
+Directions are the user's: the camera image is not mirrored, so a hand
+moving to the user's right moves left in the image. The work per result is
+bounded by the ring size, so it costs the same every frame. Latency is
+measured from the motion's onset (the first sample once the track has
+moved ONSET_TRAVEL of MIN_TRAVEL) to the decision. It goes into the
+pipeline stats and the bench_replay.py report.
+"""
+import time
+
+import numpy as np
+
+from gestures import SWIPE_GESTURE_CODES
+from tracing import RollingWindow
+
+TRACK_POINTS = (0, 4, 8, 12, 16, 20)  # wrist + fingertips
+RING_SAMPLES = 32                     # > SWIPE_WINDOW_MS at 60 results/s
+SWIPE_WINDOW_MS = 400
+MIN_SAMPLES = 4
+MIN_TRAVEL = 0.25
+MAX_OFF_AXIS = 0.5
+MIN_STEADY = 0.7
+STEP_EPS = 0.01
+ONSET_TRAVEL = 0.1
+MAX_GAP_MS = 150  # a longer hole (hand lost) breaks the trajectory
+COOLDOWN_MS = 600
+
+
+class SwipeDetector:
+    """Fixed-size landmark ring -> Swipe_* gesture codes."""
+
+    def __init__(self, frame_size, window_ms=SWIPE_WINDOW_MS):
+        width, height = frame_size
+        self.aspect = width / height
+        self.window_ms = window_ms
+        self._t = np.zeros(RING_SAMPLES, dtype=np.int64)
+        self._points = np.zeros((RING_SAMPLES, len(TRACK_POINTS), 2), dtype=np.float32)
+        self._count = 0
+        self._start = 0     # first sample index that may belong to the current trajectory
+        self._hold_until = -1
+
+        self.detected = {name: 0 for name in SWIPE_GESTURE_CODES}
+        self.latency_ms = RollingWindow()
+        self.update_us = RollingWindow()
+
+    def update(self, timestamp_ms, landmarks):
+        """Feed one result's (21, 2) frame-normalized landmarks (None: no hand).
+
+        Returns a swipe code or None.
+        """
+        start = time.perf_counter()
+        code = None
+        if landmarks is None:
+            self._start = self._count
+        else:
+            if self._count > self._start and timestamp_ms - self._t[(self._count - 1) % RING_SAMPLES] > MAX_GAP_MS:
+                self._start = self._count
+            slot = self._count % RING_SAMPLES
+            self._t[slot] = timestamp_ms
+            self._points[slot] = landmarks[TRACK_POINTS, :2]
+            self._count += 1
+            if timestamp_ms >= self._hold_until:
+                code = self._decide(timestamp_ms)
+        self.update_us.add((time.perf_counter() - start) * 1e6)
+        return code
+
+    def _decide(self, now_ms):
+        n = min(self._count - self._start, RING_SAMPLES)
+        idx = (self._count - n + np.arange(n)) % RING_SAMPLES
+        t = self._t[idx]
+        keep = t >= now_ms - self.window_ms
+        if keep.sum() < MIN_SAMPLES:
+            return None
+        track = self._points[idx[keep]].mean(axis=1)
+        track[:, 0] *= self.aspect
+        t = t[keep]
+
+        travel = track[-1] - track[0]
+        major = int(np.abs(travel).argmax())
+        dist = abs(travel[major])
+        if dist < MIN_TRAVEL or abs(travel[1 - major]) > MAX_OFF_AXIS * dist:
+            return None
+        steps = np.diff(track[:, major]) * np.sign(travel[major])
+        moving = np.abs(steps) > STEP_EPS
+        if (steps[moving] > 0).sum() < MIN_STEADY * moving.sum():
+            return None
+
+        if major == 0:
+            name = "Swipe_Right" if travel[0] < 0 else "Swipe_Left"  # image x is mirrored
+        else:
+            name = "Swipe_Down" if travel[1] > 0 else "Swipe_Up"
+        moved = np.abs(track[:, major] - track[0, major])
+        onset = t[int(np.argmax(moved >= ONSET_TRAVEL * MIN_TRAVEL))]
+        self.latency_ms.add(now_ms - onset)
+        self.detected[name] += 1
+        self._start = self._count
+        self._hold_until = now_ms + COOLDOWN_MS
+        return SWIPE_GESTURE_CODES[name]
+
+    def stats(self):
+        return {
+            "detected": dict(self.detected),
+            "latency_ms": self.latency_ms.percentiles(),
+            "update_us": self.update_us.percentiles(),
+        }
@@ -0,0 +1,400 @@
+"""Python stand-in for teensy_gui.ino on a pseudo-terminal, for serial load tests.
+
+MockHardware fakes state inside the GUI process and never touches the
+serial path. This emulates the sketch the host scripts talk to, behind a
+pty pair. The host opens the slave end like /dev/ttyACM0, and protocol.py,
+SerialReader, the command path and the GUI all run unchanged:
+
+    python teensy_emulator.py --state-hz 2000 --latency-ms 3 --garble 0.01
+    python integrate_gui.py --port /dev/pts/5 --binary --seconds 60 --json load.json
+
+Mirrored from the sketch (handleGesture, handleFrame, pollHost, sendState):
+
+    text mode     bare gesture bytes in; STATE:{json} lines every
+                  REPORT_INTERVAL_MS plus the Serial.printf debug lines
+    MODE frame    binary / IMU stream / host-gestures flags; clears the
+                  seen-seq ring, STATE goes out at once
+    COMMAND       acked OK / DUPLICATE (last SEEN_SEQS seqs) / UNKNOWN,
+                  STATE right after
+    binary STATE  every STATE_INTERVAL_MS; IMU frames every IMU_POLL_MS
+                  when streaming (small noise, no gestures)
+
+Load knobs: `state_hz` overrides the report rate (both modes; thousands a
+second are fine, the due reports go out in one write). `latency_ms` (+ up
+to `jitter_ms`) delays every received byte before the sketch sees it, so
+acks and the STATE reflecting a command come that much later, in order.
+`garble` is the chance each outgoing message gets one byte flipped (a CRC
+or JSON error on the host) and `text_hz` adds filler debug lines. The
+master side never blocks. When the host stops reading and the pty buffer
+fills, messages are dropped and counted, which is what the Teensy's USB
+serial does with no reader.
+"""
+import argparse
+import json
+import os
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+
+from protocol import (ACK_DUPLICATE, ACK_OK, ACK_UNKNOWN, MODE_BINARY, MODE_HOST_GESTURES, MODE_IMU,
+                      MSG_ACK, MSG_COMMAND, MSG_MODE, MSG_STATE, STATE_FLAGS, STATE_STRUCT, SYNC,
+                      encode, encode_imu)
+
+PLAYLIST = ("song1.wav", "song2.wav", "song3.wav", "song4.wav")
+REPORT_INTERVAL_MS = 200
+STATE_INTERVAL_MS = 20
+IMU_POLL_MS = 12
+SEEN_SEQS = 8
+READ_BYTES = 4096
+MAX_STATE_BATCH = 1000  # reports per write when the loop falls behind state_hz
+
+
+# ==========================
+# Sketch
+# ==========================
+class TeensyModel:
+    """teensy_gui.ino's command switch, frame handling and reporting, minus the audio.
+
+    poll(data) is pollHost(); every method returns the messages (bytes) the
+    sketch would write, in order.
+    """
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.vol = 0.4
+        self.pitch_a = self.pitch_b = 1.0
+        self.playing_a = self.playing_b = False
+        self.mixer = self.eq = False
+        self.song_a, self.song_b = 0, 1
+        self.binary = self.imu_stream = self.host_gestures = False
+        self.dirty = False
+        self._tx_seq = 0
+        self._rx = bytearray()
+        self._seen = deque([-1] * SEEN_SEQS, maxlen=SEEN_SEQS)
+        self.counts = {"commands": 0, "duplicates": 0, "unknown": 0, "bare_bytes": 0, "modes": 0}
+
+    def millis(self):
+        return int((time.monotonic() - self.t0) * 1000) & 0xFFFFFFFF
+
+    def _frame(self, msg_type, payload):
+        seq = self._tx_seq
+        self._tx_seq = (self._tx_seq + 1) & 0xFF
+        return encode(msg_type, seq, payload)
+
+    # --------------------------
+    # Playback helpers (Serial prints only)
+    # --------------------------
+    def _start(self, deck, idx):
+        idx %= len(PLAYLIST)
+        if deck == "A":
+            self.song_a, self.playing_a = idx, True
+        else:
+            self.song_b, self.playing_b = idx, True
+        return [f"Deck {deck} playing: {PLAYLIST[idx]}"]
+
+    def _stop(self, deck):
+        if deck == "A":
+            self.playing_a = False
+        else:
+            self.playing_b = False
+        return [f"Deck {deck} stopped"]
+
+    def handle_gesture(self, code):
+        """handleGesture(): (known, debug lines)."""
+        out = []
+        if code == 1:
+            if not self.playing_a:
+                out += self._start("A", self.song_a)
+            if self.mixer and not self.playing_b:
+                out += self._start("B", self.song_b)
+        elif code == 2:
+            if self.playing_a:
+                out += self._stop("A")
+        elif code == 4:
+            out += self._stop("A") + self._start("A", self.song_a + 1)
+        elif code == 5:
+            self.mixer = not self.mixer
+            if self.mixer:
+                out.append("🎚 Mixer Mode ON (controls locked)")
+                if not self.playing_b:
+                    out += self._start("B", self.song_a + 1)
+                out.append("Center Mix")
+            else:
+                out.append("🎚 Mixer Mode OFF (controls unlocked)")
+        elif code == 6:
+            if self.playing_b:
+                out += self._stop("B")
+        elif code == 7:
+            out += self._stop("B") + self._start("B", self.song_b + 1)
+        elif code == 8:
+            if not self.playing_b:
+                out += self._start("B", self.song_b)
+        elif code in (10, 11):
+            if self.mixer:
+                return False, out
+            step = 0.05 if code == 10 else -0.05
+            self.vol = min(max(self.vol + step, 0.0), 1.0)
+            out.append(f"Volume -> {self.vol:.2f}")
+        elif code in (12, 13):
+            if self.mixer:
+                return False, out
+            step = 0.05 if code == 12 else -0.05
+            self.pitch_a = min(max(self.pitch_a + step, 0.3), 2.5)
+            self.pitch_b = min(max(self.pitch_b + step, 0.3), 2.5)
+            out.append(f"Pitch -> A: {self.pitch_a:.2f}, B: {self.pitch_b:.2f}")
+        elif code in (14, 15):
+            if not self.mixer:
+                return False, out
+            out.append("Focus → Deck A" if code == 14 else "Focus → Deck B")
+        else:
+            return False, out
+        return True, out
+
+    def _lines(self, lines):
+        return [f"{line}\n".encode() for line in lines]
+
+    def handle_frame(self, msg_type, seq, payload):
+        if msg_type == MSG_MODE and len(payload) == 1:
+            self.binary = bool(payload[0] & MODE_BINARY)
+            self.imu_stream = self.binary and bool(payload[0] & MODE_IMU)
+            self.host_gestures = self.imu_stream and bool(payload[0] & MODE_HOST_GESTURES)
+            self._seen.extend([-1] * SEEN_SEQS)
+            self.dirty = True
+            self.counts["modes"] += 1
+            return []
+        if msg_type == MSG_COMMAND and len(payload) == 1:
+            self.counts["commands"] += 1
+            out = []
+            status = ACK_DUPLICATE
+            if seq in self._seen:
+                self.counts["duplicates"] += 1
+            else:
+                self._seen.append(seq)
+                known, lines = self.handle_gesture(payload[0])
+                out = self._lines(lines)
+                status = ACK_OK if known else ACK_UNKNOWN
+                self.counts["unknown"] += not known
+                self.dirty = True
+            return out + [self._frame(MSG_ACK, bytes((seq, status)))]
+        return []
+
+    def poll(self, data):
+        """pollHost(): feed received bytes, get the messages written in reply."""
+        out = []
+        rx = self._rx
+        for b in data:
+            if not rx:
+                if b == SYNC[0]:
+                    rx.append(b)
+                else:
+                    # Text mode: bare gesture byte
+                    self.counts["bare_bytes"] += 1
+                    # (no stateDirty here in the sketch: the next periodic report shows it)
+                    out += self._lines(self.handle_gesture(b)[1])
+                continue
+            if len(rx) == 1 and b != SYNC[1]:
+                rx.clear()
+                continue
+            rx.append(b)
+            if len(rx) >= 5 and len(rx) == 7 + rx[4]:
+                frame = bytes(rx)
+                rx.clear()
+                if encode(frame[2], frame[3], frame[5:-2]) == frame:  # CRC check
+                    out += self.handle_frame(frame[2], frame[3], frame[5:-2])
+        return out
+
+    # --------------------------
+    # Reporting
+    # --------------------------
+    def state(self):
+        """sendState(): one STATE frame in binary mode, the STATE: line otherwise."""
+        if self.binary:
+            on = {"deckA": self.playing_a, "deckB": self.playing_b, "mix": self.mixer, "eq": self.eq}
+            flags = sum(bit for name, bit in STATE_FLAGS if on.get(name))
+            return self._frame(MSG_STATE, STATE_STRUCT.pack(self.millis(), self.vol, self.pitch_a,
+                                                            self.pitch_b, flags, self.song_a, self.song_b))
+        return ("STATE:" + json.dumps({
+            "vol": round(self.vol, 2), "pitchA": round(self.pitch_a, 2), "pitchB": round(self.pitch_b, 2),
+            "deckA": int(self.playing_a), "deckB": int(self.playing_b), "mix": int(self.mixer), "echo": 0,
+        }, separators=(",", ":")) + "\n").encode()
+
+    def imu(self, rng):
+        """sendImu(): one IMU frame of sensor noise (filtered = raw, nothing crosses a threshold)."""
+        raw = [rng.gauss(0.0, 0.2) for _ in range(6)]
+        seq = self._tx_seq
+        self._tx_seq = (self._tx_seq + 1) & 0xFF
+        return encode_imu([self.millis()] + raw + raw, seq)
+
+
+# ==========================
+# Pseudo-terminal
+# ==========================
+class PtyTeensy:
+    """TeensyModel behind a pty; `path` is the device the host opens."""
+
+    def __init__(self, model=None, state_hz=None, latency_ms=0.0, jitter_ms=0.0, garble=0.0,
+                 text_hz=0.0, link=None, seed=None):
+        self.model = model or TeensyModel()
+        self.state_hz = state_hz
+        self.latency_s = latency_ms / 1000
+        self.jitter_s = jitter_ms / 1000
+        self.garble = garble
+        self.text_hz = text_hz
+        self._rng = random.Random(seed)
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.path = os.ttyname(self._slave)
+        self.link = link
+        if link:
+            if os.path.lexists(link):
+                os.unlink(link)
+            os.symlink(self.path, link)
+
+        self._inbox = deque()  # (due, bytes) in arrival order
+        self._stop = threading.Event()
+        self._thread = None
+        self.counts = {"bytes_in": 0, "bytes_out": 0, "states": 0, "imu": 0, "text": 0,
+                       "garbled": 0, "dropped": 0, "writes": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="teensy-emulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def close(self):
+        self.stop()
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _state_period(self):
+        if self.state_hz:
+            return 1.0 / self.state_hz
+        return (STATE_INTERVAL_MS if self.model.binary else REPORT_INTERVAL_MS) / 1000
+
+    # --------------------------
+    # Loop
+    # --------------------------
+    def _run(self):
+        model = self.model
+        next_state = next_imu = next_text = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            wake = [next_state, self._inbox[0][0] if self._inbox else now + 0.05]
+            if model.imu_stream:
+                wake.append(next_imu)
+            if self.text_hz:
+                wake.append(next_text)
+            ready, _, _ = select.select([self._master], [], [], min(max(min(wake) - now, 0.0), 0.05))
+            if ready:
+                self._receive()
+
+            now = time.monotonic()
+            out = []
+            while self._inbox and self._inbox[0][0] <= now:
+                out += model.poll(self._inbox.popleft()[1])
+            # Same rule as loop(): a command's STATE goes out at once, else on the period
+            period = self._state_period()
+            due = 0
+            if now >= next_state:
+                due = min(int((now - next_state) / period) + 1, MAX_STATE_BATCH)
+                next_state += due * period
+                if next_state < now:  # too far behind: skip ahead rather than burst
+                    next_state = now + period
+            elif model.dirty:
+                due = 1
+                next_state = now + period
+            if due:
+                out += [model.state() for _ in range(due)]
+                self.counts["states"] += due
+                model.dirty = False
+            if model.imu_stream and now >= next_imu:
+                out.append(model.imu(self._rng))
+                self.counts["imu"] += 1
+                next_imu = max(next_imu + IMU_POLL_MS / 1000, now)
+            if self.text_hz and now >= next_text:
+                out.append(f"debug t={model.millis()}\n".encode())
+                self.counts["text"] += 1
+                next_text = max(next_text + 1 / self.text_hz, now)
+            if out:
+                self._send(out)
+
+    def _receive(self):
+        try:
+            data = os.read(self._master, READ_BYTES)
+        except (BlockingIOError, OSError):
+            # EIO while no host has the slave open
+            time.sleep(0.01)
+            return
+        self.counts["bytes_in"] += len(data)
+        if not self.latency_s and not self.jitter_s:
+            self._inbox.append((0.0, data))
+            return
+        due = time.monotonic() + self.latency_s + self._rng.uniform(0.0, self.jitter_s)
+        # Serial is in order: a jittered chunk never overtakes the one before it
+        if self._inbox:
+            due = max(due, self._inbox[-1][0])
+        self._inbox.append((due, data))
+
+    def _send(self, messages):
+        if self.garble:
+            for i, msg in enumerate(messages):
+                if self._rng.random() < self.garble:
+                    msg = bytearray(msg)
+                    msg[self._rng.randrange(len(msg))] ^= 1 << self._rng.randrange(8)
+                    messages[i] = bytes(msg)
+                    self.counts["garbled"] += 1
+        data = b"".join(messages)
+        try:
+            written = os.write(self._master, data)
+        except BlockingIOError:
+            written = 0
+        self.counts["writes"] += 1
+        self.counts["bytes_out"] += written
+        if written < len(data):
+            self.counts["dropped"] += len(messages)  # roughly: the tail of the batch is gone
+
+    def stats(self):
+        return {**self.counts, **self.model.counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate teensy_gui.ino on a pseudo-terminal")
+    parser.add_argument("--state-hz", type=float, help="STATE reports per second (default: the sketch's 5 / 50)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before the sketch sees host bytes")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, up to this")
+    parser.add_argument("--garble", type=float, default=0.0, help="chance each outgoing message has a byte flipped")
+    parser.add_argument("--text-hz", type=float, default=0.0, help="filler debug lines per second")
+    parser.add_argument("--link", help="also reachable through this symlink (e.g. /tmp/ttyTEENSY)")
+    parser.add_argument("--seconds", type=float, help="exit after this long")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    emulator = PtyTeensy(state_hz=args.state_hz, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         garble=args.garble, text_hz=args.text_hz, link=args.link, seed=args.seed).start()
+    print(f"Teensy emulator on {emulator.path}" + (f" ({args.link})" if args.link else ""))
+    start = time.monotonic()
+    try:
+        while args.seconds is None or time.monotonic() - start < args.seconds:
+            time.sleep(5.0 if args.seconds is None else min(5.0, args.seconds))
+            print("Emulator:", emulator.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.close()
+        print("Emulator:", emulator.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -71,6 +71,11 @@ struct Vec3 { float x; float y; float z; };
 Vec3 accelFilt = {0,0,0};
 Vec3 gyroFilt  = {0,0,0};
 
+// ---------- GESTURE THRESHOLDS (mirrored in imu_stream.py for the GUI plots) ----------
+const float XFADE_THRESH = 6.0f;   // filtered accel Y, crossfade (mixer mode)
+const float VOL_THRESH   = 6.0f;   // filtered gyro X, volume
+const float PITCH_THRESH = 6.0f;   // filtered gyro Y, pitch
+
 // ---------- TIMING / DEBOUNCE ----------
 const unsigned long IMU_POLL_MS = 12;
 const unsigned long GESTURE_COOLDOWN_MS = 500;
@@ -80,6 +85,70 @@ unsigned long lastGestureTime = 0;
 unsigned long lastReportTime = 0;
 const unsigned long REPORT_INTERVAL_MS = 200;
 
+// ---------- HOST LINK (framed protocol, see protocol.py) ----------
+// A5 5A | type | seq | len | payload[len] | crc16 (CCITT-FALSE, little endian)
+// Boots in text mode (bare gesture bytes in, STATE:{json} out); a MODE frame
+// switches to binary STATE frames at STATE_INTERVAL_MS plus acked commands.
+// MODE_IMU in the MODE byte also streams one IMU frame per IMU read.
+const uint8_t SYNC0 = 0xA5;
+const uint8_t SYNC1 = 0x5A;
+const uint8_t MSG_COMMAND = 0x01;
+const uint8_t MSG_ACK     = 0x02;
+const uint8_t MSG_STATE   = 0x03;
+const uint8_t MSG_IMU     = 0x04;
+const uint8_t MSG_MODE    = 0x05;
+const uint8_t MODE_BINARY = 0x01, MODE_IMU = 0x02, MODE_HOST_GESTURES = 0x04;
+const uint8_t ACK_OK = 0, ACK_DUPLICATE = 1, ACK_UNKNOWN = 2;
+const unsigned long STATE_INTERVAL_MS = 20;
+
+struct __attribute__((packed)) StatePayload {
+  uint32_t t_ms;
+  float vol, pitchA, pitchB;
+  uint8_t flags;  // 1 deckA, 2 deckB, 4 mix, 8 eq, 16 echo
+  uint8_t songA, songB;
+};
+
+struct __attribute__((packed)) ImuPayload {
+  uint32_t t_ms;
+  Vec3 lin, gyr;          // raw BNO055 linear accel / gyro
+  Vec3 linFilt, gyrFilt;  // what the thresholds compare against
+};
+
+bool binaryMode = false;
+bool imuStream = false;
+bool hostGestures = false;    // host classifies the IMU stream (imu_classifier.py); skip thresholds
+bool stateDirty = false;      // send STATE right after a command
+uint8_t txSeq = 0;
+uint8_t rxFrame[5 + 255 + 2];
+uint16_t rxLen = 0;
+const int SEEN_SEQS = 8;      // recent command seqs, so retransmits run once
+int16_t seenSeq[SEEN_SEQS];
+uint8_t seenNext = 0;
+
+uint16_t crc16(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int b = 0; b < 8; b++) crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+  }
+  return crc;
+}
+
+void sendFrame(uint8_t type, const void *payload, uint8_t len) {
+  uint8_t frame[5 + 255 + 2];
+  frame[0] = SYNC0; frame[1] = SYNC1;
+  frame[2] = type; frame[3] = txSeq++; frame[4] = len;
+  memcpy(frame + 5, payload, len);
+  uint16_t crc = crc16(frame + 2, 3 + len);
+  frame[5 + len] = crc & 0xFF;
+  frame[6 + len] = crc >> 8;
+  Serial.write(frame, 7 + len);
+}
+
+void clearSeenSeqs() {
+  for (int i = 0; i < SEEN_SEQS; i++) seenSeq[i] = -1;
+}
+
 inline float iirf(float prev, float sample, float alpha) {
   return alpha * sample + (1.0f - alpha) * prev;
 }
@@ -174,75 +243,182 @@ void centerMix() {
 void handleLinearGesturesForCrossfade() {
   if (!readyForGesture()) return;
   float y = accelFilt.y;
-  const float THRESH = 6.0f;
-  if (y > THRESH) {
+  if (y > XFADE_THRESH) {
     focusDeckB();
     confirmGesture();
-  } else if (y < -THRESH) {
+  } else if (y < -XFADE_THRESH) {
     focusDeckA();
     confirmGesture();
   }
 }
 
 // ---------- GYRO CONTROLS (volume & pitch) - only if NOT in mixerMode ----------
+// One step up (dir > 0) or down; shared by the IMU thresholds and host commands 10-13
+void stepVolume(int dir) {
+  volumeLevel = dir > 0 ? min(1.0f, volumeLevel + 0.05f) : max(0.0f, volumeLevel - 0.05f);
+  sgtl5000.volume(volumeLevel);
+  Serial.printf("Volume -> %.2f\n", volumeLevel);
+}
+
+void stepPitch(int dir) {
+  pitchA = constrain(pitchA + (dir > 0 ? 0.05f : -0.05f), 0.3f, 2.5f);
+  pitchB = constrain(pitchB + (dir > 0 ? 0.05f : -0.05f), 0.3f, 2.5f);
+  granularAL.setSpeed(pitchA);
+  granularAR.setSpeed(pitchA);
+  granularBL.setSpeed(pitchB);
+  granularBR.setSpeed(pitchB);
+  Serial.printf("Pitch -> A: %.2f, B: %.2f\n", pitchA, pitchB);
+}
+
 void handleGyroControls() {
   if (!readyForGesture()) return;
-  bool changed = false;
 
   // Volume -> roll (gyro x)
-  const float VOL_THRESH = 6.0f;
   float rollRate = gyroFilt.x;
-  if (rollRate > VOL_THRESH) {
-    volumeLevel = min(1.0f, volumeLevel + 0.05f);
-    changed = true;
-  } else if (rollRate < -VOL_THRESH) {
-    volumeLevel = max(0.0f, volumeLevel - 0.05f);
-    changed = true;
-  }
-
-  if (changed) {
-    sgtl5000.volume(volumeLevel);
-    Serial.printf("Volume -> %.2f\n", volumeLevel);
+  if (rollRate > VOL_THRESH || rollRate < -VOL_THRESH) {
+    stepVolume(rollRate > 0 ? 1 : -1);
     confirmGesture();
   }
 
   // Pitch -> gyro y (affects both decks equally in this merged design)
-  changed = false;
-  const float PITCH_THRESH = 6.0f;
   float pitchRate = gyroFilt.y;
-  if (pitchRate > PITCH_THRESH) {
-    pitchA += 0.05f; pitchB += 0.05f;
-    if (pitchA > 2.5f) pitchA = 2.5f;
-    if (pitchB > 2.5f) pitchB = 2.5f;
-    changed = true;
-  } else if (pitchRate < -PITCH_THRESH) {
-    pitchA -= 0.05f; pitchB -= 0.05f;
-    if (pitchA < 0.3f) pitchA = 0.3f;
-    if (pitchB < 0.3f) pitchB = 0.3f;
-    changed = true;
-  }
-
-  if (changed) {
-    granularAL.setSpeed(pitchA);
-    granularAR.setSpeed(pitchA);
-    granularBL.setSpeed(pitchB);
-    granularBR.setSpeed(pitchB);
-    Serial.printf("Pitch -> A: %.2f, B: %.2f\n", pitchA, pitchB);
+  if (pitchRate > PITCH_THRESH || pitchRate < -PITCH_THRESH) {
+    stepPitch(pitchRate > 0 ? 1 : -1);
     confirmGesture();
   }
 }
 
 // ---------- GUI REPORTING ----------
 void sendState() {
+  if (binaryMode) {
+    StatePayload st = {millis(), volumeLevel, pitchA, pitchB,
+                       (uint8_t)(isPlayingA | isPlayingB << 1 | mixerMode << 2 | eqMode << 3),
+                       (uint8_t)currentSongA, (uint8_t)currentSongB};
+    sendFrame(MSG_STATE, &st, sizeof(st));
+    return;
+  }
   // Format: STATE:{"vol":0.40,"pitchA":1.00,"pitchB":1.00,"deckA":1,"deckB":0,"mix":0,"echo":0}
   Serial.printf("STATE:{\"vol\":%.2f,\"pitchA\":%.2f,\"pitchB\":%.2f,\"deckA\":%d,\"deckB\":%d,\"mix\":%d,\"echo\":0}\n",
                 volumeLevel, pitchA, pitchB, isPlayingA, isPlayingB, mixerMode);
 }
 
+// ---------- RPi GESTURES ----------
+// Returns false for a byte that is not a gesture code.
+bool handleGesture(int gesture) {
+  switch (gesture) {
+    case 1: // open palm -> start Deck A (and ensure Deck B queued)
+      if (!isPlayingA) startDeckA(currentSongA);
+      // if in mixer mode, also ensure deck B is playing
+      if (mixerMode && !isPlayingB) startDeckB(currentSongB);
+      break;
+    case 2: // closed fist -> stop Deck A
+      if (isPlayingA) stopDeckA();
+      break;
+    case 4: // pointing up -> next song on Deck A
+      nextSongA();
+      break;
+    case 5: // thumbs up -> toggle mixer mode
+      mixerMode = !mixerMode;
+      if (mixerMode) {
+        Serial.println("🎚 Mixer Mode ON (controls locked)");
+        // start Deck B if not playing and choose next track
+        if (!isPlayingB) {
+          currentSongB = (currentSongA + 1) % NUM_SONGS;
+          startDeckB(currentSongB);
+        }
+        // center mix when entering or keep last crossfade? choose center
+        centerMix();
+      } else {
+        Serial.println("🎚 Mixer Mode OFF (controls unlocked)");
+        // stopping deck B when leaving mixer mode is optional; keep it playing
+        // you can choose to stop deck B: stopDeckB();
+      }
+      break;
+    case 6: // stop Deck B
+      if (isPlayingB) stopDeckB();
+      break;
+    case 7: // next song on Deck B
+      nextSongB();
+      break;
+    case 8: // start Deck B (two-hand mode: open palm on the Deck B hand)
+      if (!isPlayingB) startDeckB(currentSongB);
+      break;
+    // 10-15: IMU gestures classified on the host (same actions as the thresholds)
+    case 10: case 11: // volume up / down
+      if (mixerMode) return false;
+      stepVolume(gesture == 10 ? 1 : -1);
+      break;
+    case 12: case 13: // pitch up / down
+      if (mixerMode) return false;
+      stepPitch(gesture == 12 ? 1 : -1);
+      break;
+    case 14: case 15: // crossfade focus A / B
+      if (!mixerMode) return false;
+      if (gesture == 14) focusDeckA(); else focusDeckB();
+      break;
+    default:
+      return false;
+  }
+  return true;
+}
+
+void sendImu(const sensors_event_t &lin, const sensors_event_t &gyr) {
+  ImuPayload p = {millis(),
+                  {lin.acceleration.x, lin.acceleration.y, lin.acceleration.z},
+                  {gyr.gyro.x, gyr.gyro.y, gyr.gyro.z},
+                  accelFilt, gyroFilt};
+  sendFrame(MSG_IMU, &p, sizeof(p));
+}
+
+// ---------- HOST FRAMES ----------
+void handleFrame(uint8_t type, uint8_t seq, const uint8_t *payload, uint8_t len) {
+  if (type == MSG_MODE && len == 1) {
+    binaryMode = payload[0] & MODE_BINARY;
+    imuStream = binaryMode && (payload[0] & MODE_IMU);
+    hostGestures = imuStream && (payload[0] & MODE_HOST_GESTURES);
+    clearSeenSeqs();  // new host session, seqs restart
+    stateDirty = true;
+  } else if (type == MSG_COMMAND && len == 1) {
+    bool duplicate = false;
+    for (int i = 0; i < SEEN_SEQS; i++) duplicate |= seenSeq[i] == seq;
+    uint8_t ack[2] = {seq, ACK_DUPLICATE};
+    if (!duplicate) {
+      seenSeq[seenNext] = seq;
+      seenNext = (seenNext + 1) % SEEN_SEQS;
+      ack[1] = handleGesture(payload[0]) ? ACK_OK : ACK_UNKNOWN;
+      stateDirty = true;
+    }
+    sendFrame(MSG_ACK, ack, sizeof(ack));
+  }
+}
+
+void pollHost() {
+  while (Serial.available()) {
+    uint8_t b = Serial.read();
+    if (rxLen == 0) {
+      if (b == SYNC0) rxFrame[rxLen++] = b;
+      else handleGesture(b);  // text mode: bare gesture byte
+      continue;
+    }
+    if (rxLen == 1 && b != SYNC1) {
+      rxLen = 0;
+      continue;
+    }
+    rxFrame[rxLen++] = b;
+    if (rxLen >= 5 && rxLen == 7 + rxFrame[4]) {
+      uint8_t len = rxFrame[4];
+      uint16_t crc = rxFrame[5 + len] | (rxFrame[6 + len] << 8);
+      if (crc == crc16(rxFrame + 2, 3 + len)) handleFrame(rxFrame[2], rxFrame[3], rxFrame + 5, len);
+      rxLen = 0;
+    }
+  }
+}
+
 // ---------- SETUP ----------
 void setup() {
   Serial.begin(115200);
   delay(80);
+  clearSeenSeqs();
   Serial.println("=== Unified Dual-Deck DJ (Mixer + Granular) ===");
 
   Wire2.setClock(400000);
@@ -281,46 +457,8 @@ void setup() {
 void loop() {
   unsigned long now = millis();
 
-  // --- Serial/RPi gestures ---
-  if (Serial.available()) {
-    int gesture = Serial.read();
-    switch (gesture) {
-      case 1: // open palm -> start Deck A (and ensure Deck B queued)
-        if (!isPlayingA) startDeckA(currentSongA);
-        // if in mixer mode, also ensure deck B is playing
-        if (mixerMode && !isPlayingB) startDeckB(currentSongB);
-        break;
-      case 2: // closed fist -> stop Deck A
-        if (isPlayingA) stopDeckA();
-        break;
-      case 4: // pointing up -> next song on Deck A
-        nextSongA();
-        break;
-      case 5: // thumbs up -> toggle mixer mode
-        mixerMode = !mixerMode;
-        if (mixerMode) {
-          Serial.println("🎚 Mixer Mode ON (controls locked)");
-          // start Deck B if not playing and choose next track
-          if (!isPlayingB) {
-            currentSongB = (currentSongA + 1) % NUM_SONGS;
-            startDeckB(currentSongB);
-          }
-          // center mix when entering or keep last crossfade? choose center
-          centerMix();
-        } else {
-          Serial.println("🎚 Mixer Mode OFF (controls unlocked)");
-          // stopping deck B when leaving mixer mode is optional; keep it playing
-          // you can choose to stop deck B: stopDeckB();
-        }
-        break;
-      case 6: // stop Deck B
-        if (isPlayingB) stopDeckB();
-        break;
-      case 7: // next song on Deck B
-        nextSongB();
-        break;
-    }
-  }
+  // --- Serial/RPi gestures (framed or bare bytes) ---
+  pollHost();
 
   // --- IMU gestures ---
   if (imuConnected && (now - lastImuSuccessfulRead > IMU_POLL_MS)) {
@@ -328,10 +466,12 @@ void loop() {
     sensors_event_t lin, gyr;
     bno.getEvent(&lin, Adafruit_BNO055::VECTOR_LINEARACCEL);
     bno.getEvent(&gyr, Adafruit_BNO055::VECTOR_GYROSCOPE);
-    // Serial.printf("IMU:%.3f,%.3f,%.3f,%.3f,%.3f,%.3f\n", lin.acceleration.x, lin.acceleration.y, lin.acceleration.z, gyr.gyro.x, gyr.gyro.y, gyr.gyro.z);
     updateFilters(lin, gyr);
+    if (imuStream) sendImu(lin, gyr);
 
-    if (mixerMode) {
+    if (hostGestures) {
+      // imu_classifier.py decides from the stream and sends codes 10-15
+    } else if (mixerMode) {
       // While in mixer mode we only allow crossfade gestures (accel Y)
       handleLinearGesturesForCrossfade();
       // IMPORTANT: controls are locked -> do NOT call handleGyroControls()
@@ -342,8 +482,10 @@ void loop() {
   }
 
   // --- GUI Reporting ---
-  if (now - lastReportTime > REPORT_INTERVAL_MS) {
+  unsigned long reportInterval = binaryMode ? STATE_INTERVAL_MS : REPORT_INTERVAL_MS;
+  if (stateDirty || now - lastReportTime > reportInterval) {
     sendState();
     lastReportTime = now;
+    stateDirty = false;
   }
 }
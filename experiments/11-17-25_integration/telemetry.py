@@ -0,0 +1,323 @@
+"""Session telemetry: every command, ack and Teensy STATE, in columnar segment files.
+
+TeensyLink(telemetry=log) feeds a TelemetryLog. Every layout (threads,
+--processes, --asyncio) and every command source (vision, swipes, IMU
+classifier) goes through the link, so nothing is missed. The link's
+threads only put a tuple on a SimpleQueue; past MAX_PENDING records are
+dropped and counted, never waited for. A background thread fills a
+BLOCK_ROWS buffer and writes it out as one block every FLUSH_S. Deck and
+song changes are derived from consecutive STATEs there too.
+
+Each segment file is
+
+    [header, HEADER_BYTES: HEADER_DTYPE + schema JSON]
+    [block: BLOCK_DTYPE (magic, rows) | column 0 x rows | column 1 x rows | ...]...
+
+with the fixed COLUMNS schema, so a block's size follows from its row count
+and the loader jumps from block to block without parsing a record. A
+segment past SEGMENT_BYTES is closed and the next one started
+(session_<start>_0001.gsttel, ...). A torn last block (power cut mid-write)
+is skipped.
+
+    python telemetry.py telemetry/            # every session in the directory
+    python telemetry.py telemetry/session_20251120-201502_0000.gsttel
+
+load_telemetry() returns {column: array} for any set of files or
+directories, with only the asked-for columns and kinds. Times are
+t_ns (time.monotonic_ns, the camera and tracer clock) plus teensy_ms on
+STATE rows. The header's wall_time maps a session onto the clock on the wall.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from protocol import STATE_FLAGS
+
+MAGIC = b"GSTTEL1\0"
+BLOCK_MAGIC = b"BLK\0"
+HEADER_BYTES = 1024
+SUFFIX = ".gsttel"
+BLOCK_ROWS = 4096
+FLUSH_S = 1.0
+SEGMENT_BYTES = 16 << 20
+MAX_PENDING = 65536  # queued records before new ones are dropped
+
+KINDS = ("command", "ack", "lost", "state", "deck", "song")
+KIND = {name: i for i, name in enumerate(KINDS)}
+DECKS = ("", "A", "B")  # deck column: 0 = not deck-specific
+FLAG_BITS = dict(STATE_FLAGS)
+
+COLUMNS = (
+    ("t_ns", "<i8"),        # host time.monotonic_ns
+    ("kind", "<u1"),        # index into KINDS
+    ("code", "<i1"),        # gesture code (command / ack / lost), -1 otherwise
+    ("seq", "<i2"),         # frame seq in binary mode, -1 otherwise
+    ("value", "<f4"),       # ack: rtt ms; deck: 1 playing / 0 stopped; song: new index
+    ("deck", "<u1"),        # deck / song rows: index into DECKS
+    ("teensy_ms", "<u4"),   # STATE rows from here on
+    ("vol", "<f4"),
+    ("pitchA", "<f4"),
+    ("pitchB", "<f4"),
+    ("flags", "<u1"),       # protocol.STATE_FLAGS bits
+    ("songA", "<u1"),
+    ("songB", "<u1"),
+)
+ROW_DTYPE = np.dtype(list(COLUMNS))
+EMPTY_ROW = (0, 0, -1, -1, np.nan, 0, 0, 0.0, 0.0, 0.0, 0, 0, 0)
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("version", "<u4"), ("segment", "<u4"), ("session", "<i8"),
+    ("wall_time", "<f8"), ("t0_ns", "<i8"), ("schema_bytes", "<u4"),
+])
+BLOCK_DTYPE = np.dtype([("magic", "S4"), ("rows", "<u4")])
+
+
+# ==========================
+# Writer
+# ==========================
+class TelemetryLog:
+    """Append-only session log; command()/ack()/lost()/state() never block."""
+
+    def __init__(self, directory, prefix="session", segment_bytes=SEGMENT_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.wall_time = time.time()
+        self.session = int(self.wall_time)
+        self.stem = f"{prefix}_{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.wall_time))}"
+        self.segment = 0
+
+        self._jobs = queue.SimpleQueue()
+        self._buffer = np.empty(BLOCK_ROWS, dtype=ROW_DTYPE)
+        self._rows = 0
+        self._last_state = None
+
+        self.records = 0
+        self.dropped = 0
+        self.blocks = 0
+        self.bytes = 0
+
+        self._open_file()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _segment_path(self):
+        return self.directory / f"{self.stem}_{self.segment:04d}{SUFFIX}"
+
+    def _open_file(self):
+        self.path = self._segment_path()
+        schema = json.dumps(COLUMNS).encode()
+        header = np.array([(MAGIC, 1, self.segment, self.session, self.wall_time,
+                            time.monotonic_ns(), len(schema))], dtype=HEADER_DTYPE)
+        self._file = open(self.path, "wb")
+        self._file.write((header.tobytes() + schema).ljust(HEADER_BYTES, b"\0"))
+        self._file.flush()
+        self.bytes += HEADER_BYTES
+
+    # --------------------------
+    # Link side (never block)
+    # --------------------------
+    def _put(self, item):
+        if self._jobs.qsize() >= MAX_PENDING:
+            self.dropped += 1
+            return
+        self._jobs.put(item)
+
+    def command(self, code, seq=-1):
+        self._put((KIND["command"], time.monotonic_ns(), code, seq, np.nan))
+
+    def ack(self, code, seq, rtt_ms):
+        self._put((KIND["ack"], time.monotonic_ns(), code, seq, rtt_ms))
+
+    def lost(self, code, seq):
+        self._put((KIND["lost"], time.monotonic_ns(), code, seq, np.nan))
+
+    def state(self, state):
+        """A decoded STATE dict (protocol.decode_state or a text-mode STATE: line)."""
+        self._put((KIND["state"], time.monotonic_ns(), state))
+
+    # --------------------------
+    # Writer thread
+    # --------------------------
+    def _run(self):
+        flush_at = time.monotonic() + FLUSH_S
+        while True:
+            try:
+                item = self._jobs.get(timeout=max(flush_at - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._append(item)
+            # A STATE adds up to 5 rows (itself + deck / song changes)
+            if self._rows > BLOCK_ROWS - 5 or time.monotonic() >= flush_at:
+                self._flush()
+                flush_at = time.monotonic() + FLUSH_S
+        self._flush()
+        self._file.close()
+
+    def _row(self, kind, t_ns, code=-1, seq=-1, value=np.nan, deck=0):
+        self._buffer[self._rows] = EMPTY_ROW
+        row = self._buffer[self._rows]
+        row["kind"], row["t_ns"], row["code"], row["seq"] = kind, t_ns, code, seq
+        row["value"], row["deck"] = value, deck
+        self._rows += 1
+        self.records += 1
+        return row
+
+    def _append(self, item):
+        if item[0] != KIND["state"]:
+            self._row(*item)
+            return
+        _, t_ns, state = item
+        row = self._row(KIND["state"], t_ns)
+        flags = sum(bit for name, bit in STATE_FLAGS if state.get(name))
+        row["teensy_ms"] = int(state.get("t_ms", 0)) & 0xFFFFFFFF
+        row["vol"], row["pitchA"], row["pitchB"] = (state.get(k, 0.0) for k in ("vol", "pitchA", "pitchB"))
+        row["flags"], row["songA"], row["songB"] = flags, state.get("songA", 0), state.get("songB", 0)
+
+        last = self._last_state
+        self._last_state = (flags, row["songA"], row["songB"])
+        if last is None:
+            return
+        for deck in (1, 2):
+            bit = FLAG_BITS[f"deck{DECKS[deck]}"]
+            if (flags ^ last[0]) & bit:
+                self._row(KIND["deck"], t_ns, value=float(bool(flags & bit)), deck=deck)
+            if self._last_state[deck] != last[deck]:
+                self._row(KIND["song"], t_ns, value=float(self._last_state[deck]), deck=deck)
+
+    def _flush(self):
+        if not self._rows:
+            return
+        block = self._buffer[:self._rows]
+        parts = [np.array([(BLOCK_MAGIC, self._rows)], dtype=BLOCK_DTYPE).tobytes()]
+        parts += [np.ascontiguousarray(block[name]).tobytes() for name, _ in COLUMNS]
+        data = b"".join(parts)
+        self._file.write(data)
+        self._file.flush()
+        self.bytes += len(data)
+        self.blocks += 1
+        self._rows = 0
+        if self._file.tell() >= self.segment_bytes:
+            self._file.close()
+            self.segment += 1
+            self._open_file()
+
+    def close(self):
+        self._jobs.put(None)
+        self._thread.join(timeout=5.0)
+
+    def stats(self):
+        return {"records": self.records, "dropped": self.dropped, "blocks": self.blocks,
+                "segment": self.segment, "bytes": self.bytes}
+
+
+# ==========================
+# Loader
+# ==========================
+def segment_paths(paths):
+    """Files and directories -> .gsttel segment files in session, then segment, order."""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    found = []
+    for path in map(Path, paths):
+        found += sorted(path.glob(f"*{SUFFIX}")) if path.is_dir() else [path]
+    return found
+
+
+def read_segment(path, columns=None):
+    """One segment -> (header, {column: array}); columns=None reads them all."""
+    raw = np.memmap(path, dtype=np.uint8, mode="r")
+    header = raw[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+    if header["magic"] != MAGIC.rstrip(b"\0"):
+        raise ValueError(f"{path} is not a telemetry segment")
+    start = HEADER_DTYPE.itemsize
+    schema = [(name, np.dtype(dt)) for name, dt in json.loads(bytes(raw[start:start + header["schema_bytes"]]))]
+    wanted = {name for name, _ in schema} if columns is None else set(columns)
+    row_bytes = sum(dt.itemsize for _, dt in schema)
+
+    parts = {name: [] for name, _ in schema if name in wanted}
+    offset = HEADER_BYTES
+    while offset + BLOCK_DTYPE.itemsize <= len(raw):
+        block = raw[offset:offset + BLOCK_DTYPE.itemsize].view(BLOCK_DTYPE)[0]
+        rows = int(block["rows"])
+        end = offset + BLOCK_DTYPE.itemsize + rows * row_bytes
+        if block["magic"] != BLOCK_MAGIC.rstrip(b"\0") or end > len(raw):
+            break  # torn or partial last block
+        pos = offset + BLOCK_DTYPE.itemsize
+        for name, dt in schema:
+            size = rows * dt.itemsize
+            if name in parts:
+                parts[name].append(raw[pos:pos + size].view(dt))
+            pos += size
+        offset = end
+    data = {name: np.concatenate(chunks) if chunks else np.empty(0, dtype=dict(schema)[name])
+            for name, chunks in parts.items()}
+    return header, data
+
+
+def load_telemetry(paths, columns=None, kinds=None):
+    """Every row of every segment under `paths` as {column: array}, plus "session".
+
+    `kinds` keeps only those record kinds (names from KINDS).
+    """
+    if columns is not None:
+        columns = set(columns) | {"kind"}
+    out = {}
+    for path in segment_paths(paths):
+        header, data = read_segment(path, columns)
+        if kinds is not None:
+            keep = np.isin(data["kind"], [KIND[k] for k in kinds])
+            data = {name: values[keep] for name, values in data.items()}
+        data["session"] = np.full(len(data["kind"]), header["session"], dtype=np.int64)
+        for name, values in data.items():
+            out.setdefault(name, []).append(values)
+    return {name: np.concatenate(chunks) for name, chunks in out.items()}
+
+
+def summarize(data):
+    """Per-session counts and timings from load_telemetry() output."""
+    report = {}
+    for session in np.unique(data["session"]):
+        rows = data["session"] == session
+        kind = data["kind"][rows]
+        t_s = data["t_ns"][rows] / 1e9
+        codes = data["code"][rows][kind == KIND["command"]]
+        rtt = data["value"][rows][kind == KIND["ack"]]
+        report[time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(session)))] = {
+            "duration_s": round(float(t_s.max() - t_s.min()), 1) if len(t_s) else 0.0,
+            "records": int(rows.sum()),
+            "rows_by_kind": {name: int((kind == i).sum()) for i, name in enumerate(KINDS)},
+            "commands_by_code": {int(c): int(n) for c, n in zip(*np.unique(codes, return_counts=True))},
+            "ack_rtt_ms": {f"p{q}": round(float(v), 2) for q, v in zip((50, 95, 99), np.percentile(rtt, (50, 95, 99)))}
+            if len(rtt) else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize session telemetry logs")
+    parser.add_argument("paths", nargs="+", help=f"{SUFFIX} segments or directories of them")
+    parser.add_argument("--json", help="write the summary here")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    data = load_telemetry(args.paths, columns=("t_ns", "kind", "code", "value"))
+    print(f"{len(data.get('kind', ()))} records loaded in {time.perf_counter() - started:.2f} s")
+    report = summarize(data) if data else {}
+    for session, summary in report.items():
+        print(session, summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""GestureDebouncer: N-of-M confirmation, hysteresis and cooldowns."""
+from debounce import DEFAULT_COOLDOWNS_S, GestureDebouncer
+from gestures import GESTURE_CODES, IMU_GESTURE_CODES, SWIPE_GESTURE_CODES
+
+
+def feed(debouncer, results, start_ms=0, step_ms=33):
+    """[(gesture, score)] -> codes returned, one per result."""
+    return [debouncer.update(g, s, start_ms + i * step_ms) for i, (g, s) in enumerate(results)]
+
+
+def test_confirms_after_n_of_m():
+    d = GestureDebouncer(confirm=3, window=5)
+    out = feed(d, [("Open_Palm", 0.9)] * 4)
+    assert out == [None, None, 1, None]  # sent once, on the third, not repeated
+    assert d.active == 1 and d.emitted == 1
+
+
+def test_flicker_never_confirms():
+    d = GestureDebouncer(confirm=3, window=5)
+    out = feed(d, [("Open_Palm", 0.9), ("None", 0.9), ("Closed_Fist", 0.9), ("Open_Palm", 0.9),
+                   ("None", 0.9), ("Closed_Fist", 0.9)])
+    assert out == [None] * 6
+    assert d.emitted == 0
+
+
+def test_low_scores_count_as_no_gesture():
+    d = GestureDebouncer(min_score=0.6, confirm=2, window=3)
+    assert feed(d, [("Victory", 0.5)] * 3) == [None] * 3
+    assert d.low_score == 3
+
+
+def test_hysteresis_keeps_an_active_gesture_above_release_score():
+    d = GestureDebouncer(min_score=0.6, release_score=0.4, confirm=2, window=3)
+    feed(d, [("Open_Palm", 0.9)] * 2)
+    feed(d, [("Open_Palm", 0.45)] * 3, start_ms=100)
+    assert d.active == 1 and d.low_score == 0
+
+
+def test_cooldown_holds_a_repeat():
+    d = GestureDebouncer(confirm=1, window=1)
+    assert d.update("Thumb_Up", 0.9, 0) == 5
+    d.update("None", 0.9, 100)
+    assert d.update("Thumb_Up", 0.9, 200) is None  # 5 has a 1.5 s cooldown
+    assert d.cooldown == 1
+    d.update("None", 0.9, 1400)
+    assert d.update("Thumb_Up", 0.9, 1600) == 5
+
+
+def test_every_code_has_an_explicit_cooldown():
+    codes = set(GESTURE_CODES.values()) | set(IMU_GESTURE_CODES.values()) | set(SWIPE_GESTURE_CODES.values())
+    assert codes <= set(DEFAULT_COOLDOWNS_S)
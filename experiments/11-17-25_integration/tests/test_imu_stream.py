@@ -0,0 +1,24 @@
+"""minmax_decimate: bounded output that keeps every peak."""
+import numpy as np
+
+from imu_stream import minmax_decimate
+
+
+def test_short_input_is_returned_as_is():
+    t = np.arange(10.0)
+    out_t, out_y = minmax_decimate(t, t * 2, 8)
+    assert out_t is t and len(out_y) == 10
+
+
+def test_keeps_peaks_in_time_order():
+    rng = np.random.default_rng(0)
+    n, buckets = 10_007, 100
+    t = np.arange(n, dtype=np.float64)
+    y = rng.normal(size=n)
+    y[5000], y[9000] = 50.0, -50.0
+    out_t, out_y = minmax_decimate(t, y, buckets)
+    assert len(out_y) == 2 * buckets
+    assert out_y.max() == 50.0 and out_y.min() == -50.0
+    assert np.all(np.diff(out_t) >= 0)
+    assert out_t[-1] == n - 1  # leftovers are dropped from the old end
+    np.testing.assert_array_equal(y[out_t.astype(int)], out_y)
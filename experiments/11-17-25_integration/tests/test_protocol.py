@@ -0,0 +1,141 @@
+"""Wire format (protocol.py): frames, the mixed frame/text parser, TeensyLink."""
+import time
+
+import pytest
+
+from protocol import (ACK_DUPLICATE, ACK_OK, IMU_STRUCT, MAX_LINE_BYTES, MODE_BINARY, MODE_IMU,
+                      MSG_ACK, MSG_COMMAND, MSG_MODE, MSG_STATE, STATE_STRUCT, SYNC, FrameParser,
+                      TeensyLink, encode, encode_imu, encode_state)
+
+STATE = {"t_ms": 123456, "vol": 0.5, "pitchA": 1.25, "pitchB": 0.75, "songA": 2, "songB": 3,
+         "deckA": 1, "deckB": 0, "mix": 1, "eq": 0, "echo": 1}
+
+
+class FakePort:
+    def __init__(self):
+        self.written = bytearray()
+        self.is_open = True
+
+    def write(self, data):
+        self.written += data
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+def test_frame_layout():
+    frame = encode(MSG_COMMAND, 7, bytes([4]))
+    assert frame[:2] == SYNC
+    assert frame[2:5] == bytes([MSG_COMMAND, 7, 1])
+    assert frame[5] == 4
+    assert len(frame) == 5 + 1 + 2
+    assert encode(MSG_COMMAND, 256 + 7, bytes([4])) == frame  # seq wraps at a byte
+
+
+def test_state_round_trip():
+    [(kind, seq, state)] = FrameParser().feed(encode_state(STATE, seq=9))
+    assert (kind, seq) == ("STATE", 9)
+    assert state == STATE
+    assert STATE_STRUCT.size == 19
+
+
+def test_ack_and_imu_round_trip():
+    sample = (1000,) + tuple(float(i) for i in range(12))
+    messages = FrameParser().feed(encode(MSG_ACK, 1, bytes([5, ACK_DUPLICATE])) + encode_imu(sample, 2))
+    assert messages == [("ACK", 1, (5, ACK_DUPLICATE)), ("IMU", 2, sample)]
+    assert IMU_STRUCT.size == 52
+
+
+def test_frames_split_across_reads():
+    stream = encode_state(STATE, 1) + encode(MSG_ACK, 2, bytes([1, ACK_OK]))
+    parser = FrameParser()
+    messages = []
+    for i in range(len(stream)):
+        messages += parser.feed(stream[i:i + 1])
+    assert [(kind, seq) for kind, seq, _ in messages] == [("STATE", 1), ("ACK", 2)]
+    assert parser.stats()["parse_errors"] == 0
+
+
+@pytest.mark.parametrize("index", [2, 3, 5, 10, -2, -1])
+def test_corrupt_frame_is_rejected_and_parser_resyncs(index):
+    bad = bytearray(encode_state(STATE, 1))
+    bad[index] ^= 0x40
+    parser = FrameParser()
+    messages = parser.feed(bytes(bad) + encode(MSG_ACK, 2, bytes([1, ACK_OK])))
+    assert ("ACK", 2, (1, ACK_OK)) in messages
+    assert all(kind != "STATE" for kind, _, _ in messages)
+    assert parser.crc_errors >= 1
+
+
+def test_unknown_or_short_payload_is_dropped():
+    parser = FrameParser()
+    assert parser.feed(encode(MSG_STATE, 1, b"\x00" * 3) + encode(0x7F, 2, b"x")) == []
+    assert parser.frames == 0
+
+
+def test_text_lines_between_frames():
+    stream = (b"boot ok\r\n" + encode_state(STATE, 1) + b'STATE:{"vol": 0.25}\n'
+              + b"STATE:{broken\n" + b"\n")
+    messages = FrameParser().feed(stream)
+    assert messages == [("TEXT", None, "boot ok"), ("STATE", 1, STATE),
+                        ("STATE", None, {"vol": 0.25}), ("TEXT", None, "STATE:{broken")]
+
+
+def test_overlong_line_is_dropped_not_buffered():
+    parser = FrameParser()
+    assert parser.feed(b"x" * (MAX_LINE_BYTES + 1)) == []
+    assert parser.overflows == 1
+    assert parser.feed(b"ok\n") == [("TEXT", None, "ok")]
+
+
+def test_text_link_sends_bare_bytes_and_no_frames():
+    port = FakePort()
+    link = TeensyLink(port)
+    assert not link.binary
+    link.write(bytes([1, 4]))
+    assert port.written == bytes([1, 4])
+    assert link.bytes_out == 2
+
+
+def test_binary_link_sends_mode_then_acked_commands():
+    port = FakePort()
+    link = TeensyLink(port, binary=True, imu=True)
+    [(mode_type, mode)] = [(t, p) for t, _, p in _frames(port.written)]
+    assert mode_type == MSG_MODE and mode == bytes([MODE_BINARY | MODE_IMU])
+    port.written.clear()
+
+    link.write(bytes([5]))
+    [(msg_type, seq, payload)] = _frames(port.written)
+    assert (msg_type, payload) == (MSG_COMMAND, bytes([5]))
+    assert link.pending == 1
+    assert link.feed(encode(MSG_ACK, 0, bytes([seq, ACK_OK]))) == []
+    assert link.pending == 0
+    assert link.counts["acked"] == 1
+
+
+def test_unacked_command_is_retransmitted_with_same_seq_then_lost():
+    port = FakePort()
+    link = TeensyLink(port, binary=True, ack_timeout_s=0.0, max_retries=1)
+    port.written.clear()
+    link.write(bytes([3]))
+    time.sleep(0.001)
+    link.feed(b"")
+    time.sleep(0.001)
+    link.feed(b"")
+    sent = _frames(port.written)
+    assert len(sent) == 2 and sent[0] == sent[1]  # one retransmit, same seq
+    assert link.counts["retransmits"] == 1
+    assert link.counts["lost"] == 1
+    assert link.pending == 0
+
+
+def _frames(data):
+    """(type, seq, payload) of every frame in `data`, CRC unchecked."""
+    out, i = [], 0
+    while i < len(data):
+        assert data[i:i + 2] == SYNC
+        length = data[i + 4]
+        out.append((data[i + 2], data[i + 3], bytes(data[i + 5:i + 5 + length])))
+        i += 5 + length + 2
+    return out
@@ -0,0 +1,66 @@
+"""SwipeDetector: direction, steadiness and the post-swipe hold."""
+import numpy as np
+
+from gestures import SWIPE_GESTURE_CODES
+from swipe import COOLDOWN_MS, SwipeDetector
+
+FRAME = (320, 240)
+
+
+def hand_at(x, y):
+    return np.tile(np.array([x, y], dtype=np.float32), (21, 1))
+
+
+def run(path, step_ms=33, start_ms=0, detector=None):
+    """Feed (x, y) hand positions; returns (detector, codes)."""
+    detector = detector or SwipeDetector(FRAME)
+    codes = [detector.update(start_ms + i * step_ms, hand_at(x, y)) for i, (x, y) in enumerate(path)]
+    return detector, [c for c in codes if c is not None]
+
+
+def line(x0, y0, x1, y1, n=8):
+    return list(zip(np.linspace(x0, x1, n), np.linspace(y0, y1, n)))
+
+
+def test_directions_are_the_users():
+    # The image is not mirrored: the user's right is image left
+    assert run(line(0.8, 0.5, 0.3, 0.5))[1] == [SWIPE_GESTURE_CODES["Swipe_Right"]]
+    assert run(line(0.3, 0.5, 0.8, 0.5))[1] == [SWIPE_GESTURE_CODES["Swipe_Left"]]
+    assert run(line(0.5, 0.8, 0.5, 0.3))[1] == [SWIPE_GESTURE_CODES["Swipe_Up"]]
+    assert run(line(0.5, 0.3, 0.5, 0.8))[1] == [SWIPE_GESTURE_CODES["Swipe_Down"]]
+
+
+def test_still_or_short_moves_are_not_swipes():
+    assert run([(0.5, 0.5)] * 12)[1] == []
+    assert run(line(0.5, 0.5, 0.55, 0.5))[1] == []
+
+
+def test_diagonal_is_rejected():
+    assert run(line(0.3, 0.3, 0.7, 0.7))[1] == []
+
+
+def test_back_and_forth_is_rejected():
+    zigzag = [(0.3, 0.5), (0.6, 0.5), (0.35, 0.5), (0.65, 0.5), (0.4, 0.5), (0.7, 0.5)]
+    assert run(zigzag)[1] == []
+
+
+def test_hold_after_a_swipe():
+    detector, codes = run(line(0.8, 0.5, 0.3, 0.5))
+    assert len(codes) == 1
+    # Straight back the other way inside the hold: ignored
+    _, codes = run(line(0.3, 0.5, 0.8, 0.5), start_ms=8 * 33, detector=detector)
+    assert codes == []
+    _, codes = run(line(0.8, 0.5, 0.3, 0.5), start_ms=8 * 33 + COOLDOWN_MS + 200, detector=detector)
+    assert codes == [SWIPE_GESTURE_CODES["Swipe_Right"]]
+
+
+def test_lost_hand_breaks_the_trajectory():
+    detector = SwipeDetector(FRAME)
+    # Each half is under MIN_TRAVEL; together they would be a swipe
+    for i, (x, y) in enumerate(line(0.8, 0.5, 0.66, 0.5, 4)):
+        assert detector.update(i * 33, hand_at(x, y)) is None
+    detector.update(4 * 33, None)
+    _, codes = run(line(0.64, 0.5, 0.5, 0.5, 4), start_ms=5 * 33, detector=detector)
+    assert codes == []
+    _, codes = run(line(0.8, 0.5, 0.5, 0.5, 8))
+    assert codes == [SWIPE_GESTURE_CODES["Swipe_Right"]]
@@ -0,0 +1,160 @@
+"""End-to-end latency tracing from camera exposure to Teensy action.
+
+Every inferred frame is keyed by its MediaPipe timestamp, which the camera
+loop now takes from the Picamera2 SensorTimestamp (CLOCK_MONOTONIC, same
+clock as time.monotonic_ns). That gives the exposure time for free. Each
+trace then collects:
+
+    submit   frame handed to recognize_async
+    result   print_result callback fired
+    write    gesture code written to the Teensy (only if one was sent)
+    state    first STATE: line that reflects the command
+
+Stage durations go into rolling windows, and p50/p95/p99 are computed on
+demand. dump() writes the summary plus the recent completed traces as JSON.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+STAGES = (
+    "capture_to_submit",
+    "submit_to_result",
+    "result_to_write",
+    "write_to_state",
+    "capture_to_result",
+    "capture_to_state",
+)
+
+
+def _now_ms():
+    return time.monotonic_ns() / 1e6
+
+
+def _reflects(code, before, after):
+    """Does STATE `after` show the effect of `code` sent when `before` was current?"""
+    if code == 1:
+        return bool(after.get("deckA"))
+    if code == 2:
+        return not after.get("deckA")
+    if code == 8:
+        return bool(after.get("deckB"))
+    if code == 6:
+        return not after.get("deckB")
+    if code == 5:
+        return before is None or after.get("mix") != before.get("mix")
+    # No visible field for this command: the next report is the best we have
+    return True
+
+
+class RollingWindow:
+    """Last `size` samples in a NumPy ring buffer."""
+
+    def __init__(self, size=1024):
+        self._data = np.zeros(size, dtype=np.float64)
+        self._count = 0
+
+    def add(self, value):
+        self._data[self._count % len(self._data)] = value
+        self._count += 1
+
+    def percentiles(self, qs=(50, 95, 99)):
+        n = min(self._count, len(self._data))
+        if n == 0:
+            return {f"p{q}": None for q in qs} | {"n": 0}
+        values = np.percentile(self._data[:n], qs)
+        return {f"p{q}": round(float(v), 2) for q, v in zip(qs, values)} | {"n": self._count}
+
+
+class LatencyTracer:
+    def __init__(self, window=1024, keep_traces=256, max_age_ms=5000):
+        self.max_age_ms = max_age_ms
+        self._lock = threading.Lock()
+        self._open = {}                      # timestamp_ms -> trace dict
+        self._awaiting_state = deque()       # traces with a write, oldest first
+        self._last_state = None
+        self._done = deque(maxlen=keep_traces)
+        self.windows = {stage: RollingWindow(window) for stage in STAGES}
+
+    def _add(self, stage, value):
+        self.windows[stage].add(value)
+
+    # --------------------------
+    # Hooks
+    # --------------------------
+    def submitted(self, timestamp_ms):
+        now = _now_ms()
+        with self._lock:
+            self._open[timestamp_ms] = {"capture": timestamp_ms, "submit": now}
+            self._add("capture_to_submit", now - timestamp_ms)
+            self._prune(now)
+
+    def result(self, timestamp_ms):
+        now = _now_ms()
+        with self._lock:
+            trace = self._open.get(timestamp_ms)
+            if trace is None:
+                return
+            trace["result"] = now
+            self._add("submit_to_result", now - trace["submit"])
+            self._add("capture_to_result", now - trace["capture"])
+
+    def written(self, timestamp_ms, code):
+        now = _now_ms()
+        with self._lock:
+            trace = self._open.pop(timestamp_ms, None)
+            if trace is None or "result" not in trace:
+                return
+            trace["write"] = now
+            trace["code"] = code
+            trace["state_before"] = self._last_state
+            self._add("result_to_write", now - trace["result"])
+            self._awaiting_state.append(trace)
+
+    def state(self, state):
+        """Feed every parsed STATE: dict from the serial reader."""
+        now = _now_ms()
+        with self._lock:
+            while self._awaiting_state:
+                trace = self._awaiting_state[0]
+                if not _reflects(trace["code"], trace["state_before"], state):
+                    break
+                self._awaiting_state.popleft()
+                trace["state"] = now
+                self._add("write_to_state", now - trace["write"])
+                self._add("capture_to_state", now - trace["capture"])
+                trace.pop("state_before", None)
+                self._done.append(trace)
+            self._last_state = state
+
+    def _prune(self, now):
+        for ts in [ts for ts, t in self._open.items() if now - t["submit"] > self.max_age_ms]:
+            del self._open[ts]
+        while self._awaiting_state and now - self._awaiting_state[0]["write"] > self.max_age_ms:
+            trace = self._awaiting_state.popleft()
+            trace.pop("state_before", None)
+            self._done.append(trace)
+
+    # --------------------------
+    # Reporting
+    # --------------------------
+    def summary(self):
+        with self._lock:
+            return {stage: w.percentiles() for stage, w in self.windows.items()}
+
+    def dump(self, path):
+        with self._lock:
+            traces = list(self._done)
+        report = {"stages": self.summary(), "traces": traces}
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+    def print_summary(self):
+        print(f"{'stage (ms)':<20}{'p50':>9}{'p95':>9}{'p99':>9}{'n':>8}")
+        for stage, p in self.summary().items():
+            cells = "".join(f"{'-' if p[k] is None else p[k]:>9}" for k in ("p50", "p95", "p99"))
+            print(f"{stage:<20}{cells}{p['n']:>8}")
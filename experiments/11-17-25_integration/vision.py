@@ -0,0 +1,205 @@
+"""Camera + recognizer loop shared by the integrate scripts and multiproc.py.
+
+The setup helpers (create_recognizer, open_camera, ...) are also used by
+the asyncio runtime in aio_host.py.
+
+run_vision() owns the Picamera2, the LIVE_STREAM GestureRecognizer and the
+InferenceScheduler, and feeds every result to a GesturePipeline. It runs
+headless until `stop_event` is set (or 'q' in the show=True debug window),
+handing a rate-capped preview frame to `publish`. It returns camera and
+inference rates for the run.
+
+mediapipe, picamera2 and cv2 take a while to import on a Pi, so they are
+imported inside the functions that need them (cv2 in capture.py,
+motion_gate.py and roi.py too). Importing this module is cheap, and
+startup.prefetch() can load all three while the script does other work. run_vision() loads the model, opens the camera and runs any extra
+`init_tasks` (e.g. the serial port) concurrently via startup.bring_up().
+"""
+import time
+from pathlib import Path
+
+from capture import PooledCapture, CAPTURE_SIZE
+from recording import SessionRecorder
+from scheduler import InferenceScheduler
+from startup import bring_up, timer as startup_timer
+
+MODEL_PATH = Path(__file__).parent / 'gesture_recognizer.task'
+PREVIEW_FPS = 10  # cap on preview frames handed out of the capture loop
+
+
+def create_recognizer(result_callback, model_path=MODEL_PATH, num_hands=1, engine="recognizer"):
+    """LIVE_STREAM GestureRecognizer; results arrive on a MediaPipe thread.
+
+    engine="landmarks" returns the landmark-only LandmarkRecognizer
+    (landmark_classifier.py) instead, with the same interface and results.
+    """
+    if engine == "landmarks":
+        from landmark_classifier import LandmarkRecognizer
+        return LandmarkRecognizer(result_callback, model_path, num_hands)
+    import mediapipe as mp
+    vision = mp.tasks.vision
+    options = vision.GestureRecognizerOptions(
+        base_options=mp.tasks.BaseOptions(model_asset_path=str(model_path)),
+        running_mode=vision.RunningMode.LIVE_STREAM,
+        num_hands=num_hands,
+        result_callback=result_callback,
+    )
+    return vision.GestureRecognizer.create_from_options(options)
+
+
+def open_camera(frame_size=CAPTURE_SIZE):
+    """Started Picamera2 + PooledCapture (RGB straight into pooled buffers)."""
+    from picamera2 import Picamera2
+    picam2 = Picamera2()
+    capture = PooledCapture(picam2, frame_size)
+    capture.configure()
+    picam2.start()
+    return picam2, capture
+
+
+def recognizer_submit(recognizer, pipeline):
+    """submit(frame, timestamp_ms) for the scheduler: ROI crop, then recognize_async."""
+    import mediapipe as mp
+    Image, SRGB = mp.Image, mp.ImageFormat.SRGB
+
+    def submit(frame, timestamp_ms):
+        image = pipeline.prepare(frame, timestamp_ms)
+        mp_image = Image(image_format=SRGB, data=image)
+        recognizer.recognize_async(mp_image, timestamp_ms)
+    return submit
+
+
+def annotate(capture, frame, gesture):
+    """Mirrored BGR preview with the current gesture written on it."""
+    import cv2
+    frame_flipped = capture.display_frame(frame)
+    if gesture:
+        cv2.putText(
+            frame_flipped, gesture, (10, 30),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2
+        )
+    return frame_flipped
+
+
+def run_vision(pipeline, result_callback=None, model_path=MODEL_PATH, frame_size=CAPTURE_SIZE,
+               in_flight=1, record_path=None, trace_path=None, show=False,
+               stop_event=None, publish=None, on_start=None, init_tasks=None, on_init=None,
+               startup=startup_timer, preview_fps=PREVIEW_FPS, engine="recognizer"):
+    """Capture, infer and act until stopped.
+
+    Headless by default. `publish(frame, timestamp_ms, gesture)`, if given,
+    receives the newest raw RGB frame at most `preview_fps` times a second;
+    it must copy it (a SharedFrame does), and the viewer does the mirroring,
+    scaling and drawing (python_gui/preview_panel.py). `show=True` opens the
+    old cv2 debug window instead, at the same capped rate. With
+    pipeline.controller (adaptive.py) the preview rate, inference stride and
+    recognizer input size follow its latency budget instead.
+    `init_tasks` ({name: callable}) run concurrently with the model load and
+    camera bring-up; `on_init` gets their {name: result} before the first
+    frame. `on_start` is called once the camera is streaming. Phases and the
+    first frame are recorded on `startup`. `engine` picks the recognizer
+    (create_recognizer).
+    """
+    if result_callback is None:
+        def result_callback(result, output_image, timestamp_ms):
+            pipeline.handle_result(result, timestamp_ms)
+    if show:
+        import cv2
+
+    frames = 0
+    published = 0
+    preview_period = 1.0 / preview_fps if preview_fps else 0.0
+    next_preview = 0.0
+    start = time.perf_counter()
+    try:
+        opened = bring_up(
+            startup,
+            recognizer=lambda: create_recognizer(result_callback, model_path, pipeline.num_hands,
+                                                 engine),
+            camera=lambda: open_camera(frame_size),
+            **(init_tasks or {}),
+        )
+    except Exception as e:
+        # Close whichever of the two did come up
+        if "recognizer" in getattr(e, "results", {}):
+            e.results["recognizer"].close()
+        if "camera" in getattr(e, "results", {}):
+            e.results["camera"][0].close()
+        raise
+    picam2, capture = opened.pop("camera")
+    with opened.pop("recognizer") as recognizer:
+        if on_init:
+            on_init(opened)
+
+        # Newest frame always wins; no fixed frame_counter skip ratio
+        scheduler = InferenceScheduler(
+            recognizer_submit(recognizer, pipeline), capture.pool.buffers[0].shape,
+            max_in_flight=in_flight, pool=capture.pool,
+        ).start()
+        pipeline.scheduler = scheduler
+        pipeline.capture = capture
+        if pipeline.metrics:
+            scheduler.latency_histogram = pipeline.metrics.inference_ms
+        controller = pipeline.controller
+        if controller:
+            controller.attach(scheduler)
+        if record_path:
+            pipeline.recorder = SessionRecorder(record_path, frame_size)
+
+        if on_start:
+            on_start()
+        start = time.perf_counter()
+        try:
+            while stop_event is None or not stop_event.is_set():
+                frame = capture.grab()
+                if not frames:
+                    startup.first("first_frame")
+                frames += 1
+                timestamp_ms = capture.last_sensor_ns // 1_000_000
+                if pipeline.recorder:
+                    pipeline.recorder.append(frame, timestamp_ms, capture.last_sensor_ns)
+
+                # ✅ Hand the newest frame to the scheduler (never blocks)
+                if pipeline.should_infer(frame):
+                    # Sensor exposure time doubles as the MediaPipe timestamp
+                    scheduler.offer(frame, timestamp_ms)
+
+                if controller:
+                    controller.tick()
+                    preview_period = controller.preview_period
+                if not (show or publish):
+                    continue
+                # Preview is off the critical path: one copy per preview period
+                now = time.perf_counter()
+                if now < next_preview:
+                    continue
+                next_preview = now + preview_period
+                published += 1
+                if publish:
+                    publish(frame, timestamp_ms, pipeline.latest_gesture)
+                if show:
+                    cv2.imshow("Gesture Live", annotate(capture, frame, pipeline.latest_gesture))
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        break
+
+        except Exception as e:
+            print("Camera loop error:", e)
+        finally:
+            scheduler.stop()
+            if pipeline.recorder:
+                pipeline.recorder.close()
+            pipeline.print_stats(trace_path)
+            if show:
+                cv2.destroyAllWindows()
+            picam2.close()
+
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats()
+    return {
+        "frames": frames,
+        "elapsed_s": round(elapsed, 2),
+        "camera_fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        "inference_fps": round(stats["inferred"] / elapsed, 2) if elapsed else 0.0,
+        "preview_frames": published,
+        **stats,
+    }